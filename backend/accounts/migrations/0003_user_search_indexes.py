@@ -0,0 +1,89 @@
+import logging
+from django.conf import settings
+from django.db import DatabaseError, migrations
+
+logger = logging.getLogger(__name__)
+
+# auth.User no es de esta app: los índices de accounts.search se crean con SQL.
+#
+# Los índices de trigramas necesitan la extensión pg_trgm. CREATE EXTENSION exige ser
+# superusuario o, desde PostgreSQL 13 (pg_trgm es "trusted"), tener el privilegio CREATE
+# en la base de datos. Si el usuario de la aplicación no puede crearla, la migración deja
+# esos dos índices sin crear y lo avisa: la búsqueda por subcadena sigue funcionando, sin
+# índice. Para tenerlos, un DBA ejecuta CREATE EXTENSION pg_trgm y las dos sentencias de
+# TRIGRAM_INDEXES (son idempotentes).
+INDEXES = {
+    'postgresql': [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS user_username_lower_idx ON {table} (LOWER(username) text_pattern_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS user_email_lower_idx ON {table} (LOWER(email) text_pattern_ops)",
+    ],
+    'default': [
+        "CREATE INDEX user_username_lower_idx ON {table} ((LOWER(username)))",
+        "CREATE INDEX user_email_lower_idx ON {table} ((LOWER(email)))",
+    ],
+}
+TRIGRAM_INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS user_username_trgm_idx ON {table} USING gin (LOWER(username) gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS user_email_trgm_idx ON {table} USING gin (LOWER(email) gin_trgm_ops)",
+]
+INDEX_NAMES = [
+    'user_username_lower_idx', 'user_email_lower_idx', 'user_username_trgm_idx', 'user_email_trgm_idx',
+]
+
+
+def _table(apps, schema_editor):
+    model = apps.get_model(settings.AUTH_USER_MODEL)
+    return schema_editor.quote_name(model._meta.db_table)
+
+
+def _ensure_pg_trgm(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return True
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError as exc:
+            logger.warning(
+                "No se pudo crear la extensión pg_trgm (%s): la búsqueda de usuarios por subcadena "
+                "queda sin índice. Ver accounts/migrations/0003_user_search_indexes.py.", exc,
+            )
+            return False
+    return True
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    table = _table(apps, schema_editor)
+    statements = list(INDEXES.get(vendor, INDEXES['default']))
+    if vendor == 'postgresql' and _ensure_pg_trgm(schema_editor):
+        statements += TRIGRAM_INDEXES
+    for statement in statements:
+        schema_editor.execute(statement.format(table=table))
+
+
+def drop_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    table = _table(apps, schema_editor)
+    names = INDEX_NAMES if vendor == 'postgresql' else INDEX_NAMES[:2]
+    for name in names:
+        if vendor == 'mysql':
+            schema_editor.execute(f"DROP INDEX {name} ON {table}")
+        else:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0002_twofactorchallenge_twofactorconfig'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # Después de las migraciones de auth: en SQLite al alterar la tabla se rehace sin estos índices
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
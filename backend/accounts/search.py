@@ -0,0 +1,68 @@
+# accounts/search.py
+"""
+Búsqueda de usuarios para el autocompletado de LockUsers (GET /api/users/search/?q=).
+
+- Prefijo de username o email, sin distinguir mayúsculas: índices sobre LOWER(username)
+  y LOWER(email) (migración accounts 0003). En PostgreSQL con LIKE 'q%' (text_pattern_ops);
+  en el resto como rango LOWER(col) >= 'q' AND < 'q\\U0010ffff', que cualquier B-tree resuelve.
+- En PostgreSQL, con términos de TRIGRAM_MIN_CHARS o más, también por subcadena (LIKE '%q%')
+  con índices GIN de trigramas (pg_trgm). Solo para administradores: los gestores de
+  cerraduras buscan por prefijo de username entre quienes comparten sus cerraduras o por
+  username/email exacto (ver accounts.views.UserSearchView).
+- Paginación por cursor sobre LOWER(username): sin COUNT(*) ni OFFSET.
+
+Orden: alfabético también en las búsquedas por subcadena, no por similitud. Es deliberado:
+el cursor necesita un orden estable y único, y el plan previsto es un bitmap scan de los
+índices GIN, que no devuelve las filas en ningún orden útil, seguido de un top-N
+(LIMIT page_size + 1) sobre las coincidencias con LOWER(username) > cursor. El coste
+crece con el número de coincidencias, que TRIGRAM_MIN_CHARS mantiene acotado.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework.pagination import CursorPagination
+
+MIN_CHARS = 2
+TRIGRAM_MIN_CHARS = 3
+_MAX_CHAR = '\U0010ffff'
+
+
+def annotate(queryset):
+    """Anota username_lower/email_lower, que usan los filtros y el cursor."""
+    return queryset.annotate(username_lower=Lower('username'), email_lower=Lower('email'))
+
+
+def term_filter(term, fields=('username', 'email'), substring=True):
+    """Q de prefijo (o subcadena, en PostgreSQL y con substring) de `term` en minúsculas."""
+    if connection.vendor == 'postgresql':
+        lookup = 'contains' if substring and len(term) >= TRIGRAM_MIN_CHARS else 'startswith'
+        conditions = [Q(**{f'{field}_lower__{lookup}': term}) for field in fields]
+    else:
+        end = term + _MAX_CHAR
+        conditions = [Q(**{f'{field}_lower__gte': term, f'{field}_lower__lt': end}) for field in fields]
+    q = Q()
+    for condition in conditions:
+        q |= condition
+    return q
+
+
+def exact_filter(term):
+    """Q de username o email exactos (sin distinguir mayúsculas) de `term` en minúsculas."""
+    return Q(username_lower=term) | Q(email_lower=term)
+
+
+def search_users(queryset, term):
+    """Filtra por prefijo/subcadena de username o email; anota username_lower para el cursor."""
+    term = term.strip().lower()
+    queryset = annotate(queryset)
+    if not term:
+        return queryset
+    return queryset.filter(term_filter(term))
+
+
+class UserSearchPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # Ver el docstring del módulo: también para las coincidencias por trigramas
+    ordering = ('username_lower', 'id')
@@ -5,6 +5,7 @@ from .models import Profile
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import TwoFactorConfig
+from config.dynamic_fields import DynamicFieldsMixin
 
 User = get_user_model()
 
@@ -22,7 +23,7 @@ class TwoFactorEnableSerializer(serializers.Serializer):
 class TwoFactorDisableSerializer(serializers.Serializer):
     code = serializers.CharField()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para mostrar información básica del usuario.
     Incluye el rol proveniente del modelo Profile.
@@ -34,6 +35,15 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'role']
 
 
+class UserSearchSerializer(UserSerializer):
+    """
+    UserSerializer sin email, para quien busca usuarios sin ser administrador
+    (accounts.views.UserSearchView).
+    """
+    class Meta(UserSerializer.Meta):
+        fields = ['id', 'username', 'role']
+
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     """
     Serializador para registrar nuevos usuarios.
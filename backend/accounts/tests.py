@@ -1,3 +1,38 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from locks.models import Lock, Role, UserRole
 
-# Create your tests here.
+
+class UserSearchViewTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', 'manager@example.com')
+        self.lock = Lock.objects.create(name='L1', owner=self.manager)
+        self.member = User.objects.create_user('userguest', 'guest@example.com')
+        UserRole.objects.create(user=self.member, lock=self.lock, role=Role.objects.create(name='Invitado'))
+        self.stranger = User.objects.create_user('userstranger', 'stranger@example.com')
+        self.client = APIClient()
+
+    def search(self, user, q):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/users/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_manager_only_finds_shared_users_by_prefix(self):
+        results = self.search(self.manager, 'user')
+        self.assertEqual([row['username'] for row in results], ['userguest'])
+        self.assertNotIn('email', results[0])
+
+    def test_manager_finds_others_only_by_exact_username_or_email(self):
+        self.assertEqual(self.search(self.manager, 'userstrang'), [])
+        self.assertEqual([row['id'] for row in self.search(self.manager, 'UserStranger')], [self.stranger.pk])
+        self.assertEqual([row['id'] for row in self.search(self.manager, 'stranger@example.com')], [self.stranger.pk])
+
+    def test_admin_searches_everyone_with_email(self):
+        admin = User.objects.create_user('admin')
+        admin.profile.role = 'admin'
+        admin.profile.save()
+        results = self.search(admin, 'user')
+        self.assertEqual([row['username'] for row in results], ['userguest', 'userstranger'])
+        self.assertEqual(results[1]['email'], 'stranger@example.com')
@@ -1,10 +1,11 @@
 # backend/accounts/urls.py
 from django.urls import path
-from .views import UserRegisterView, UserListView, UserRoleUpdateView, TwoFactorSetupView, TwoFactorConfirmView, TwoFactorDisableView, TokenChallengeView, Token2FAVerifyView
+from .views import UserRegisterView, UserListView, UserSearchView, UserRoleUpdateView, TwoFactorSetupView, TwoFactorConfirmView, TwoFactorDisableView, TokenChallengeView, Token2FAVerifyView
 
 urlpatterns = [
     path('register/', UserRegisterView.as_view(), name='user-register'),
     path('', UserListView.as_view(), name='user-list'),
+    path('search/', UserSearchView.as_view(), name='user-search'),
     path('<int:pk>/role/', UserRoleUpdateView.as_view(), name='user-role-update'),
     path('2fa/setup/', TwoFactorSetupView.as_view(), name='2fa-setup'),
     path('2fa/confirm/', TwoFactorConfirmView.as_view(), name='2fa-confirm'),
@@ -4,13 +4,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from .models import Profile, User, TwoFactorConfig, TwoFactorChallenge
-from .serializers import UserSerializer, UserRegisterSerializer, UserRoleUpdateSerializer, TwoFactorSetupSerializer, TwoFactorVerifySerializer, TwoFactorEnableSerializer, TwoFactorDisableSerializer
+from .serializers import UserSerializer, UserSearchSerializer, UserRegisterSerializer, UserRoleUpdateSerializer, TwoFactorSetupSerializer, TwoFactorVerifySerializer, TwoFactorEnableSerializer, TwoFactorDisableSerializer
 import pyotp
 import base64
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate, get_user_model
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from config.dynamic_fields import DynamicFieldsViewMixin
+from locks.models import UserRole
+from locks.permissions import managed_locks, locks_with_allowed_role
+from .search import annotate, exact_filter, search_users, term_filter, UserSearchPagination, MIN_CHARS
 
 User = get_user_model()
 
@@ -213,7 +219,7 @@ class UserRegisterView(generics.CreateAPIView):
 
 
 # Listar usuarios
-class UserListView(generics.ListAPIView):
+class UserListView(DynamicFieldsViewMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -224,6 +230,60 @@ class UserListView(generics.ListAPIView):
             return User.objects.all()
         return User.objects.filter(id=user.id)
 
+
+class UserSearchView(DynamicFieldsViewMixin, generics.ListAPIView):
+    """
+    GET /api/users/search/?q=<texto>[&lock=<id>][&cursor=...]
+    Autocompletado para asignar roles (ver accounts.search). Alcance:
+    - superusuario o perfil owner/admin: todos los usuarios activos, por prefijo o subcadena;
+    - quien gestiona alguna cerradura (q obligatorio): por prefijo de username los usuarios
+      con rol en alguna de sus cerraduras y, del resto, solo quien tenga exactamente ese
+      username o email. Así no puede recorrer el directorio de usuarios a base de búsquedas;
+    - el resto: solo él mismo.
+    ?lock= limita a los usuarios con rol en esa cerradura, que hay que poder gestionar.
+    El email solo se devuelve a los administradores.
+    """
+    serializer_class = UserSerializer
+    pagination_class = UserSearchPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _is_admin(self):
+        user = self.request.user
+        profile = getattr(user, 'profile', None)
+        return user.is_superuser or (profile is not None and profile.role in ['owner', 'admin'])
+
+    def get_serializer_class(self):
+        return UserSerializer if self._is_admin() else UserSearchSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        term = self.request.query_params.get('q', '').strip()
+        lock_id = self.request.query_params.get('lock')
+        if term and len(term) < MIN_CHARS:
+            raise ValidationError({"q": f"Escribe al menos {MIN_CHARS} caracteres."})
+
+        queryset = User.objects.filter(is_active=True)
+        if lock_id:
+            try:
+                lock_id = int(lock_id)
+            except ValueError:
+                raise ValidationError({"lock": "Debe ser un id."})
+            if not user.is_superuser and not locks_with_allowed_role(user, [lock_id]):
+                raise PermissionDenied("No puedes gestionar los usuarios de esta cerradura.")
+            queryset = queryset.filter(pk__in=UserRole.objects.filter(lock_id=lock_id).values('user'))
+        elif self._is_admin():
+            pass
+        elif term and managed_locks(user).exists():
+            term = term.lower()
+            shared = UserRole.objects.filter(lock__in=managed_locks(user)).values('user')
+            return annotate(queryset).filter(
+                (Q(pk__in=shared) & term_filter(term, fields=('username',), substring=False))
+                | exact_filter(term)
+            )
+        else:
+            queryset = queryset.filter(pk=user.pk)
+        return search_users(queryset, term)
+
 # Actualizar rol
 class UserRoleUpdateView(generics.UpdateAPIView):
     queryset = User.objects.all()
@@ -242,7 +302,7 @@ class UserRoleUpdateView(generics.UpdateAPIView):
 
         return Response({'message': f'Rol de {user.username} actualizado a {new_role}'}, status=status.HTTP_200_OK)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
@@ -0,0 +1,14 @@
+"""
+ASGI config del servicio de firmware (solo endpoints de dispositivos).
+
+    uvicorn config.asgi_device:application
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+# Sin setdefault: este punto de entrada siempre usa los settings reducidos
+os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings_device'
+
+application = get_asgi_application()
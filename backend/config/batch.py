@@ -0,0 +1,176 @@
+# backend/config/batch.py
+"""
+POST /api/batch/: varias llamadas a la API en un solo request (una sola autenticación JWT
+y un solo viaje de red).
+
+    { "requests": [ { "method": "GET", "path": "locks/<uuid>/" },
+                    { "method": "PATCH", "path": "/api/pins/3/", "body": {...} }, ... ] }
+    -> { "responses": [ { "status": 200, "body": {...} }, ... ] }   (mismo orden)
+
+- path relativo a /api/ o absoluto; puede llevar query string.
+- Cada sub-request se resuelve con el URLconf y llama a la vista directamente (sin
+  middlewares) con el usuario ya autenticado (DRF ForcedAuthentication); los permisos y
+  throttles de cada vista se aplican igual.
+- Los GET/HEAD consecutivos se ejecutan en paralelo (hasta BATCH_MAX_WORKERS hilos); una
+  escritura espera a lo anterior y lo posterior espera a la escritura. No hay transacción
+  común: si una sub-request falla, las demás siguen.
+- Lecturas en réplica con el mismo criterio que ReplicaRoutingMiddleware, salvo después
+  de una escritura del propio lote.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import routers
+from .middleware import ReplicaRoutingMiddleware, SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api/'
+BATCH_PATH = '/api/batch/'
+_INHERITED_META = (
+    'REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL', 'HTTP_HOST',
+    'HTTP_X_FORWARDED_FOR', 'HTTP_X_FORWARDED_PROTO', 'HTTP_USER_AGENT', 'HTTP_ACCEPT_LANGUAGE',
+    'wsgi.url_scheme',
+)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        if not value.startswith('/'):
+            value = API_PREFIX + value
+        if not value.startswith(API_PREFIX) or urlsplit(value).path.rstrip('/') == BATCH_PATH.rstrip('/'):
+            raise serializers.ValidationError(f"Solo rutas de {API_PREFIX} (y no {BATCH_PATH}).")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"Como mucho {settings.BATCH_MAX_REQUESTS} sub-requests.")
+        return value
+
+
+def _build_request(parent, spec):
+    url = urlsplit(spec['path'])
+    body = b'' if 'body' not in spec else json.dumps(spec['body']).encode()
+    sub = HttpRequest()
+    sub.method = spec['method']
+    sub.path = sub.path_info = url.path
+    sub.META = {key: parent.META[key] for key in _INHERITED_META if key in parent.META}
+    sub.META.update({
+        'REQUEST_METHOD': sub.method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+    })
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = parent.COOKIES
+    sub._stream = BytesIO(body)
+    sub._read_started = False
+    # Autenticación ya hecha en el request del lote
+    sub.user = parent.user
+    sub._force_auth_user = parent.user
+    sub._force_auth_token = parent.auth
+    return sub
+
+
+def _response_body(response):
+    if isinstance(response, Response):
+        return response.data
+    if not response.content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return response.content.decode(response.charset, errors='replace')
+
+
+def _execute(parent, spec, urlconf):
+    sub = _build_request(parent, spec)
+    try:
+        match = resolve(sub.path_info, urlconf)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {"detail": "No encontrado."}}
+    if iscoroutinefunction(match.func):
+        # Long-polls (commands/poll) no tienen sentido dentro de un lote
+        return {'status': status.HTTP_400_BAD_REQUEST, 'body': {"detail": "Ruta no permitida en un lote."}}
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Http404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {"detail": "No encontrado."}}
+    except Exception:
+        logger.exception("Error en la sub-request %s %s del lote", spec['method'], spec['path'])
+        return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {"detail": "Error interno."}}
+    return {'status': response.status_code, 'body': _response_body(response)}
+
+
+def _execute_read(parent, spec, urlconf, allow_replica):
+    """Sub-request de lectura en un hilo del pool (con su propio estado de routers)."""
+    routers.begin_request(allow_replica)
+    try:
+        return _execute(parent, spec, urlconf)
+    finally:
+        routers.end_request()
+        # Hilo del pool: no dejar conexiones abiertas
+        connections.close_all()
+
+
+class BatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        specs = serializer.validated_data['requests']
+        urlconf = getattr(request._request, 'urlconf', None)
+
+        # En una transacción (tests, ATOMIC_REQUESTS) los hilos no verían sus datos
+        parallel = not any(connections[alias].in_atomic_block for alias in connections)
+        results = [None] * len(specs)
+        wrote = False
+        with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS) as pool:
+            index = 0
+            while index < len(specs):
+                if specs[index]['method'] not in SAFE_METHODS:
+                    results[index] = _execute(request, specs[index], urlconf)
+                    wrote = True
+                    index += 1
+                    continue
+                # Tramo de lecturas consecutivas
+                end = index
+                while end < len(specs) and specs[end]['method'] in SAFE_METHODS:
+                    end += 1
+                if parallel and end - index > 1:
+                    allow_replica = (
+                        bool(routers.replica_aliases()) and not wrote
+                        and not ReplicaRoutingMiddleware.is_pinned(request)
+                    )
+                    futures = [
+                        pool.submit(_execute_read, request, specs[i], urlconf, allow_replica)
+                        for i in range(index, end)
+                    ]
+                    for i, future in zip(range(index, end), futures):
+                        results[i] = future.result()
+                else:
+                    for i in range(index, end):
+                        results[i] = _execute(request, specs[i], urlconf)
+                index = end
+        return Response({'responses': results})
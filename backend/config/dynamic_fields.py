@@ -0,0 +1,148 @@
+# config/dynamic_fields.py
+"""
+Respuestas a medida con ?fields= y ?expand= (solo en lecturas).
+
+    GET /api/locks/?fields=id,name,is_active
+    GET /api/accesslogs/?fields=id,timestamp,result&expand=lock,device
+
+- fields: lista de campos a devolver (los desconocidos se ignoran). Sin el parámetro la
+  salida es la de siempre.
+- expand: sustituye el pk de una relación por su objeto serializado. Los campos
+  expandibles se declaran en Meta.expandable_fields = {'lock': LockSerializer, ...}.
+
+DynamicFieldsViewMixin ajusta además el queryset a los campos que se van a serializar:
+select_related() solo de las relaciones anidadas o expandidas que salgan en la
+respuesta y, en list, .only() de las columnas necesarias.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def _param_list(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Mixin para serializers. Solo el serializer raíz (el que recibe el request en el
+    context) lee los parámetros; los anidados devuelven siempre sus campos completos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get('context', {}).get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        expand = _param_list(request, 'expand')
+        if expand:
+            expandable = getattr(getattr(self, 'Meta', None), 'expandable_fields', {})
+            for name in expand & set(expandable):
+                if name in self.fields:
+                    self.fields[name] = expandable[name](read_only=True)
+
+        fields = _param_list(request, 'fields')
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+def _single_relation(model_field):
+    return model_field.is_relation and (model_field.many_to_one or model_field.one_to_one)
+
+
+def _plan(serializer, model, prefix, only, related):
+    """
+    Añade a `only` las columnas y a `related` las rutas de select_related() que necesita
+    el serializer. Devuelve False si algún campo no se puede mapear a columnas (propiedades,
+    source='*', relaciones múltiples...), en cuyo caso no se debe restringir con only().
+    """
+    restrict = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            restrict = False
+            continue
+        attrs = field.source.split('.')
+        try:
+            model_field = model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            restrict = False
+            continue
+
+        if model_field.many_to_many or model_field.one_to_many:
+            restrict = False
+        elif not _single_relation(model_field):
+            only.add(prefix + attrs[0])
+        elif isinstance(field, ListSerializer):
+            restrict = False
+        elif isinstance(field, PrimaryKeyRelatedField) and len(attrs) == 1:
+            # Solo el pk: basta la columna *_id
+            only.add(prefix + attrs[0])
+        else:
+            # Se accede al objeto relacionado: anidado, 'rel.campo', StringRelatedField...
+            path = prefix + attrs[0]
+            related.add(path)
+            nested_only = set()
+            if isinstance(field, BaseSerializer):
+                nested = _plan(field, model_field.related_model, path + '__', nested_only, related)
+            elif len(attrs) == 2:
+                nested_only.add(f"{path}__{attrs[1]}")
+                nested = True
+            else:
+                nested = False
+            # only('rel') + select_related('rel') carga el objeto relacionado completo
+            only.update(nested_only if nested else {path})
+    return restrict
+
+
+def shape_queryset(queryset, serializer, restrict_columns=True, prefetch=False):
+    """
+    prefetch=True carga las relaciones con prefetch_related() en lugar de JOIN (tablas
+    relacionadas en otra base de datos, p.ej. AccessLog con sharding).
+    """
+    only, related = set(), set()
+    restrict = _plan(serializer, queryset.model, '', only, related)
+    if prefetch:
+        # Solo hacen falta las columnas *_id de la propia tabla
+        only = {path.split('__')[0] for path in only}
+        if related:
+            queryset = queryset.prefetch_related(*sorted(related))
+    elif related:
+        queryset = queryset.select_related(*sorted(related))
+    if restrict_columns and restrict and only:
+        queryset = queryset.only(queryset.model._meta.pk.name, *sorted(only))
+    return queryset
+
+
+def related_paths(serializer, model):
+    """Rutas de select_related() que usaría el serializer (para prefetch de instancias sueltas)."""
+    related = set()
+    _plan(serializer, model, '', set(), related)
+    return sorted(related)
+
+
+class DynamicFieldsViewMixin:
+    """Mixin para vistas: adapta el queryset de list/retrieve a los campos pedidos."""
+
+    def prefetch_relations(self):
+        """True si las relaciones no se pueden resolver con JOIN (ver shape_queryset)."""
+        return False
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        action = getattr(self, 'action', 'list')
+        if self.request.method in SAFE_METHODS and action in ('list', 'retrieve'):
+            # En retrieve no se recortan columnas: los permisos de objeto leen otros campos
+            # y una sola fila no compensa las consultas extra de campos diferidos.
+            queryset = shape_queryset(
+                queryset, self.get_serializer(),
+                restrict_columns=action == 'list', prefetch=self.prefetch_relations(),
+            )
+        return queryset
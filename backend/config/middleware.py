@@ -0,0 +1,142 @@
+# backend/config/middleware.py
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from . import routers
+
+try:
+    import brotli  # opcional: pip install brotli
+except ImportError:
+    brotli = None
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Habilita las lecturas desde réplicas para requests de solo lectura (ver config.routers).
+    Si el request escribe, el cliente queda fijado al primario durante REPLICA_PIN_SECONDS
+    para que vea sus propios cambios aunque la réplica vaya atrasada. La fijación viaja en
+    la cookie db_pin_primary y en la cabecera X-DB-Pin-Primary (instante UNIX en que
+    caduca): el dashboard llama a la API desde otro origen sin cookies y devuelve esa
+    cabecera en sus requests (frontend/src/api/replicaPin.js).
+    """
+    cookie_name = 'db_pin_primary'
+    header_name = 'X-DB-Pin-Primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @classmethod
+    def is_pinned(cls, request):
+        if cls.cookie_name in request.COOKIES:
+            return True
+        try:
+            until = int(request.headers.get(cls.header_name, ''))
+        except ValueError:
+            return False
+        now = time.time()
+        # Acotado a REPLICA_PIN_SECONDS: el cliente no puede fijarse al primario indefinidamente
+        return now < until <= now + settings.REPLICA_PIN_SECONDS
+
+    def _begin(self, request):
+        allow_replica = (
+            bool(routers.replica_aliases())
+            and request.method in SAFE_METHODS
+            and not self.is_pinned(request)
+        )
+        routers.begin_request(allow_replica)
+
+    def _finish(self, response, wrote):
+        if wrote and routers.replica_aliases():
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+            response[self.header_name] = str(int(time.time()) + settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request()
+        return self._finish(response, wrote)
+
+    async def __acall__(self, request):
+        # El estado de routers es un asgiref Local: llega a los hilos de sync_to_async y vuelve
+        self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = routers.end_request()
+        return self._finish(response, wrote)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime las respuestas grandes con brotli (si está instalado y el cliente lo acepta)
+    o gzip, según Accept-Encoding y sus q. Las menores de COMPRESSION_MIN_BYTES (respuestas
+    del firmware, 204, errores cortos) y las streaming se envían tal cual.
+    """
+    COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+    # Mitigación de BREACH en gzip, como GZipMiddleware
+    max_random_bytes = 100
+
+    def _encoding(self, request):
+        accepted = {}
+        for item in request.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = item.strip().partition(';')
+            q = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            if name:
+                accepted[name.lower()] = q
+        candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+        candidates = [name for name in candidates if accepted.get(name, accepted.get('*', 0)) > 0]
+        return max(candidates, key=lambda name: accepted.get(name, accepted.get('*', 0)), default=None)
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESSION_MIN_BYTES
+            or not response.get('Content-Type', '').startswith(self.COMPRESSIBLE_TYPES)
+        ):
+            return response
+        encoding = self._encoding(request)
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            content = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            content = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+        response.headers['Content-Encoding'] = encoding
+        # El cuerpo ya no es byte a byte el mismo (igual que GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
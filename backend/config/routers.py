@@ -0,0 +1,132 @@
+# backend/config/routers.py
+"""
+Enrutamiento primario/réplicas.
+
+- Solo las lecturas de requests con método seguro (GET/HEAD/OPTIONS) pueden ir a una
+  réplica; todo lo demás (escrituras, comandos, tareas, firmware POST) usa 'default'.
+- En cuanto un request escribe, el resto de sus lecturas se fijan al primario
+  (read-your-writes), y ReplicaRoutingMiddleware marca al cliente con una cookie para
+  que sus siguientes requests también lean del primario durante REPLICA_PIN_SECONDS.
+- Una réplica cuyo retraso supera REPLICA_MAX_LAG_SECONDS (o que no responde) se
+  descarta durante REPLICA_LAG_CHECK_INTERVAL segundos.
+"""
+import itertools
+import logging
+import threading
+import time
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+_state = Local()
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def begin_request(allow_replica):
+    _state.allow_replica = allow_replica
+    _state.pinned = False
+
+
+def end_request():
+    """Devuelve True si el request escribió en el primario."""
+    wrote = getattr(_state, 'pinned', False)
+    _state.allow_replica = False
+    _state.pinned = False
+    return wrote
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def reads_from_replica():
+    return getattr(_state, 'allow_replica', False) and not getattr(_state, 'pinned', False)
+
+
+# Salud / retraso de réplicas
+_LAG_SQL = {
+    'postgresql': (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+_health_lock = threading.Lock()
+_health = {}  # alias -> (checked_at, healthy)
+_round_robin = itertools.count()
+
+
+def replica_lag(alias):
+    """Segundos de retraso de la réplica (0 si el motor no permite medirlo)."""
+    connection = connections[alias]
+    sql = _LAG_SQL.get(connection.vendor)
+    if sql is None:
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+
+    with _health_lock:
+        # Otro hilo pudo haberlo comprobado mientras esperábamos
+        checked = _health.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return checked[1]
+        try:
+            lag = replica_lag(alias)
+            healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+            if not healthy:
+                logger.warning("Réplica %s con retraso de %.1fs; se usa el primario.", alias, lag)
+        except Exception:
+            logger.exception("No se pudo comprobar la réplica %s; se descarta temporalmente.", alias)
+            healthy = False
+        _health[alias] = (time.monotonic(), healthy)
+        return healthy
+
+
+def choose_replica():
+    aliases = replica_aliases()
+    if not aliases:
+        return None
+    start = next(_round_robin)
+    for i in range(len(aliases)):
+        alias = aliases[(start + i) % len(aliases)]
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica():
+            return PRIMARY
+        return choose_replica() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        if db in replica_aliases():
+            return False
+        return None
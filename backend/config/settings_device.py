@@ -0,0 +1,47 @@
+# backend/config/settings_device.py
+"""
+Settings del servicio de firmware (config.wsgi_device / config.asgi_device).
+
+Sirve solo los endpoints que llaman las cerraduras (ver config.urls_device) con el
+mínimo de apps y middleware: sin admin, sesiones, mensajes, CORS, staticfiles ni
+blacklist de JWT. Comparte base de datos, caché, claves de firma y demás ajustes con
+config.settings; las migraciones se siguen ejecutando con config.settings.
+
+Comparar arranque y memoria con la app completa: manage.py bench_startup
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    # auth + contenttypes: Lock, Pin y Device referencian a User
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'rest_framework',
+    'locks.apps.LocksConfig',
+    'monitoring.apps.MonitoringConfig',
+]
+
+MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.SlowQueryMiddleware',
+    'monitoring.middleware.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'config.urls_device'
+WSGI_APPLICATION = 'config.wsgi_device.application'
+
+# Solo respuestas JSON/MessagePack: no hace falta motor de plantillas
+TEMPLATES = []
+
+# Los dispositivos se autentican con firma HMAC o X-API-KEY (permisos de cada vista),
+# nunca con JWT: sin clases de autenticación ni usuario anónimo.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': (),
+    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',),
+    'DEFAULT_RENDERER_CLASSES': ('config.renderers.ORJSONRenderer',),
+    'DEFAULT_PARSER_CLASSES': ('config.renderers.ORJSONParser',),
+    'UNAUTHENTICATED_USER': None,
+}
@@ -19,13 +19,16 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from accounts.views import TokenChallengeView, Token2FAVerifyView
+from config.batch import BatchView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/2fa-challenge/', TokenChallengeView.as_view(), name='token_2fa_challenge'),
     path('api/token/2fa-verify/', Token2FAVerifyView.as_view(), name='token_2fa_verify'),
+    path('api/batch/', BatchView.as_view(), name='api-batch'),
     path('api/users/', include('accounts.urls')),
     path('api/', include('locks.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('', include('monitoring.urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,23 @@
+# backend/config/urls_device.py
+"""
+URLconf del servicio de firmware (config.settings_device). Mismas rutas y nombres que
+en config.urls, para que el firmware y las métricas no distingan qué servicio responde.
+"""
+from django.urls import path, include
+from locks.views import LockViewSet, DeviceViewSet, poll_commands
+
+
+def device_action(viewset, name, method='post'):
+    """Vista de una @action del viewset con sus permission/throttle/renderer/parser classes."""
+    handler = getattr(viewset, name)
+    return viewset.as_view({method: name}, detail=handler.detail, **handler.kwargs)
+
+
+urlpatterns = [
+    path('api/locks/<str:uuid>/validate_pin/', device_action(LockViewSet, 'validate_pin'), name='lock-validate-pin'),
+    path('api/locks/<str:uuid>/commands/poll/', poll_commands, name='lock-commands-poll'),
+    path('api/locks/<str:uuid>/commands/<str:command_id>/ack/', device_action(LockViewSet, 'ack_command'),
+         name='lock-ack-command'),
+    path('api/devices/telemetry/', device_action(DeviceViewSet, 'report_telemetry'), name='device-telemetry'),
+    path('', include('monitoring.urls')),
+]
@@ -0,0 +1,14 @@
+"""
+WSGI config del servicio de firmware (solo endpoints de dispositivos).
+
+    gunicorn config.wsgi_device
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+# Sin setdefault: este punto de entrada siempre usa los settings reducidos
+os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings_device'
+
+application = get_wsgi_application()
@@ -1,14 +1,112 @@
+import secrets
+import uuid
 from django.contrib import admin
-from .models import Device
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .filters import filter_details_prefix
+from .models import Device, AccessLog
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador para tablas enormes: evita el COUNT(*) exacto.
+    - Sin filtros en PostgreSQL usa la estimación del planner (pg_class.reltuples).
+    - Con filtros cuenta como mucho MAX_COUNT filas (COUNT sobre un subquery con LIMIT).
+    Con pocas filas se cuenta de forma exacta.
+    """
+    EXACT_BELOW = 10000
+    MAX_COUNT = 100000
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 si la tabla nunca se ha analizado
+        return row[0] if row and row[0] >= 0 else None
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None and estimate >= self.EXACT_BELOW:
+            return estimate
+        return self.object_list.values('pk')[:self.MAX_COUNT].count()
+
 
 @admin.action(description='Regenerate api_key for selected devices')
 def regenerate_api_key(modeladmin, request, queryset):
-    import secrets
-    for device in queryset:
-        device.api_key = secrets.token_hex(32)
-        device.save(update_fields=['api_key'])
+    # Un UPDATE por lote (CASE WHEN) en lugar de un save() por dispositivo
+    devices = [Device(pk=pk, api_key=secrets.token_hex(32)) for pk in queryset.values_list('pk', flat=True)]
+    Device.objects.bulk_update(devices, ['api_key'], batch_size=500)
+    modeladmin.message_user(request, f"api_key regenerada en {len(devices)} dispositivos.")
+
+
+@admin.action(description='Activate selected devices')
+def activate_devices(modeladmin, request, queryset):
+    updated = queryset.update(is_active=True)
+    modeladmin.message_user(request, f"{updated} dispositivos activados.")
+
+
+@admin.action(description='Deactivate selected devices')
+def deactivate_devices(modeladmin, request, queryset):
+    updated = queryset.update(is_active=False)
+    modeladmin.message_user(request, f"{updated} dispositivos desactivados.")
+
 
 @admin.register(Device)
 class DeviceAdmin(admin.ModelAdmin):
     list_display = ('id','name','uid','device_type','lock','user','is_active','api_key')
-    actions = [regenerate_api_key]
+    list_select_related = ('lock', 'user')
+    list_filter = ('device_type', 'is_active')
+    # uid y api_key son únicos (índice); el nombre solo por prefijo
+    search_fields = ('=uid', '=api_key', '^name')
+    raw_id_fields = ('lock', 'user')
+    readonly_fields = ('date_added', 'last_used')
+    ordering = ('-id',)
+    actions = [regenerate_api_key, activate_devices, deactivate_devices]
+
+
+@admin.register(AccessLog)
+class AccessLogAdmin(admin.ModelAdmin):
+    """
+    Registro de auditoría (millones de filas): solo lectura, paginación sin COUNT(*)
+    exacto, sin facetas ni date_hierarchy, y búsquedas que usan los índices de AccessLog.
+    """
+    list_display = ('id', 'timestamp', 'lock', 'device', 'user', 'access_type', 'result')
+    # Device.__str__ usa device.lock
+    list_select_related = ('lock', 'device__lock', 'user')
+    list_filter = ('result', 'access_type')
+    raw_id_fields = ('lock', 'device', 'user')
+    search_fields = ('details',)
+    search_help_text = "UUID de cerradura, id de registro o prefijo de details (distingue mayúsculas)."
+    ordering = ('-timestamp',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            return queryset.filter(lock__uuid=uuid.UUID(term)), False
+        except ValueError:
+            pass
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        # startswith (no icontains): usa accesslog_details_prefix_idx (text_pattern_ops)
+        return filter_details_prefix(queryset, term), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,169 @@
+# locks/anomaly.py
+"""
+Detección incremental de anomalías en los intentos de acceso.
+
+Se alimenta desde validate_pin con cada evento (nunca vuelve a leer AccessLog) y
+mantiene en la caché de Django contadores de ventana deslizante por cerradura,
+dispositivo e IP. La ventana se divide en BUCKETS cubos que expiran solos, así que
+la memoria por clave es fija (O(1)):
+
+- FAILURES:     ráfaga de intentos fallidos en la ventana.
+- CODE_SWEEP:   muchos códigos distintos probados en la ventana. Se cuenta con un
+                bitmap de 63 posiciones por cubo (hash del código); la unión (OR) de los
+                cubos de la ventana da los códigos distintos sin contar dos veces el que
+                se repite en varios cubos. Es una aproximación de conteo lineal que no
+                guarda los códigos.
+- UNUSUAL_HOUR: acceso en una hora (UTC) que históricamente casi no se usa en la cerradura.
+                El histograma por hora se lleva por periodos de UNUSUAL_HOUR_PERIOD_DAYS
+                y se evalúa sobre el periodo anterior más el actual: lo más viejo deja de
+                contar de forma explícita, no cuando expira una clave. No se alerta hasta
+                que la cerradura tiene un periodo completo de historial.
+
+Al cruzar un umbral se crea un SecurityAlert (con cooldown para no duplicarlos) y,
+si BLOCK_SECONDS > 0, el dispositivo queda bloqueado temporalmente para validar PINs.
+"""
+import hashlib
+import ipaddress
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from .models import SecurityAlert
+
+logger = logging.getLogger(__name__)
+
+# 63 bits: la suma de todos cabe en un entero con signo de 64 bits (INCR de Redis)
+_CODE_SLOTS = 63
+
+
+def _conf(name):
+    return settings.ANOMALY_DETECTION[name]
+
+
+def _bucket_width():
+    return max(1, _conf('WINDOW_SECONDS') // _conf('BUCKETS'))
+
+
+def _incr(key, timeout, amount=1):
+    # add() + incr() es atómico en los backends de caché compartida (Redis/Memcached)
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, amount)
+    except ValueError:  # expiró entre add() e incr()
+        cache.set(key, amount, timeout)
+        return amount
+
+
+def _window_values(prefix, bucket):
+    keys = [f"{prefix}:{b}" for b in range(bucket - _conf('BUCKETS') + 1, bucket + 1)]
+    return cache.get_many(keys).values()
+
+
+def _window_sum(prefix, bucket):
+    return sum(_window_values(prefix, bucket))
+
+
+def _window_distinct(prefix, bucket):
+    union = 0
+    for bitmap in _window_values(prefix, bucket):
+        union |= bitmap
+    return union.bit_count()
+
+
+def _block_key(device_id):
+    return f"anomaly:block:device:{device_id}"
+
+
+def is_blocked(device):
+    return cache.get(_block_key(device.pk)) is not None
+
+
+def client_ip(request):
+    """
+    IP del cliente para los contadores y SecurityAlert.ip_address: REMOTE_ADDR o, con
+    REST_FRAMEWORK['NUM_PROXIES'], la entrada de X-Forwarded-For que añadió el proxy de
+    confianza (como DRF). Nunca la cabecera entera; None si no es una IP válida.
+    """
+    ip = request.META.get('REMOTE_ADDR')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    num_proxies = api_settings.NUM_PROXIES
+    if num_proxies and forwarded:
+        addrs = [addr.strip() for addr in forwarded.split(',')]
+        ip = addrs[-min(num_proxies, len(addrs))]
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return None
+
+
+def _raise_alert(kind, lock, device, ip, details, block=False):
+    scope = device.pk if device else ip
+    # Cooldown: un solo aviso del mismo tipo por cerradura/origen mientras dure
+    if not cache.add(f"anomaly:alert:{kind}:{lock.pk}:{scope}", 1, _conf('ALERT_COOLDOWN_SECONDS')):
+        return None
+    blocked_for = _conf('BLOCK_SECONDS') if block and device else 0
+    if blocked_for:
+        cache.set(_block_key(device.pk), kind, blocked_for)
+        details = f"{details} Dispositivo bloqueado {blocked_for}s."
+    logger.warning("Anomalía %s en lock %s (device=%s ip=%s): %s", kind, lock.pk, scope, ip, details)
+    return SecurityAlert.objects.create(lock=lock, device=device, ip_address=ip, kind=kind, details=details)
+
+
+def observe(lock, device, ip, code, granted, now=None):
+    """Registra un intento de acceso y devuelve la lista de alertas generadas."""
+    now = now or time.time()
+    width = _bucket_width()
+    bucket = int(now // width)
+    ttl = _conf('WINDOW_SECONDS') + width
+    alerts = []
+
+    if not granted:
+        scopes = [('lock', lock.pk), ('device', device.pk if device else None), ('ip', ip)]
+        code_slot = int(hashlib.sha256(str(code).encode()).hexdigest()[:8], 16) % _CODE_SLOTS
+        for scope, ident in scopes:
+            if ident is None:
+                continue
+            prefix = f"anomaly:{scope}:{ident}"
+
+            _incr(f"{prefix}:fail:{bucket}", ttl)
+            failures = _window_sum(f"{prefix}:fail", bucket)
+            if failures >= _conf('MAX_FAILURES'):
+                alerts.append(_raise_alert(
+                    SecurityAlert.FAILURE_BURST, lock, device, ip,
+                    f"{failures} intentos fallidos en {_conf('WINDOW_SECONDS')}s ({scope}).",
+                    block=True,
+                ))
+
+            # add() garantiza que cada bit se suma una sola vez por cubo: incr() equivale a un OR
+            if code and cache.add(f"{prefix}:slot:{bucket}:{code_slot}", 1, ttl):
+                _incr(f"{prefix}:codes:{bucket}", ttl, 1 << code_slot)
+            distinct = _window_distinct(f"{prefix}:codes", bucket)
+            if distinct >= _conf('MAX_DISTINCT_CODES'):
+                alerts.append(_raise_alert(
+                    SecurityAlert.CODE_SWEEP, lock, device, ip,
+                    f"~{distinct} códigos distintos probados en {_conf('WINDOW_SECONDS')}s ({scope}).",
+                    block=True,
+                ))
+
+    # Histograma por hora del día de la cerradura: 24 contadores por periodo
+    hour = int(now // 3600) % 24
+    period = _conf('UNUSUAL_HOUR_PERIOD_DAYS') * 24 * 3600
+    epoch = int(now // period)
+    hour_prefix = f"anomaly:lock:{lock.pk}:hour"
+    # Primer evento visto (sin caducidad); si la caché lo desaloja solo se retrasa la evaluación
+    cache.add(f"{hour_prefix}:since", now, None)
+    since = cache.get(f"{hour_prefix}:since", now)
+    if now - since >= period:
+        history = cache.get_many([f"{hour_prefix}:{e}:{h}" for e in (epoch - 1, epoch) for h in range(24)])
+        total = sum(history.values())
+        at_hour = history.get(f"{hour_prefix}:{epoch - 1}:{hour}", 0) + history.get(f"{hour_prefix}:{epoch}:{hour}", 0)
+        if total >= _conf('UNUSUAL_HOUR_MIN_EVENTS') and at_hour / total < _conf('UNUSUAL_HOUR_MAX_SHARE'):
+            alerts.append(_raise_alert(
+                SecurityAlert.UNUSUAL_HOUR, lock, device, ip,
+                f"Acceso a las {hour:02d}h UTC; históricamente {at_hour} de {total} eventos a esa hora.",
+            ))
+    # El contador del periodo actual se lee durante este periodo y el siguiente
+    _incr(f"{hour_prefix}:{epoch}:{hour}", (epoch + 2) * period - now)
+
+    return [a for a in alerts if a is not None]
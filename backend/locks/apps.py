@@ -5,4 +5,5 @@ class LocksConfig(AppConfig):
     name = 'locks'
 
     def ready(self):
+        import locks.checks  # noqa
         import locks.signals  # noqa
@@ -0,0 +1,218 @@
+# locks/archive.py
+"""
+Archivo en frío de AccessLog.
+
+Las filas anteriores a un corte se mueven a archivos NDJSON comprimidos con gzip,
+particionados por día (ACCESS_LOG_ARCHIVE_DIR/AAAA/MM/accesslog-AAAA-MM-DD[-n].ndjson.gz).
+manifest.json guarda por cada archivo un índice mínimo: rango de timestamps,
+número de filas y ids de cerradura presentes. Las consultas leen solo el manifest y
+abren únicamente los archivos cuyo índice puede contener la cerradura y el rango pedidos.
+"""
+import gzip
+import heapq
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from .models import AccessLog
+from .sharding import shard_aliases
+
+MANIFEST = 'manifest.json'
+_FIELDS = ('id', 'lock_id', 'user_id', 'device_id', 'access_type', 'result', 'timestamp', 'details')
+
+
+def archive_dir():
+    return Path(settings.ACCESS_LOG_ARCHIVE_DIR)
+
+
+def load_manifest():
+    try:
+        with open(archive_dir() / MANIFEST, encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {'files': []}
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _save_manifest(manifest):
+    _write_atomic(archive_dir() / MANIFEST, json.dumps(manifest, indent=1).encode())
+
+
+def _partition_path(day, manifest):
+    base = f"{day:%Y}/{day:%m}/accesslog-{day.isoformat()}"
+    existing = {entry['path'] for entry in manifest['files']}
+    path, part = f"{base}.ndjson.gz", 1
+    while path in existing:
+        part += 1
+        path = f"{base}-{part}.ndjson.gz"
+    return path
+
+
+def _write_partition(day, rows, manifest):
+    """Escribe un archivo del día y devuelve su entrada de índice."""
+    path = _partition_path(day, manifest)
+    lines = ''.join(json.dumps(row, default=str) + '\n' for row in rows)
+    _write_atomic(archive_dir() / path, gzip.compress(lines.encode(), compresslevel=6))
+    return {
+        'path': path,
+        'min_ts': rows[0]['timestamp'].isoformat(),
+        'max_ts': rows[-1]['timestamp'].isoformat(),
+        'count': len(rows),
+        'lock_ids': sorted({row['lock_id'] for row in rows}),
+    }
+
+
+def archive_before(cutoff, chunk_size=5000, dry_run=False, log=None):
+    """
+    Mueve a archivos las filas con timestamp < cutoff, un día cada vez.
+    Para cada día: se escribe el archivo, se actualiza el manifest y después se borran
+    las filas. Si el proceso se corta entre ambos pasos, las filas quedarían en los dos
+    sitios; iter_archived() y la vista eliminan duplicados por id.
+    """
+    manifest = load_manifest()
+    totals = {'files': 0, 'rows': 0}
+
+    def flush(alias, day, rows):
+        if not rows:
+            return
+        if not dry_run:
+            entry = _write_partition(day, rows, manifest)
+            manifest['files'].append(entry)
+            _save_manifest(manifest)
+            ids = [row['id'] for row in rows]
+            with transaction.atomic(using=alias):
+                for start in range(0, len(ids), chunk_size):
+                    AccessLog.objects.using(alias).filter(pk__in=ids[start:start + chunk_size]).delete()
+        totals['files'] += 1
+        totals['rows'] += len(rows)
+        if log:
+            log(f"{alias} {day.isoformat()}: {len(rows)} filas")
+
+    # Cada shard se archiva por separado (varios archivos por día si hay varios shards)
+    for alias in shard_aliases():
+        qs = AccessLog.objects.using(alias).filter(timestamp__lt=cutoff).order_by('timestamp', 'id').values(*_FIELDS)
+        current_day, rows = None, []
+        for row in qs.iterator(chunk_size=chunk_size):
+            day = row['timestamp'].date()
+            if day != current_day:
+                flush(alias, current_day, rows)
+                current_day, rows = day, []
+            rows.append(row)
+        flush(alias, current_day, rows)
+    return totals
+
+
+def _matches(record, ts, lookups, lock_ids):
+    if lock_ids is not None and record['lock_id'] not in lock_ids:
+        return False
+    checks = (
+        ('lock_id', 'lock_id'), ('device_id', 'device_id'), ('user_id', 'user_id'),
+        ('access_type', 'access_type'), ('result', 'result'),
+    )
+    for lookup, field in checks:
+        if lookup in lookups and record[field] != lookups[lookup]:
+            return False
+    if 'timestamp__gte' in lookups and ts < lookups['timestamp__gte']:
+        return False
+    if 'timestamp__lt' in lookups and ts >= lookups['timestamp__lt']:
+        return False
+    prefix = lookups.get('details__startswith')
+    if prefix and not (record['details'] or '').startswith(prefix):
+        return False
+    return True
+
+
+def archived_range():
+    """(min_ts, max_ts) de todo lo archivado, o None si no hay nada."""
+    files = load_manifest()['files']
+    if not files:
+        return None
+    return (
+        min(parse_datetime(f['min_ts']) for f in files),
+        max(parse_datetime(f['max_ts']) for f in files),
+    )
+
+
+def _wanted_locks(lookups, lock_ids):
+    wanted = set(lock_ids) if lock_ids is not None else None
+    if 'lock_id' in lookups:
+        wanted = {lookups['lock_id']} & wanted if wanted is not None else {lookups['lock_id']}
+    return wanted
+
+
+def _candidate_files(lookups, wanted):
+    """Entradas del manifest que pueden tener registros pedidos (sin abrir los archivos)."""
+    since = lookups.get('timestamp__gte')
+    until = lookups.get('timestamp__lt')
+    for entry in load_manifest()['files']:
+        if since and parse_datetime(entry['max_ts']) < since:
+            continue
+        if until and parse_datetime(entry['min_ts']) >= until:
+            continue
+        if wanted is not None and wanted.isdisjoint(entry['lock_ids']):
+            continue
+        yield entry
+
+
+def _read(entry, lookups, wanted):
+    with gzip.open(archive_dir() / entry['path'], 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            record = json.loads(line)
+            ts = datetime.fromisoformat(record['timestamp'])
+            if _matches(record, ts, lookups, wanted):
+                record['timestamp'] = ts
+                yield record
+
+
+def iter_archived(lookups, lock_ids=None):
+    """
+    Registros archivados que cumplen los lookups de locks.filters.parse_access_log_filters().
+    lock_ids restringe además a las cerraduras visibles (None = todas).
+    Cada registro sale con 'timestamp' como datetime.
+    """
+    wanted = _wanted_locks(lookups, lock_ids)
+    for entry in _candidate_files(lookups, wanted):
+        yield from _read(entry, lookups, wanted)
+
+
+def latest_archived(lookups, lock_ids=None, limit=1000):
+    """
+    Los `limit` registros más recientes de iter_archived(), del más nuevo al más antiguo,
+    y si se han dejado fuera otros. Memoria acotada a `limit` registros: los archivos se
+    leen del más reciente al más antiguo y se para en cuanto los que quedan ya no pueden
+    mejorar el resultado.
+    """
+    wanted = _wanted_locks(lookups, lock_ids)
+    entries = sorted(_candidate_files(lookups, wanted), key=lambda entry: entry['max_ts'], reverse=True)
+    heap, seen, truncated = [], set(), False
+    for entry in entries:
+        if len(heap) >= limit and parse_datetime(entry['max_ts']) < heap[0][0]:
+            truncated = True
+            break
+        for record in _read(entry, lookups, wanted):
+            if record['id'] in seen:
+                continue  # archivado dos veces (ver archive_before())
+            item = (record['timestamp'], record['id'], record)
+            if len(heap) < limit:
+                seen.add(record['id'])
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                seen.add(record['id'])
+                seen.discard(heapq.heapreplace(heap, item)[1])
+                truncated = True
+            else:
+                truncated = True
+    return [record for _, _, record in sorted(heap, key=lambda item: item[:2], reverse=True)], truncated
@@ -0,0 +1,83 @@
+# locks/checks.py
+"""
+Comprobaciones del sistema de locks (manage.py check).
+
+- locks.E001: con sharding, las secuencias de ids de AccessLog deben estar intercaladas
+  entre shards (rebalance_shards --configure-sequences); si no, dos shards generan los
+  mismos ids y mover filas entre ellos choca. Usa la base de datos, así que va con la
+  etiqueta 'database': la ejecutan `migrate` y `check --database <alias>`. Mientras algún
+  shard no tiene la tabla (alta de un shard a medio migrar) no se comprueba.
+- locks.E002: sin DEBUG y con firma de dispositivos, la caché 'default' debe ser compartida
+  entre procesos. El anti-replay de locks.signing se apoya en cache.add(); con una caché
+  local a cada proceso un nonce ya usado se acepta en cualquier otro worker.
+"""
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+from . import sharding
+from .models import AccessLog
+
+
+# Locales al proceso (o, la de ficheros, sin add() atómico entre procesos)
+_PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+}
+
+
+@checks.register()
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.DEBUG or not settings.DEVICE_SIGNING_KEYS:
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in _PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Error(
+        f"La caché 'default' ({backend}) no se comparte entre procesos: los nonces de la firma "
+        f"de dispositivos se podrían reutilizar contra otro worker.",
+        hint="Configura CACHE_URL con una caché compartida (p.ej. redis://host:6379/0).",
+        id='locks.E002',
+    )]
+
+
+def _sequence(connection, table):
+    """(incremento, inicio) de la secuencia de ids de `table` en PostgreSQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT seqincrement, seqstart FROM pg_sequence "
+            "WHERE seqrelid = pg_get_serial_sequence(%s, 'id')::regclass",
+            [table],
+        )
+        return cursor.fetchone()
+
+
+@checks.register(checks.Tags.database)
+def check_shard_sequences(app_configs=None, databases=None, **kwargs):
+    aliases = sharding.shard_aliases()
+    if not sharding.is_sharded() or not set(databases or ()) & set(aliases):
+        return []
+    table = AccessLog._meta.db_table
+    if any(table not in connections[alias].introspection.table_names() for alias in aliases):
+        return []
+
+    total = len(aliases)
+    errors = []
+    for index, alias in enumerate(aliases):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            errors.append(checks.Error(
+                f"El shard '{alias}' no es PostgreSQL: sus ids de AccessLog no se pueden intercalar "
+                f"con los de los demás shards.",
+                id='locks.E001',
+            ))
+            continue
+        row = _sequence(connection, table)
+        if row is None or row[0] != total or row[1] % total != index:
+            errors.append(checks.Error(
+                f"La secuencia de ids de AccessLog en '{alias}' no está intercalada entre los "
+                f"{total} shards: los ids pueden repetirse entre shards.",
+                hint="Ejecuta `manage.py rebalance_shards --configure-sequences`.",
+                id='locks.E001',
+            ))
+    return errors
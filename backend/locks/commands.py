@@ -0,0 +1,239 @@
+# locks/commands.py
+"""
+Cola de comandos remotos por cerradura (LockCommand) y su long-poll.
+
+- enqueue(): la app encola un comando. Al hacer commit se despierta a los long-polls que
+  esperan por esa cerradura en este proceso y, en PostgreSQL, se emite un NOTIFY para
+  los demás procesos (un hilo por proceso hace LISTEN y reenvía al registro local).
+- claim(): entrega al firmware los comandos abiertos en orden de id. Mientras haya uno
+  entregado sin confirmar (y dentro de ACK_TIMEOUT_SECONDS) no se entregan los
+  siguientes: el orden por cerradura se mantiene aunque se pierda una respuesta.
+  Sin confirmación se reentrega hasta MAX_DELIVERIES veces; después pasa a FAILED.
+  Los PENDING que pasan de expires_at se marcan EXPIRED y no se entregan nunca. Los ya
+  entregados no caducan mientras esperan confirmación: si vence el plazo sin ella y han
+  pasado de expires_at, se marcan EXPIRED en vez de reentregarse.
+- acknowledge(): el firmware confirma el resultado de cada comando, también si llega
+  tarde a uno entregado y ya caducado (la puerta pudo abrirse: debe quedar registrado).
+
+Los long-polls esperan en un asyncio.Event (views.poll_commands, bajo ASGI) sin conexión
+a la base de datos: release_connections() cierra la del hilo del request antes de esperar.
+El hilo en sí no se libera: es el executor que Django reserva a cada request ASGI y queda
+ocioso durante la espera (un hilo por long-poll abierto).
+"""
+import asyncio
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import LockCommand
+
+logger = logging.getLogger(__name__)
+
+
+def _conf(name):
+    return settings.LOCK_COMMANDS[name]
+
+
+# Registro de long-polls en espera (por proceso)
+_waiters = defaultdict(set)
+_waiters_lock = threading.Lock()
+_listener = None
+
+
+class _Waiter:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self):
+        # Puede llamarse desde cualquier hilo (vista síncrona, hilo de LISTEN)
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout):
+        """True si se despertó antes del timeout."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+
+@contextmanager
+def waiter(lock_id):
+    """
+    Registra un long-poll para la cerradura. Se registra antes de consultar los comandos
+    pendientes para no perder un aviso que llegue entre la consulta y la espera.
+    """
+    _ensure_listener()
+    entry = _Waiter()
+    with _waiters_lock:
+        _waiters[lock_id].add(entry)
+    try:
+        yield entry
+    finally:
+        with _waiters_lock:
+            entries = _waiters.get(lock_id)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del _waiters[lock_id]
+
+
+def wake(lock_id=None):
+    """Despierta los long-polls de una cerradura (o todos con lock_id=None)."""
+    with _waiters_lock:
+        if lock_id is None:
+            entries = [entry for group in _waiters.values() for entry in group]
+        else:
+            entries = list(_waiters.get(lock_id, ()))
+    for entry in entries:
+        entry.notify()
+
+
+def _use_pg_notify():
+    return connections['default'].vendor == 'postgresql'
+
+
+def _listen():
+    """Hilo por proceso: LISTEN en PostgreSQL y reenvío de cada NOTIFY a wake()."""
+    channel = _conf('PG_CHANNEL')
+    while True:
+        wrapper = connections.create_connection('default')
+        try:
+            wrapper.ensure_connection()
+            raw = wrapper.connection
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {channel}")
+            # Pudo haber avisos mientras no había conexión
+            wake()
+            while True:
+                if select.select([raw], [], [], 60) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    notice = raw.notifies.pop(0)
+                    wake(int(notice.payload))
+        except Exception:
+            logger.exception("LISTEN %s interrumpido; reconectando", channel)
+            time.sleep(5)
+        finally:
+            wrapper.close()
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is not None or not _use_pg_notify():
+        return
+    with _waiters_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name='lock-commands-listen', daemon=True)
+            _listener.start()
+
+
+def ttl_for(kind, requested=None):
+    """Caducidad en segundos: la pedida, sin pasar de la máxima del tipo de comando."""
+    maximum = _conf('TTL_SECONDS')[kind]
+    return maximum if requested is None else max(1, min(requested, maximum))
+
+
+def enqueue(lock, kind, user=None, payload=None, ttl=None):
+    now = timezone.now()
+    with transaction.atomic():
+        command = LockCommand.objects.create(
+            lock=lock, kind=kind, payload=payload or {}, created_by=user,
+            expires_at=now + timedelta(seconds=ttl_for(kind, ttl)),
+        )
+        if _use_pg_notify():
+            # Se entrega al hacer commit, igual que on_commit
+            with connections['default'].cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [_conf('PG_CHANNEL'), str(lock.pk)])
+        lock_id = lock.pk
+        transaction.on_commit(lambda: wake(lock_id))
+    return command
+
+
+def expire_overdue(lock_id, now=None):
+    # Solo PENDING: los DELIVERED terminan por confirmación, MAX_DELIVERIES o claim()
+    now = now or timezone.now()
+    return LockCommand.objects.filter(
+        lock_id=lock_id, status=LockCommand.PENDING, expires_at__lte=now,
+    ).update(status=LockCommand.EXPIRED)
+
+
+def claim(lock_id, now=None):
+    """
+    Devuelve (comandos a entregar ahora en orden, retry_at). Los entregados quedan
+    DELIVERED hasta que se confirmen. Si hay uno sin confirmar aún dentro de plazo, no se
+    entrega nada y retry_at indica cuándo vence ese plazo (None en otro caso).
+    """
+    now = now or timezone.now()
+    ack_deadline = now - timedelta(seconds=_conf('ACK_TIMEOUT_SECONDS'))
+    with transaction.atomic():
+        expire_overdue(lock_id, now)
+        open_commands = list(
+            LockCommand.objects.select_for_update()
+            .filter(lock_id=lock_id, status__in=LockCommand.OPEN_STATUSES)
+            .order_by('id')
+        )
+        waiting = [c.delivered_at for c in open_commands
+                   if c.status == LockCommand.DELIVERED and c.delivered_at > ack_deadline]
+        if waiting:
+            return [], min(waiting) + timedelta(seconds=_conf('ACK_TIMEOUT_SECONDS'))
+
+        exhausted = [c.pk for c in open_commands if c.deliveries >= _conf('MAX_DELIVERIES')]
+        if exhausted:
+            LockCommand.objects.filter(pk__in=exhausted).update(
+                status=LockCommand.FAILED, result_detail="Sin confirmación del dispositivo.",
+            )
+        # Entregados sin confirmar y ya caducados: no se reentregan
+        overdue = [c.pk for c in open_commands if c.pk not in exhausted and c.expires_at <= now]
+        if overdue:
+            LockCommand.objects.filter(pk__in=overdue).update(status=LockCommand.EXPIRED)
+        batch = [c for c in open_commands if c.pk not in exhausted and c.pk not in overdue]
+        if batch:
+            LockCommand.objects.filter(pk__in=[c.pk for c in batch]).update(
+                status=LockCommand.DELIVERED, delivered_at=now, deliveries=F('deliveries') + 1,
+            )
+    return batch, None
+
+
+def acknowledge(lock_id, command_id, ok=True, detail=''):
+    """
+    Confirma un comando entregado; devuelve el comando o None si no existe o ya no está
+    abierto. Se acepta también uno que caducó después de entregarse.
+    """
+    with transaction.atomic():
+        command = (
+            LockCommand.objects.select_for_update()
+            .filter(
+                Q(status__in=LockCommand.OPEN_STATUSES)
+                | Q(status=LockCommand.EXPIRED, delivered_at__isnull=False),
+                pk=command_id, lock_id=lock_id,
+            )
+            .first()
+        )
+        if command is None:
+            return None
+        command.status = LockCommand.ACKED if ok else LockCommand.FAILED
+        command.acked_at = timezone.now()
+        command.result_detail = detail or ''
+        command.save(update_fields=['status', 'acked_at', 'result_detail'])
+        # Un long-poll de la misma cerradura puede estar esperando a esta confirmación
+        transaction.on_commit(lambda: wake(lock_id))
+    return command
+
+
+def release_connections():
+    """Cierra las conexiones del hilo actual (antes de que un long-poll se quede esperando)."""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
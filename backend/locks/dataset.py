@@ -0,0 +1,325 @@
+# locks/dataset.py
+"""
+Datos sintéticos para pruebas de capacidad (manage.py generate_dataset).
+
+- Todo sale de random.Random con semillas derivadas de `seed`: con la misma semilla y los
+  mismos tamaños se generan los mismos usuarios, cerraduras, PINs, dispositivos y accesos,
+  sea cual sea el número de workers (cada bloque de accesos tiene su propia semilla).
+- Usuarios, cerraduras, roles, PINs (digest con la clave actual, ver locks.pins) y
+  dispositivos se crean con bulk_create desde el proceso principal.
+- Los AccessLog se generan en bloques de LOG_CHUNK filas en procesos en paralelo, y cada
+  bloque se escribe en el shard de cada cerradura con COPY (PostgreSQL) o executemany.
+  No se usa bulk_create porque `timestamp` es auto_now_add y lo pisaría.
+- Distribución de los accesos: popularidad de cerraduras tipo Zipf, picos a la entrada y
+  salida del trabajo (hora local de TIME_ZONE), menos actividad el fin de semana y ~5% de
+  intentos fallidos.
+
+Con varios shards en PostgreSQL hay que ejecutar antes `rebalance_shards
+--configure-sequences`, como para cualquier escritura en los shards.
+"""
+import csv
+import io
+import multiprocessing
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.utils import timezone
+from . import pins, sharding
+from .models import AccessLog, Device, Lock, Pin, Role, UserRole
+
+LOG_CHUNK = 100_000
+# Roles de los miembros; el propietario solo lo tiene el owner (como locks.signals)
+ROLE_WEIGHTS = {'invitado': 2, 'administrador': 1}
+OWNER_ROLE = 'Propietario'
+DEVICE_TYPES = ['RFID', 'NFC', 'MOBILE']
+ACCESS_TYPE_WEIGHTS = {'PIN': 55, 'RFID': 20, 'NFC': 15, 'MOBILE': 10}
+# Peso de cada hora del día (hora local): picos de entrada y salida
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 5, 12, 14, 8, 6, 6, 7, 6, 5, 6, 8, 12, 13, 9, 6, 4, 3, 2]
+WEEKEND_FACTOR = 0.6
+FAIL_RATE = 0.05
+LOG_COLUMNS = ['lock_id', 'user_id', 'device_id', 'access_type', 'result', 'timestamp', 'details']
+
+
+class DatasetError(Exception):
+    pass
+
+
+def _rng(seed, *parts):
+    return random.Random(':'.join(str(part) for part in (seed, *parts)))
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _ids_by_prefix(model, field, prefix):
+    """Ids en el orden del campo (los nombres generados llevan el índice con ceros)."""
+    return list(
+        model.objects.filter(**{f'{field}__startswith': prefix}).order_by(field).values_list('pk', flat=True)
+    )
+
+
+def create_users(count, prefix, batch_size):
+    User.objects.bulk_create(
+        [
+            User(username=f"{prefix}_user_{i:07d}", email=f"{prefix}_user_{i:07d}@example.com",
+                 password='!dataset')  # '!' = contraseña inutilizable
+            for i in range(count)
+        ],
+        batch_size=batch_size,
+    )
+    return _ids_by_prefix(User, 'username', f"{prefix}_user_")
+
+
+def create_locks(count, user_ids, seed, prefix, batch_size):
+    rng = _rng(seed, 'locks')
+    Lock.objects.bulk_create(
+        [
+            Lock(name=f"{prefix}-lock-{i:07d}", uuid=uuid.UUID(int=rng.getrandbits(128), version=4),
+                 location=f"Edificio {rng.randint(1, 200)}, planta {rng.randint(0, 12)}",
+                 owner_id=rng.choice(user_ids))
+            for i in range(count)
+        ],
+        batch_size=batch_size,
+    )
+    return list(
+        Lock.objects.filter(name__startswith=f"{prefix}-lock-").order_by('name').values_list('pk', 'owner_id', 'uuid')
+    )
+
+
+def create_roles(locks, user_ids, per_lock, seed, batch_size):
+    """
+    Devuelve los miembros (propietario + usuarios con rol) de cada cerradura. bulk_create no
+    dispara create_owner_userrole: el UserRole de propietario del owner se crea aquí.
+    """
+    rng = _rng(seed, 'roles')
+    roles = {name: Role.objects.get_or_create(name=name)[0].pk for name in ROLE_WEIGHTS}
+    owner_role = Role.objects.get_or_create(name=OWNER_ROLE)[0].pk
+    role_names, role_weights = list(ROLE_WEIGHTS), list(ROLE_WEIGHTS.values())
+    members, assignments = [], []
+    for lock_id, owner_id, _ in locks:
+        assignments.append(UserRole(user_id=owner_id, lock_id=lock_id, role_id=owner_role))
+        users = [u for u in rng.sample(user_ids, min(per_lock + 1, len(user_ids))) if u != owner_id][:per_lock]
+        members.append([owner_id, *users])
+        for user_id in users:
+            role = rng.choices(role_names, role_weights)[0]
+            assignments.append(UserRole(user_id=user_id, lock_id=lock_id, role_id=roles[role]))
+    UserRole.objects.bulk_create(assignments, batch_size=batch_size, ignore_conflicts=True)
+    return members, len(assignments)
+
+
+def create_pins(locks, members, per_lock, temporary_ratio, days, seed, batch_size, now):
+    rng = _rng(seed, 'pins')
+    created = 0
+    batch = []
+    for (lock_id, *_), lock_members in zip(locks, members):
+        for code in rng.sample(range(100000, 1000000), per_lock):
+            pin = Pin(lock_id=lock_id, created_by_id=rng.choice(lock_members))
+            pin.digest, pin.key_version = pins.make_digest(lock_id, code)
+            if rng.random() < temporary_ratio:
+                # Ventanas pasadas, en curso y futuras
+                pin.is_temporary = True
+                pin.start_time = now + timedelta(days=rng.uniform(-days, 7))
+                pin.end_time = pin.start_time + timedelta(hours=rng.uniform(1, 24 * 14))
+            batch.append(pin)
+        if len(batch) >= batch_size:
+            created += len(Pin.objects.bulk_create(batch, batch_size=batch_size))
+            batch = []
+    created += len(Pin.objects.bulk_create(batch, batch_size=batch_size))
+    return created
+
+
+def create_devices(locks, members, per_lock, seed, prefix, batch_size):
+    """Devuelve los dispositivos de cada cerradura como [(id, user_id, uid), ...]."""
+    rng = _rng(seed, 'devices')
+    devices = [
+        Device(lock_id=lock_id, user_id=rng.choice(lock_members), device_type=rng.choice(DEVICE_TYPES),
+               uid=f"{prefix}-dev-{index:07d}-{j:02d}", name=f"Dispositivo {j + 1}",
+               api_key=f"{rng.getrandbits(256):064x}")
+        for index, ((lock_id, *_), lock_members) in enumerate(zip(locks, members))
+        for j in range(per_lock)
+    ]
+    Device.objects.bulk_create(devices, batch_size=batch_size)
+    by_lock = {lock_id: [] for lock_id, *_ in locks}
+    rows = Device.objects.filter(uid__startswith=f"{prefix}-dev-").order_by('uid').values_list(
+        'pk', 'lock_id', 'user_id', 'uid',
+    )
+    for device_id, lock_id, user_id, uid in rows:
+        by_lock[lock_id].append((device_id, user_id, uid))
+    return [by_lock[lock_id] for lock_id, *_ in locks], len(devices)
+
+
+# --- AccessLog en paralelo ---
+
+_context = None
+
+
+def _init_worker(context):
+    global _context
+    _context = context
+
+
+def _day_starts(now, days):
+    local_now = timezone.localtime(now)
+    today = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+def _insert_logs(alias, rows, batch_size):
+    connection = connections[alias]
+    table = connection.ops.quote_name(AccessLog._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in LOG_COLUMNS)
+    for batch in _chunks(rows, batch_size):
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    [*row[:5], row[5].isoformat(), row[6]] for row in batch
+                )
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            else:
+                placeholders = ', '.join(['%s'] * len(LOG_COLUMNS))
+                adapt = connection.ops.adapt_datetimefield_value
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                    [(*row[:5], adapt(row[5]), row[6]) for row in batch],
+                )
+
+
+def _generate_logs(task):
+    """Genera e inserta un bloque de AccessLog; la semilla depende solo del índice del bloque."""
+    index, count, seed, batch_size = task
+    ctx = _context
+    rng = _rng(seed, 'logs', index)
+    now = ctx['now']
+    lock_indexes = rng.choices(range(len(ctx['lock_ids'])), cum_weights=ctx['lock_weights'], k=count)
+    days = rng.choices(range(len(ctx['day_starts'])), cum_weights=ctx['day_weights'], k=count)
+    hours = rng.choices(range(24), cum_weights=ctx['hour_weights'], k=count)
+    types = rng.choices(list(ACCESS_TYPE_WEIGHTS), list(ACCESS_TYPE_WEIGHTS.values()), k=count)
+
+    by_alias = {}
+    for lock_index, day, hour, access_type in zip(lock_indexes, days, hours, types):
+        timestamp = ctx['day_starts'][day] + timedelta(hours=hour, seconds=rng.random() * 3600)
+        if timestamp > now:
+            timestamp -= timedelta(days=1)
+        devices = ctx['devices'][lock_index]
+        device_id, device_user, uid = rng.choice(devices) if devices else (None, None, 'unknown')
+        if rng.random() < FAIL_RATE:
+            result, user_id = 'FAIL', None
+        else:
+            result = 'SUCCESS'
+            user_id = device_user if access_type != 'PIN' else rng.choice(ctx['members'][lock_index])
+        by_alias.setdefault(ctx['aliases'][lock_index], []).append(
+            (ctx['lock_ids'][lock_index], user_id, device_id, access_type, result, timestamp,
+             f"Checked by device {uid}")
+        )
+    for alias, rows in by_alias.items():
+        _insert_logs(alias, rows, batch_size)
+    connections.close_all()
+    return count
+
+
+def create_access_logs(locks, members, devices, count, days, seed, workers, batch_size, now, log=None):
+    rng = _rng(seed, 'popularity')
+    ranks = list(range(len(locks)))
+    rng.shuffle(ranks)
+    day_starts = _day_starts(now, days)
+    aliases = sharding.shard_aliases()
+    context = {
+        'now': now,
+        'lock_ids': [lock_id for lock_id, *_ in locks],
+        'lock_weights': list(accumulate(1 / (rank + 1) ** 0.8 for rank in ranks)),
+        'members': members,
+        'devices': devices,
+        # Cerraduras recién creadas: sin LockShard, su shard es el del hash del uuid
+        'aliases': [sharding.hashed_shard(lock_uuid, aliases) if len(aliases) > 1 else aliases[0]
+                    for _, _, lock_uuid in locks],
+        'day_starts': day_starts,
+        'day_weights': list(accumulate(WEEKEND_FACTOR if day.weekday() >= 5 else 1 for day in day_starts)),
+        'hour_weights': list(accumulate(HOURLY_WEIGHTS)),
+    }
+    tasks = [
+        (index, min(LOG_CHUNK, count - start), seed, batch_size)
+        for index, start in enumerate(range(0, count, LOG_CHUNK))
+    ]
+    # SQLite admite un solo escritor: en paralelo solo se bloquearían entre sí
+    if any(connections[alias].vendor == 'sqlite' for alias in set(context['aliases'])):
+        workers = 1
+    # Los workers heredan Django ya configurado y el contexto por fork (Linux)
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        workers = 1
+
+    done = 0
+    if workers <= 1:
+        _init_worker(context)
+        for task in tasks:
+            done += _generate_logs(task)
+            if log:
+                log(f"{done}/{count} accesos")
+        return done
+
+    # Los procesos hijos no pueden heredar las conexiones abiertas
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+        initializer=_init_worker, initargs=(context,),
+    ) as pool:
+        for written in pool.map(_generate_logs, tasks):
+            done += written
+            if log:
+                log(f"{done}/{count} accesos")
+    return done
+
+
+def analyze(aliases):
+    """PostgreSQL: estadísticas al día tras la carga masiva (el autovacuum tardaría)."""
+    for alias in aliases:
+        connection = connections[alias]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(AccessLog._meta.db_table)}")
+
+
+def generate(users, locks, roles_per_lock, pins_per_lock, temporary_ratio, devices_per_lock, logs,
+             days, seed=42, workers=1, batch_size=10000, prefix='gen', until=None, log=None):
+    """
+    Crea el conjunto de datos completo; devuelve {modelo: filas creadas}.
+    `until` (date): último día de accesos. Sin él la historia acaba ahora y las fechas
+    dependen del momento en que se genera.
+    """
+    log = log or (lambda message: None)
+    if until is None:
+        now = timezone.now()
+    else:
+        now = timezone.make_aware(datetime(until.year, until.month, until.day) + timedelta(days=1))
+    if User.objects.filter(username__startswith=f"{prefix}_user_").exists():
+        raise DatasetError(f"Ya hay datos generados con el prefijo '{prefix}'; usa otro --prefix.")
+    if users < 1 or locks < 1:
+        raise DatasetError("Hacen falta al menos un usuario y una cerradura.")
+
+    started = datetime.now()
+    user_ids = create_users(users, prefix, batch_size)
+    log(f"{len(user_ids)} usuarios")
+    lock_rows = create_locks(locks, user_ids, seed, prefix, batch_size)
+    log(f"{len(lock_rows)} cerraduras")
+    members, role_count = create_roles(lock_rows, user_ids, roles_per_lock, seed, batch_size)
+    log(f"{role_count} roles asignados")
+    pin_count = create_pins(lock_rows, members, pins_per_lock, temporary_ratio, days, seed, batch_size, now)
+    log(f"{pin_count} PINs")
+    devices, device_count = create_devices(lock_rows, members, devices_per_lock, seed, prefix, batch_size)
+    log(f"{device_count} dispositivos")
+    log_count = create_access_logs(
+        lock_rows, members, devices, logs, days, seed, workers, batch_size, now, log=log,
+    ) if logs else 0
+    analyze(sharding.shard_aliases())
+    log(f"Terminado en {(datetime.now() - started).total_seconds():.1f}s")
+    return {
+        'users': len(user_ids), 'locks': len(lock_rows), 'user_roles': role_count,
+        'pins': pin_count, 'devices': device_count, 'access_logs': log_count,
+    }
@@ -0,0 +1,39 @@
+# locks/events.py
+"""
+Escritura de eventos de acceso.
+
+record_access() crea el AccessLog y, si hay webhook configurado, su OutboxEvent en la
+misma transacción: o se guardan los dos o ninguno, sin llamadas HTTP en el request.
+Ambos van al shard de la cerradura (locks.sharding), así la transacción sigue siendo local.
+"""
+from django.conf import settings
+from django.db import transaction
+from .models import AccessLog, OutboxEvent
+from .sharding import shard_for_lock
+
+ACCESS_EVENT = 'access'
+
+
+def access_payload(log):
+    return {
+        'id': log.pk,
+        'lock': str(log.lock.uuid),
+        'user': log.user_id,
+        'device': log.device_id,
+        'access_type': log.access_type,
+        'result': log.result,
+        'timestamp': log.timestamp.isoformat(),
+        'details': log.details,
+    }
+
+
+def record_access(lock, user, device, access_type, result, details=None):
+    alias = shard_for_lock(lock)
+    with transaction.atomic(using=alias):
+        log = AccessLog.objects.using(alias).create(
+            lock=lock, user=user, device=device,
+            access_type=access_type, result=result, details=details,
+        )
+        if settings.OUTBOX_WEBHOOK_URL:
+            OutboxEvent.objects.using(alias).create(lock=lock, event_type=ACCESS_EVENT, payload=access_payload(log))
+    return log
@@ -0,0 +1,127 @@
+# locks/filters.py
+"""
+Filtros de servidor para AccessLogViewSet.
+
+Parámetros (todos opcionales y combinables):
+    lock, lock_uuid, device, user, access_type, result,
+    since / until (ISO 8601), search (prefijo de `details`)
+
+Cada combinación habitual está respaldada por un índice de AccessLog.Meta.indexes;
+`manage.py check_accesslog_plans` verifica que ninguna acabe en un full scan.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models.functions import Left
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import AccessLog, Lock
+from .sharding import is_sharded
+
+ACCESS_TYPES = {choice for choice, _ in AccessLog.ACCESS_TYPES}
+RESULTS = {choice for choice, _ in AccessLog.RESULT_CHOICES}
+# Longitud de la expresión LEFT(details, N) de accesslog_details_prefix_idx (migración 0015)
+DETAILS_PREFIX_LENGTH = 64
+
+
+def _int_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Debe ser un entero."})
+
+
+def _datetime_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:  # bien formada pero inexistente (mes 13, 31 de febrero...)
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Fecha/hora ISO 8601 inválida."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+def _choice_param(params, name, choices):
+    value = params.get(name)
+    if not value:
+        return None
+    value = value.upper()
+    if value not in choices:
+        raise ValidationError({name: f"Valor inválido. Opciones: {', '.join(sorted(choices))}."})
+    return value
+
+
+def parse_access_log_filters(params):
+    """Valida los parámetros y devuelve los lookups del ORM equivalentes."""
+    lookups = {}
+
+    lock_id = _int_param(params, 'lock')
+    if lock_id is not None:
+        lookups['lock_id'] = lock_id
+    lock_uuid = params.get('lock_uuid')
+    if lock_uuid:
+        lookups['lock__uuid'] = lock_uuid
+    device_id = _int_param(params, 'device')
+    if device_id is not None:
+        lookups['device_id'] = device_id
+    user_id = _int_param(params, 'user')
+    if user_id is not None:
+        lookups['user_id'] = user_id
+
+    access_type = _choice_param(params, 'access_type', ACCESS_TYPES)
+    if access_type:
+        lookups['access_type'] = access_type
+    result = _choice_param(params, 'result', RESULTS)
+    if result:
+        lookups['result'] = result
+
+    since = _datetime_param(params, 'since')
+    if since:
+        lookups['timestamp__gte'] = since
+    until = _datetime_param(params, 'until')
+    if until:
+        lookups['timestamp__lt'] = until
+
+    search = params.get('search')
+    if search:
+        lookups['details__startswith'] = search
+
+    return lookups
+
+
+def filter_details_prefix(queryset, prefix):
+    """
+    details LIKE 'prefijo%' a través de LEFT(details, DETAILS_PREFIX_LENGTH), la expresión
+    indexada (el índice sobre el campo entero fallaba con filas grandes en PostgreSQL).
+    """
+    queryset = queryset.annotate(
+        details_prefix=Left('details', DETAILS_PREFIX_LENGTH),
+    ).filter(details_prefix__startswith=prefix[:DETAILS_PREFIX_LENGTH])
+    if len(prefix) > DETAILS_PREFIX_LENGTH:
+        queryset = queryset.filter(details__startswith=prefix)
+    return queryset
+
+
+def filter_access_logs(queryset, params):
+    lookups = parse_access_log_filters(params)
+    search = lookups.pop('details__startswith', None)
+    if search:
+        queryset = filter_details_prefix(queryset, search)
+    try:
+        if 'lock__uuid' in lookups and is_sharded():
+            # En los shards no hay tabla de cerraduras con la que hacer JOIN
+            lock_id = Lock.objects.filter(uuid=lookups.pop('lock__uuid')).values_list('pk', flat=True).first()
+            if lock_id is None or lookups.get('lock_id', lock_id) != lock_id:
+                return queryset.none()
+            lookups['lock_id'] = lock_id
+        return queryset.filter(**lookups)
+    except DjangoValidationError:
+        # p.ej. lock_uuid con formato inválido
+        raise ValidationError({"lock_uuid": "UUID inválido."})
@@ -0,0 +1,39 @@
+# locks/management/commands/archive_access_logs.py
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from locks.archive import archive_before, archive_dir
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los AccessLog anteriores a un corte a archivos NDJSON.gz diarios en "
+        "ACCESS_LOG_ARCHIVE_DIR (consultables desde /api/accesslogs/ con since o include_archived)."
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--before', help="Fecha de corte AAAA-MM-DD (exclusiva, UTC).")
+        group.add_argument('--older-than-days', type=int)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            day = parse_date(options['before'])
+            if day is None:
+                raise CommandError("--before debe ser AAAA-MM-DD")
+            cutoff = datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+        else:
+            # Siempre en un límite de día para que cada partición quede completa
+            cutoff = (timezone.now() - timedelta(days=options['older_than_days'])).replace(
+                hour=0, minute=0, second=0, microsecond=0,
+            )
+
+        self.stdout.write(f"Archivando registros anteriores a {cutoff.isoformat()} en {archive_dir()}")
+        totals = archive_before(
+            cutoff, chunk_size=options['chunk_size'], dry_run=options['dry_run'], log=self.stdout.write,
+        )
+        suffix = " (dry run)" if options['dry_run'] else ""
+        self.stdout.write(f"{totals['rows']} filas en {totals['files']} archivos{suffix}")
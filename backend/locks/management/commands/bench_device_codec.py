@@ -0,0 +1,45 @@
+# locks/management/commands/bench_device_codec.py
+import io
+import timeit
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from locks.renderers import MessagePackParser, MessagePackRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara tamaño de payload y coste de codificar/decodificar en el servidor "
+        "entre JSON y MessagePack para los mensajes del firmware (validate_pin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        n = options['iterations']
+        # (nombre, request del dispositivo, respuesta JSON actual, respuesta compacta)
+        cases = [
+            ('validate_pin granted', {'code': '482913'},
+             {'success': True, 'detail': 'Access granted'}, [1, 0]),
+            ('validate_pin denied', {'code': '000000'},
+             {'success': False, 'detail': 'Access denied'}, [0, 1]),
+        ]
+        codecs = [
+            ('json', JSONParser(), JSONRenderer(), False),
+            ('msgpack', MessagePackParser(), MessagePackRenderer(), True),
+        ]
+
+        self.stdout.write(f"{'caso':24} {'codec':8} {'req B':>6} {'resp B':>7} {'parse µs':>9} {'render µs':>10}")
+        for name, request_body, json_response, compact_response in cases:
+            for codec, parser, renderer, compact in codecs:
+                response = compact_response if compact else json_response
+                raw_request = renderer.render(request_body)
+                raw_response = renderer.render(response)
+
+                parse_s = timeit.timeit(lambda: parser.parse(io.BytesIO(raw_request)), number=n)
+                render_s = timeit.timeit(lambda: renderer.render(response), number=n)
+                self.stdout.write(
+                    f"{name:24} {codec:8} {len(raw_request):6d} {len(raw_response):7d} "
+                    f"{parse_s / n * 1e6:9.2f} {render_s / n * 1e6:10.2f}"
+                )
@@ -0,0 +1,74 @@
+# locks/management/commands/bench_list_rendering.py
+import time
+import uuid
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from config.middleware import brotli
+from config.renderers import ORJSONRenderer
+from locks.models import AccessLog, Device, Lock
+from locks.serializers import AccessLogSerializer, DeviceSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara CPU y bytes al renderizar las listas de AccessLogViewSet y DeviceViewSet: "
+        "JSONRenderer de DRF frente a ORJSONRenderer, y sin comprimir frente a gzip/brotli "
+        "(lo que hace CompressionMiddleware). Usa filas en memoria, sin base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="Filas por respuesta.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _timed(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return result, (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        now = timezone.now()
+        owner = User(pk=1, username='owner', email='owner@example.com')
+        lock = Lock(pk=1, name='Cerradura', uuid=uuid.uuid4(), owner=owner)
+        devices = [
+            Device(pk=i, lock=lock, user=owner, device_type='RFID', uid=f'rfid-{i:06d}',
+                   name=f'Tarjeta {i}', api_key=uuid.uuid4().hex * 2, date_added=now, last_used=now)
+            for i in range(1, rows + 1)
+        ]
+        logs = [
+            AccessLog(pk=i, lock=lock, user=owner, device=devices[i % len(devices)], access_type='PIN',
+                      result='SUCCESS' if i % 7 else 'FAIL', timestamp=now - timedelta(seconds=37 * i),
+                      details=f"PIN validated by device {devices[i % len(devices)].uid}")
+            for i in range(1, rows + 1)
+        ]
+        cases = [
+            ('AccessLogViewSet.list', AccessLogSerializer(logs, many=True).data),
+            ('DeviceViewSet.list', DeviceSerializer(devices, many=True).data),
+        ]
+
+        self.stdout.write(f"{rows} filas por respuesta, media de {repeat} repeticiones")
+        self.stdout.write(f"{'respuesta':22} {'paso':18} {'ms':>8} {'bytes':>9}")
+        for name, data in cases:
+            raw, drf_ms = self._timed(lambda: JSONRenderer().render(data), repeat)
+            fast, orjson_ms = self._timed(lambda: ORJSONRenderer().render(data), repeat)
+            self.stdout.write(f"{name:22} {'json (DRF)':18} {drf_ms:8.2f} {len(raw):9d}")
+            self.stdout.write(
+                f"{name:22} {'orjson':18} {orjson_ms:8.2f} {len(fast):9d}   x{drf_ms / orjson_ms:.1f} más rápido"
+            )
+            gzipped, gzip_ms = self._timed(lambda: compress_string(fast, max_random_bytes=100), repeat)
+            self.stdout.write(
+                f"{name:22} {'+ gzip':18} {gzip_ms:8.2f} {len(gzipped):9d}   {len(gzipped) / len(fast):.0%} del tamaño"
+            )
+            if brotli is not None:
+                compressed, br_ms = self._timed(lambda: brotli.compress(fast, quality=4), repeat)
+                self.stdout.write(
+                    f"{name:22} {'+ brotli (q=4)':18} {br_ms:8.2f} {len(compressed):9d}   "
+                    f"{len(compressed) / len(fast):.0%} del tamaño"
+                )
+            else:
+                self.stdout.write(f"{name:22} {'+ brotli':18} (no instalado)")
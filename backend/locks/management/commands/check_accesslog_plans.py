@@ -0,0 +1,78 @@
+# locks/management/commands/check_accesslog_plans.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from locks.filters import filter_access_logs
+from locks.models import AccessLog, Lock
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre las combinaciones habituales de filtros de AccessLogViewSet "
+        "y falla si alguna recorre la tabla completa (sequential scan)."
+    )
+
+    def cases(self, sample):
+        lock_id = sample.lock_id if sample else 1
+        device_id = sample.device_id if sample and sample.device_id else 1
+        user_id = sample.user_id if sample and sample.user_id else 1
+        since = '2024-01-01T00:00:00Z'
+        return [
+            ('lock', {'lock': lock_id}),
+            ('lock + since', {'lock': lock_id, 'since': since}),
+            ('lock + result FAIL', {'lock': lock_id, 'result': 'FAIL'}),
+            ('lock + access_type', {'lock': lock_id, 'access_type': 'PIN'}),
+            ('lock + range', {'lock': lock_id, 'since': since, 'until': '2024-02-01T00:00:00Z'}),
+            ('device', {'device': device_id}),
+            ('device + since', {'device': device_id, 'since': since}),
+            ('user', {'user': user_id}),
+            ('since (superuser)', {'since': since}),
+        ] + ([
+            # El índice de prefijo (text_pattern_ops) solo existe en PostgreSQL
+            ('search', {'search': 'Checked by'}),
+        ] if connection.vendor == 'postgresql' else [])
+
+    def handle(self, *args, **options):
+        sample = AccessLog.objects.first()
+        failures = []
+        for name, params in self.cases(sample):
+            qs = filter_access_logs(AccessLog.objects.all(), params).order_by('-timestamp')[:50]
+            plan = self.explain(qs)
+            ok = not self.is_full_scan(plan)
+            self.stdout.write(f"{'OK  ' if ok else 'SCAN'} {name}")
+            if options['verbosity'] > 1 or not ok:
+                for line in plan.splitlines():
+                    self.stdout.write(f"       {line}")
+            if not ok:
+                failures.append(name)
+
+        # El filtro de visibilidad de un usuario normal (lock IN subquery) también debe usar índices
+        if sample:
+            owner = Lock.objects.filter(pk=sample.lock_id).values_list('owner', flat=True).first()
+            if owner:
+                qs = AccessLog.objects.filter(lock__in=Lock.objects.visible_to(owner)).order_by('-timestamp')[:50]
+                plan = self.explain(qs)
+                self.stdout.write(f"{'SCAN' if self.is_full_scan(plan) else 'OK  '} visible_to(owner)")
+
+        if failures:
+            raise CommandError(f"Consultas con full scan: {', '.join(failures)}")
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Con tablas pequeñas el planner prefiere seq scan; lo desactivamos para comprobar
+            # que existe un índice utilizable (si aun así hace Seq Scan, no lo hay).
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                return queryset.explain()
+        return queryset.explain()
+
+    def is_full_scan(self, plan):
+        if connection.vendor == 'postgresql':
+            return 'Seq Scan on locks_accesslog' in plan
+        if connection.vendor == 'sqlite':
+            # "SCAN tabla [USING INDEX x]" recorre todo; "SEARCH" es una búsqueda por índice
+            return any(
+                ' SCAN locks_accesslog' in f" {line.split(None, 3)[-1]}"
+                for line in plan.splitlines()
+            )
+        return False
@@ -0,0 +1,69 @@
+# locks/management/commands/deliver_outbox.py
+import asyncio
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from locks import outbox
+from locks.sharding import shard_aliases
+from locks.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = "Worker que entrega los OutboxEvent pendientes al webhook del edificio (OUTBOX_WEBHOOK_URL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vaciar lo pendiente y terminar.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Espera (s) cuando no hay eventos.")
+        parser.add_argument('--partition', help="i/n: procesar solo cerraduras con lock_id %% n == i.")
+        parser.add_argument('--purge-delivered-days', type=int,
+                            help="Borrar eventos entregados con más de N días antes de empezar.")
+
+    def handle(self, *args, **options):
+        if not settings.OUTBOX_WEBHOOK_URL:
+            raise CommandError("OUTBOX_WEBHOOK_URL no está configurado.")
+
+        partition = None
+        if options['partition']:
+            try:
+                index, total = (int(x) for x in options['partition'].split('/'))
+            except ValueError:
+                raise CommandError("--partition debe tener la forma i/n")
+            partition = (index, total)
+
+        if options['purge_delivered_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['purge_delivered_days'])
+            for alias in shard_aliases():
+                deleted, _ = OutboxEvent.objects.using(alias).filter(
+                    status=OutboxEvent.DELIVERED, delivered_at__lt=cutoff,
+                ).delete()
+                self.stdout.write(f"Eventos entregados purgados en {alias}: {deleted}")
+
+        try:
+            asyncio.run(self.run(partition, options['once'], options['interval']))
+        except KeyboardInterrupt:
+            pass
+
+    async def run(self, partition, once, interval):
+        claim = sync_to_async(outbox.claim_due)
+        apply = sync_to_async(outbox.apply_results)
+        async with outbox.make_client() as client:
+            while True:
+                # Una ronda por shard; cada uno tiene su propia tabla de eventos
+                pending = False
+                for alias in shard_aliases():
+                    groups = await claim(partition, using=alias)
+                    if not groups:
+                        continue
+                    pending = True
+                    results = await outbox.deliver(groups, client)
+                    stats = await apply(results, using=alias)
+                    self.stdout.write(
+                        f"[{alias}] entregados={stats['delivered']} fallidos={stats['failed']} dead={stats['dead']}"
+                    )
+                if pending:
+                    continue
+                if once:
+                    return
+                await asyncio.sleep(interval)
@@ -0,0 +1,49 @@
+# locks/management/commands/generate_dataset.py
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from locks import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos deterministas (usuarios, cerraduras, roles, PINs, dispositivos "
+        "y AccessLog) para pruebas de capacidad. Ver locks/dataset.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='gen',
+                            help="Prefijo de usernames/nombres/uids (para generar varios conjuntos).")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--locks', type=int, default=500)
+        parser.add_argument('--roles-per-lock', type=int, default=3)
+        parser.add_argument('--pins-per-lock', type=int, default=5)
+        parser.add_argument('--temporary-ratio', type=float, default=0.3,
+                            help="Fracción de PINs temporales (con ventanas pasadas, en curso y futuras).")
+        parser.add_argument('--devices-per-lock', type=int, default=3)
+        parser.add_argument('--logs', type=int, default=1_000_000, help="Número de AccessLog.")
+        parser.add_argument('--days', type=int, default=90, help="Días de historia de los accesos.")
+        parser.add_argument('--until', help="Último día de accesos AAAA-MM-DD (fechas reproducibles; por defecto hoy).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            until = parse_date(options['until'])
+            if until is None:
+                raise CommandError("--until debe ser AAAA-MM-DD")
+        try:
+            counts = dataset.generate(
+                users=options['users'], locks=options['locks'],
+                roles_per_lock=options['roles_per_lock'], pins_per_lock=options['pins_per_lock'],
+                temporary_ratio=options['temporary_ratio'], devices_per_lock=options['devices_per_lock'],
+                logs=options['logs'], days=options['days'], seed=options['seed'],
+                workers=options['workers'], batch_size=options['batch_size'], prefix=options['prefix'],
+                until=until,
+                log=self.stdout.write,
+            )
+        except dataset.DatasetError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(', '.join(f"{name}: {count}" for name, count in counts.items()))
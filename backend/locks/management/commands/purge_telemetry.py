@@ -0,0 +1,21 @@
+# locks/management/commands/purge_telemetry.py
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from locks.telemetry import purge_history
+
+
+class Command(BaseCommand):
+    help = "Borra el histórico de telemetría (TelemetrySample) más antiguo que la retención."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help="Por defecto TELEMETRY['HISTORY_RETENTION_DAYS'].")
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if days is None:
+            days = settings.TELEMETRY['HISTORY_RETENTION_DAYS']
+        deleted = purge_history(timezone.now() - timedelta(days=days))
+        self.stdout.write(f"{deleted} muestras de telemetría borradas (anteriores a {days} días)")
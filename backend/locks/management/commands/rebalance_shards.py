@@ -0,0 +1,72 @@
+# locks/management/commands/rebalance_shards.py
+from django.core.management.base import BaseCommand, CommandError
+from locks import sharding
+from locks.models import Lock
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los AccessLog de cada cerradura al shard que le corresponde (tras añadir un "
+        "shard a ACCESS_LOG_SHARDS) o fija una cerradura concreta en otro shard."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lock', help="UUID de la cerradura a mover (con --to).")
+        parser.add_argument('--to', help="Alias del shard de destino para --lock.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo mostrar qué se movería.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--settle', type=float,
+                            help="Espera (s) entre fijar el shard nuevo y borrar el origen "
+                                 "(por defecto SHARD_MAP_CACHE_SECONDS).")
+        parser.add_argument('--configure-sequences', action='store_true',
+                            help="PostgreSQL: intercalar las secuencias de ids de AccessLog entre shards y terminar.")
+
+    def handle(self, *args, **options):
+        aliases = sharding.shard_aliases()
+
+        if options['configure_sequences']:
+            try:
+                configured = sharding.configure_sequences()
+            except sharding.ShardingError as exc:
+                raise CommandError(str(exc))
+            for alias, start in configured.items():
+                self.stdout.write(f"{alias}: siguiente id {start}, incremento {len(aliases)}")
+            return
+
+        if options['lock']:
+            if options['to'] not in aliases:
+                raise CommandError(f"--to debe ser uno de: {', '.join(aliases)}")
+            lock = Lock.objects.filter(uuid=options['lock']).first()
+            if lock is None:
+                raise CommandError("No existe una cerradura con ese UUID.")
+            moves = [
+                (lock.pk, alias, options['to'])
+                for alias in aliases if alias != options['to'] and lock.pk in sharding.locks_on_shard(alias)
+            ]
+            if not moves and not options['dry_run']:
+                # Sin filas que mover basta con fijar el shard (move_locks lo hace en otro caso)
+                sharding.assign_shard(lock.pk, options['to'])
+        else:
+            moves = []
+            for alias in aliases:
+                for lock_id in sharding.locks_on_shard(alias):
+                    target = sharding.shard_for_lock(lock_id)
+                    if target != alias:
+                        moves.append((lock_id, alias, target))
+
+        if not moves:
+            self.stdout.write("Todos los AccessLog están en su shard.")
+            return
+
+        if options['dry_run']:
+            for lock_id, source, target in moves:
+                self.stdout.write(f"lock {lock_id}: {source} -> {target}")
+        else:
+            try:
+                sharding.move_locks(
+                    moves, chunk_size=options['chunk_size'], settle=options['settle'], log=self.stdout.write,
+                )
+            except sharding.ShardingError as exc:
+                raise CommandError(str(exc))
+        suffix = " (dry run)" if options['dry_run'] else ""
+        self.stdout.write(f"{len(moves)} cerraduras movidas{suffix}")
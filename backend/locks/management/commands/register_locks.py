@@ -0,0 +1,33 @@
+# locks/management/commands/register_locks.py
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from locks.provisioning import DEFAULT_BATCH_SIZE, parse_uuids, register_uuids
+
+
+class Command(BaseCommand):
+    help = "Pre-registra cerraduras fabricadas a partir de un archivo con una UUID por línea ('-' = stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('file')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['file']
+        try:
+            fh = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with fh:
+            try:
+                uuids = parse_uuids(fh)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        start = time.perf_counter()
+        created = register_uuids(uuids, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{created} cerraduras nuevas de {len(uuids)} UUIDs "
+            f"({len(uuids) - created} ya existían) en {elapsed:.1f}s"
+        )
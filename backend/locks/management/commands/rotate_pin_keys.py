@@ -0,0 +1,24 @@
+# locks/management/commands/rotate_pin_keys.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from locks import pins
+
+
+class Command(BaseCommand):
+    help = (
+        "Reenvuelve los digest de los PINs guardados con claves anteriores a PIN_HASH_VERSION "
+        "(sin conocer los códigos). Después se puede subir PIN_HASH_MIN_VERSION."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            rotated = pins.rotate_digests(batch_size=options['batch_size'], log=self.stdout.write)
+        except pins.PinHashError as exc:
+            raise CommandError(str(exc))
+        version = pins.current_version()
+        self.stdout.write(f"{rotated} PINs reenvueltos a la versión {version}.")
+        if settings.PIN_HASH_MIN_VERSION < version:
+            self.stdout.write(f"Ya se puede fijar PIN_HASH_MIN_VERSION={version}.")
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0005_remove_lock_last_sync_alter_lock_location_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lock',
+            name='schedule_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='AccessSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.PositiveSmallIntegerField(default=127)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('timezone', models.CharField(default='UTC', max_length=64)),
+                ('exception_dates', models.JSONField(blank=True, default=list)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='locks.device')),
+                ('lock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='locks.lock')),
+                ('pin', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='locks.pin')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('device__isnull', True), ('pin__isnull', False)), models.Q(('device__isnull', False), ('pin__isnull', True)), _connector='OR'), name='accessschedule_pin_xor_device')],
+            },
+        ),
+    ]
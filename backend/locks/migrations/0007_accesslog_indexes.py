@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0006_accessschedule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesslog',
+            name='device',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='locks.device'),
+        ),
+        migrations.AlterField(
+            model_name='accesslog',
+            name='lock',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='access_logs', to='locks.lock'),
+        ),
+        migrations.AlterField(
+            model_name='accesslog',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['lock', '-timestamp'], name='accesslog_lock_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['device', '-timestamp'], name='accesslog_device_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['user', '-timestamp'], name='accesslog_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['-timestamp'], name='accesslog_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['lock', 'access_type', '-timestamp'], name='accesslog_lock_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(condition=models.Q(('result', 'FAIL')), fields=['lock', '-timestamp'], name='accesslog_lock_fail_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['details'], name='accesslog_details_prefix_idx', opclasses=['text_pattern_ops']),
+        ),
+    ]
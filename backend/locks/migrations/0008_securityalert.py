@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0007_accesslog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecurityAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('kind', models.CharField(choices=[('FAILURE_BURST', 'Ráfaga de intentos fallidos'), ('CODE_SWEEP', 'Barrido de códigos'), ('UNUSUAL_HOUR', 'Hora inusual')], max_length=20)),
+                ('details', models.TextField(blank=True)),
+                ('acknowledged', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='locks.device')),
+                ('lock', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='security_alerts', to='locks.lock')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lock', '-created_at'], name='securityalert_lock_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _is_log_shard(alias):
+    """Base de datos que solo guarda AccessLog/OutboxEvent (locks.sharding), sin sus Lock/Device/User."""
+    return alias != 'default' and alias in settings.ACCESS_LOG_SHARDS
+
+
+class AlterShardedForeignKey(migrations.AlterField):
+    """
+    AlterField de las FKs de AccessLog/OutboxEvent. El estado queda sin constraint (igual en
+    todas las bases de datos), pero el constraint solo se borra en los shards de logs: en
+    'default' (con o sin sharding) las filas referenciadas existen y se conserva; allí solo
+    se quita el índice de una columna. Por eso los shards deben estar en ACCESS_LOG_SHARDS
+    antes de `migrate --database shard_N`.
+    """
+
+    def _keep_constraint(self, app_label, state):
+        state = state.clone()
+        field = self.field.clone()
+        field.db_constraint = True
+        state.models[app_label, self.model_name_lower].fields[self.name] = field
+        state.reload_model(app_label, self.model_name_lower, delay=True)
+        return state
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_log_shard(schema_editor.connection.alias):
+            to_state = self._keep_constraint(app_label, to_state)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_log_shard(schema_editor.connection.alias):
+            from_state = self._keep_constraint(app_label, from_state)
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0009_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LockShard',
+            fields=[
+                ('lock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='locks.lock')),
+                ('alias', models.CharField(max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        AlterShardedForeignKey(
+            model_name='accesslog',
+            name='device',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='locks.device'),
+        ),
+        AlterShardedForeignKey(
+            model_name='accesslog',
+            name='lock',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='access_logs', to='locks.lock'),
+        ),
+        AlterShardedForeignKey(
+            model_name='accesslog',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        AlterShardedForeignKey(
+            model_name='outboxevent',
+            name='lock',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='locks.lock'),
+        ),
+    ]
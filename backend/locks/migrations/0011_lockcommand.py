@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0010_lockshard_unconstrained_logs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LockCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('UNLOCK', 'Abrir'), ('SYNC', 'Sincronizar'), ('REBOOT', 'Reiniciar')], max_length=10)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('DELIVERED', 'Entregado, sin confirmar'), ('ACKED', 'Ejecutado'), ('FAILED', 'Fallido'), ('EXPIRED', 'Caducado')], default='PENDING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('deliveries', models.PositiveSmallIntegerField(default=0)),
+                ('acked_at', models.DateTimeField(blank=True, null=True)),
+                ('result_detail', models.TextField(blank=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('lock', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='commands', to='locks.lock')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lock', '-created_at'], name='lockcommand_lock_ts_idx'), models.Index(condition=models.Q(('status__in', ['PENDING', 'DELIVERED'])), fields=['lock', 'id'], name='lockcommand_open_idx')],
+            },
+        ),
+    ]
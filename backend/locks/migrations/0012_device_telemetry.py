@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0011_lockcommand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceState',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='state', serialize=False, to='locks.device')),
+                ('battery', models.PositiveSmallIntegerField()),
+                ('rssi', models.SmallIntegerField()),
+                ('firmware_version', models.CharField(max_length=32)),
+                ('uptime', models.PositiveIntegerField()),
+                ('last_seen', models.DateTimeField()),
+                ('lock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_states', to='locks.lock')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_seen'], name='devicestate_last_seen_idx'), models.Index(fields=['battery'], name='devicestate_battery_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TelemetrySample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('battery', models.PositiveSmallIntegerField()),
+                ('rssi', models.SmallIntegerField()),
+                ('firmware_version', models.CharField(max_length=32)),
+                ('uptime', models.PositiveIntegerField()),
+                ('device', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='telemetry', to='locks.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='telemetry_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('device', 'bucket'), name='telemetry_device_bucket_uniq')],
+            },
+        ),
+    ]
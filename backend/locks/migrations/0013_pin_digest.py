@@ -0,0 +1,47 @@
+# Paso 1 de 2: añade digest/key_version y rellena los PINs existentes por lotes.
+# atomic=False: cada lote se confirma por separado (sin una transacción larga sobre locks_pin).
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_digests(apps, schema_editor):
+    from locks import pins
+
+    Pin = apps.get_model('locks', 'Pin')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        batch = list(
+            Pin.objects.using(db).filter(pk__gt=last_id, digest__isnull=True)
+            .order_by('pk').only('pk', 'lock', 'code')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for pin in batch:
+            pin.digest, pin.key_version = pins.make_digest(pin.lock_id, pin.code)
+        Pin.objects.using(db).bulk_update(batch, ['digest', 'key_version'])
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('locks', '0012_device_telemetry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pin',
+            name='digest',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='pin',
+            name='key_version',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_digests, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,73 @@
+# Paso 2 de 2: índice único (lock, digest) y borrado del código en claro.
+#
+# El borrado de `code` depende de verify_backfill(): antes de tocar el esquema se comprueba
+# el digest de cada PIN contra su código. Los que la versión anterior creó o cambió después
+# de 0013 (durante un despliegue gradual) se rellenan aquí; si falta una clave de
+# PIN_HASH_KEYS la migración se detiene sin borrar nada.
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def verify_backfill(apps, schema_editor):
+    from locks import pins
+
+    Pin = apps.get_model('locks', 'Pin')
+    connection = schema_editor.connection
+    db = connection.alias
+    if connection.vendor == 'postgresql':
+        # Hasta el final de la migración (una transacción) nadie escribe PINs entre la
+        # comprobación y el DROP COLUMN
+        table = schema_editor.quote_name(Pin._meta.db_table)
+        schema_editor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+    last_id = 0
+    while True:
+        batch = list(
+            Pin.objects.using(db).filter(pk__gt=last_id)
+            .order_by('pk').only('pk', 'lock', 'code', 'digest', 'key_version')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        stale = [
+            pin for pin in batch
+            if pin.digest is None or pin.digest not in pins.candidate_digests(pin.lock_id, pin.code)
+        ]
+        for pin in stale:
+            pin.digest, pin.key_version = pins.make_digest(pin.lock_id, pin.code)
+        if stale:
+            Pin.objects.using(db).bulk_update(stale, ['digest', 'key_version'])
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locks', '0013_pin_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(verify_backfill, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pin',
+            name='digest',
+            field=models.CharField(editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='pin',
+            name='key_version',
+            field=models.PositiveSmallIntegerField(editable=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='pin',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='pin',
+            constraint=models.UniqueConstraint(fields=('lock', 'digest'), name='pin_lock_digest_uniq'),
+        ),
+        migrations.RemoveField(
+            model_name='pin',
+            name='code',
+        ),
+    ]
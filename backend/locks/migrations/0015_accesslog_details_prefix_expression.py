@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# El índice B-tree sobre details entero fallaba al insertar filas de más de ~2.7 KB en
+# PostgreSQL (index row size exceeds maximum). Se sustituye por uno sobre LEFT(details, 64),
+# que es por donde consulta locks.filters.filter_details_prefix.
+CREATE = {
+    'postgresql': (
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS accesslog_details_prefix_idx '
+        'ON {table} (LEFT("details", 64) text_pattern_ops)'
+    ),
+}
+DROP = {
+    'postgresql': 'DROP INDEX CONCURRENTLY IF EXISTS accesslog_details_prefix_idx',
+    'mysql': 'DROP INDEX accesslog_details_prefix_idx ON {table}',
+    'default': 'DROP INDEX IF EXISTS accesslog_details_prefix_idx',
+}
+OLD_INDEX = {
+    'postgresql': (
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS accesslog_details_prefix_idx '
+        'ON {table} ("details" text_pattern_ops)'
+    ),
+    'mysql': None,
+    'default': 'CREATE INDEX IF NOT EXISTS accesslog_details_prefix_idx ON {table} ("details")',
+}
+
+
+def _run(statements, apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statement = statements.get(vendor, statements.get('default'))
+    if statement:
+        table = schema_editor.quote_name(apps.get_model('locks', 'AccessLog')._meta.db_table)
+        schema_editor.execute(statement.format(table=table))
+
+
+def replace_index(apps, schema_editor):
+    _run(DROP, apps, schema_editor)
+    _run(CREATE, apps, schema_editor)
+
+
+def restore_index(apps, schema_editor):
+    _run(DROP, apps, schema_editor)
+    _run(OLD_INDEX, apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY no puede ir dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('locks', '0014_pin_drop_code'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(model_name='accesslog', name='accesslog_details_prefix_idx'),
+            ],
+            database_operations=[
+                migrations.RunPython(replace_index, restore_index),
+            ],
+        ),
+    ]
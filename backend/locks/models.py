@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 import secrets
 import uuid
 from django.conf import settings
+from django.utils import timezone
+from . import pins
 
 # ROLES Y PERMISOS
 class Role(models.Model):
@@ -36,6 +38,18 @@ class UserRole(models.Model):
 
 
 # CERRADURA (LOCK)
+class LockQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Cerraduras propias y aquellas donde el usuario tiene algún rol.
+        Usa un subquery en lugar del JOIN con user_roles, por lo que no necesita DISTINCT.
+        """
+        return self.filter(
+            models.Q(owner=user) |
+            models.Q(pk__in=UserRole.objects.filter(user=user).values('lock'))
+        )
+
+
 class Lock(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     name = models.CharField(max_length=100, blank=True, null=True)
@@ -47,6 +61,10 @@ class Lock(models.Model):
     )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Se incrementa cada vez que cambia un AccessSchedule de la cerradura (invalida locks.schedules)
+    schedule_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = LockQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name or 'Cerradura sin nombre'} ({self.uuid})"
@@ -68,12 +86,20 @@ class NetworkConfig(models.Model):
 
 
 # PINES DE ACCESO
+class PinQuerySet(models.QuerySet):
+    def matching(self, lock, code):
+        """PINs de la cerradura con ese código (búsqueda por el índice único de lock+digest)."""
+        return self.filter(lock=lock, digest__in=pins.candidate_digests(lock.pk, code))
+
+
 class Pin(models.Model):
     """
     Códigos de acceso. Pueden ser permanentes o temporales.
+    El código no se guarda: solo su digest HMAC (ver locks.pins y set_code()).
     """
     lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='pins')
-    code = models.CharField(max_length=10)
+    digest = models.CharField(max_length=64, editable=False)
+    key_version = models.PositiveSmallIntegerField(editable=False)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     is_temporary = models.BooleanField(default=False)
     start_time = models.DateTimeField(blank=True, null=True)
@@ -81,11 +107,18 @@ class Pin(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PinQuerySet.as_manager()
+
     class Meta:
-        unique_together = ('lock', 'code')
+        constraints = [
+            models.UniqueConstraint(fields=['lock', 'digest'], name='pin_lock_digest_uniq'),
+        ]
+
+    def set_code(self, code):
+        self.digest, self.key_version = pins.make_digest(self.lock_id, code)
 
     def __str__(self):
-        return f"PIN {self.code} ({'Temp' if self.is_temporary else 'Perm'}) - {self.lock.name}"
+        return f"PIN #{self.pk} ({'Temp' if self.is_temporary else 'Perm'}) - {self.lock.name}"
 
 
 # DISPOSITIVOS AUTORIZADOS
@@ -119,7 +152,77 @@ class Device(models.Model):
         return f"{self.name} ({self.device_type}) - {self.lock.name}"
 
 
+# HORARIOS RECURRENTES
+class AccessSchedule(models.Model):
+    """
+    Ventana de acceso semanal recurrente para un PIN o un dispositivo
+    (p.ej. personal de limpieza: lunes y jueves de 08:00 a 12:00, hora local).
+    Un PIN/dispositivo con horarios solo es válido dentro de alguno de ellos.
+    """
+    ALL_DAYS = 0b1111111  # bit 0 = lunes ... bit 6 = domingo
+
+    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='schedules')
+    pin = models.ForeignKey(Pin, on_delete=models.CASCADE, null=True, blank=True, related_name='schedules')
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, null=True, blank=True, related_name='schedules')
+    weekdays = models.PositiveSmallIntegerField(default=ALL_DAYS)
+    start_time = models.TimeField()
+    end_time = models.TimeField()  # si end_time <= start_time la ventana cruza la medianoche
+    timezone = models.CharField(max_length=64, default='UTC')
+    exception_dates = models.JSONField(default=list, blank=True)  # fechas locales 'YYYY-MM-DD' sin acceso
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(pin__isnull=False, device__isnull=True) |
+                    models.Q(pin__isnull=True, device__isnull=False)
+                ),
+                name='accessschedule_pin_xor_device',
+            ),
+        ]
+
+    @property
+    def credential_key(self):
+        return ('pin', self.pin_id) if self.pin_id else ('device', self.device_id)
+
+    def __str__(self):
+        target = f"PIN {self.pin_id}" if self.pin_id else f"Device {self.device_id}"
+        return f"{target} {self.start_time}-{self.end_time} ({self.timezone})"
+
+
 # REGISTRO DE ACCESOS
+class ShardedQuerySet(models.QuerySet):
+    """
+    QuerySet de modelos repartidos por cerradura entre shards (locks.sharding).
+    Sin .using() explícito, create() y bulk_create() escriben en el shard de la cerradura;
+    las lecturas sin .using() van a 'default' (ver sharding.scatter()/for_lock()).
+    """
+
+    def for_lock(self, lock):
+        from . import sharding
+        return self.using(sharding.shard_for_lock(lock)).filter(lock=lock)
+
+    def create(self, **kwargs):
+        from . import sharding
+        if self._db is None and sharding.is_sharded():
+            return self.using(sharding.shard_for_lock(kwargs.get('lock') or kwargs['lock_id'])).create(**kwargs)
+        return super().create(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from . import sharding
+        if self._db is not None or not sharding.is_sharded():
+            return super().bulk_create(objs, *args, **kwargs)
+        groups = {}
+        for obj in objs:
+            groups.setdefault(sharding.shard_for_lock(obj.lock_id), []).append(obj)
+        created = []
+        for alias, group in groups.items():
+            created.extend(self.using(alias).bulk_create(group, *args, **kwargs))
+        return created
+
+
 class AccessLog(models.Model):
     """
     Registra cada intento o acceso a la cerradura.
@@ -136,13 +239,228 @@ class AccessLog(models.Model):
         ('FAIL', 'Access Denied'),
     ]
 
-    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='access_logs')
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
-    device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
+    # Sin índice propio: los índices compuestos de Meta.indexes empiezan por estas columnas.
+    # Sin FOREIGN KEY en los shards de logs, donde no están las filas referenciadas (locks.sharding;
+    # en 'default' la migración 0010 conserva el constraint).
+    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='access_logs',
+                             db_index=False, db_constraint=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             db_index=False, db_constraint=False)
+    device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True,
+                               db_index=False, db_constraint=False)
     access_type = models.CharField(max_length=10, choices=ACCESS_TYPES)
     result = models.CharField(max_length=10, choices=RESULT_CHOICES)
     timestamp = models.DateTimeField(auto_now_add=True)
     details = models.TextField(blank=True, null=True)
 
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        # Índices para los filtros de AccessLogViewSet (ver locks/filters.py) y el resumen de flota
+        indexes = [
+            models.Index(fields=['lock', '-timestamp'], name='accesslog_lock_ts_idx'),
+            models.Index(fields=['device', '-timestamp'], name='accesslog_device_ts_idx'),
+            models.Index(fields=['user', '-timestamp'], name='accesslog_user_ts_idx'),
+            models.Index(fields=['-timestamp'], name='accesslog_ts_idx'),
+            models.Index(fields=['lock', 'access_type', '-timestamp'], name='accesslog_lock_type_ts_idx'),
+            # Parcial: los fallos son pocos y son lo que más se consulta (alertas, fallos 24h)
+            models.Index(
+                fields=['lock', '-timestamp'], name='accesslog_lock_fail_ts_idx',
+                condition=models.Q(result='FAIL'),
+            ),
+            # La búsqueda por prefijo en details usa LEFT(details, 64) text_pattern_ops, creado
+            # con SQL en la migración 0015 (solo PostgreSQL; ver filters.filter_details_prefix)
+        ]
+
     def __str__(self):
         return f"[{self.lock.name}] {self.access_type} - {self.result} ({self.timestamp})"
+
+
+class LockShard(models.Model):
+    """
+    Shard fijado a mano para los AccessLog de una cerradura (lo escribe rebalance_shards).
+    Sin fila, el shard sale del hash del uuid de la cerradura.
+    """
+    lock = models.OneToOneField(Lock, on_delete=models.CASCADE, primary_key=True, related_name='shard')
+    alias = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.lock_id} -> {self.alias}"
+
+
+# OUTBOX TRANSACCIONAL
+class OutboxEvent(models.Model):
+    """
+    Evento pendiente de enviar al sistema de gestión del edificio (webhook).
+    Se escribe en la misma transacción que el AccessLog (locks.events) y lo entrega
+    el comando deliver_outbox en lotes, en orden por cerradura.
+    """
+    PENDING = 'PENDING'
+    DELIVERED = 'DELIVERED'
+    DEAD = 'DEAD'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (DELIVERED, 'Entregado'),
+        (DEAD, 'Descartado (dead letter)'),
+    ]
+
+    # Vive en el mismo shard que el AccessLog del evento (locks.sharding)
+    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='outbox_events',
+                             db_index=False, db_constraint=False)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Solo los pendientes: el índice se mantiene pequeño aunque la tabla crezca
+            models.Index(fields=['next_attempt_at', 'id'], name='outbox_pending_due_idx',
+                         condition=models.Q(status='PENDING')),
+            models.Index(fields=['lock', 'id'], name='outbox_pending_lock_idx',
+                         condition=models.Q(status='PENDING')),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.status})"
+
+
+# ALERTAS DE SEGURIDAD
+class SecurityAlert(models.Model):
+    """
+    Alerta generada por el detector de anomalías (locks.anomaly).
+    """
+    FAILURE_BURST = 'FAILURE_BURST'
+    CODE_SWEEP = 'CODE_SWEEP'
+    UNUSUAL_HOUR = 'UNUSUAL_HOUR'
+    KINDS = [
+        (FAILURE_BURST, 'Ráfaga de intentos fallidos'),
+        (CODE_SWEEP, 'Barrido de códigos'),
+        (UNUSUAL_HOUR, 'Hora inusual'),
+    ]
+
+    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='security_alerts', db_index=False)
+    device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    details = models.TextField(blank=True)
+    acknowledged = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lock', '-created_at'], name='securityalert_lock_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"[{self.lock.name}] {self.kind} ({self.created_at})"
+
+
+# COMANDOS REMOTOS
+class LockCommand(models.Model):
+    """
+    Orden de la app para una cerradura (abrir, sincronizar, reiniciar). El firmware las
+    recoge por long-poll en orden de id y confirma cada una (locks.commands).
+    """
+    UNLOCK = 'UNLOCK'
+    SYNC = 'SYNC'
+    REBOOT = 'REBOOT'
+    KINDS = [
+        (UNLOCK, 'Abrir'),
+        (SYNC, 'Sincronizar'),
+        (REBOOT, 'Reiniciar'),
+    ]
+
+    PENDING = 'PENDING'
+    DELIVERED = 'DELIVERED'
+    ACKED = 'ACKED'
+    FAILED = 'FAILED'
+    EXPIRED = 'EXPIRED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (DELIVERED, 'Entregado, sin confirmar'),
+        (ACKED, 'Ejecutado'),
+        (FAILED, 'Fallido'),
+        (EXPIRED, 'Caducado'),
+    ]
+    OPEN_STATUSES = (PENDING, DELIVERED)
+
+    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='commands', db_index=False)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    delivered_at = models.DateTimeField(blank=True, null=True)
+    deliveries = models.PositiveSmallIntegerField(default=0)
+    acked_at = models.DateTimeField(blank=True, null=True)
+    result_detail = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lock', '-created_at'], name='lockcommand_lock_ts_idx'),
+            # Solo los abiertos: lo que consulta cada long-poll
+            models.Index(fields=['lock', 'id'], name='lockcommand_open_idx',
+                         condition=models.Q(status__in=['PENDING', 'DELIVERED'])),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+# TELEMETRÍA DE DISPOSITIVOS
+class DeviceState(models.Model):
+    """
+    Último estado conocido de cada dispositivo (una fila por dispositivo). Se actualiza con
+    upserts agrupados desde locks.telemetry; nunca se guarda un latido por fila.
+    """
+    device = models.OneToOneField(Device, on_delete=models.CASCADE, primary_key=True, related_name='state')
+    lock = models.ForeignKey(Lock, on_delete=models.CASCADE, related_name='device_states')
+    battery = models.PositiveSmallIntegerField()           # %
+    rssi = models.SmallIntegerField()                      # dBm
+    firmware_version = models.CharField(max_length=32)
+    uptime = models.PositiveIntegerField()                 # segundos
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Salud de la flota: desconectados (last_seen antiguo) y batería baja, por rango
+            models.Index(fields=['last_seen'], name='devicestate_last_seen_idx'),
+            models.Index(fields=['battery'], name='devicestate_battery_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id}: {self.battery}% ({self.last_seen})"
+
+
+class TelemetrySample(models.Model):
+    """
+    Histórico submuestreado: como mucho una muestra por dispositivo y
+    TELEMETRY['HISTORY_BUCKET_SECONDS'] (la primera que llega en cada intervalo).
+    """
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='telemetry', db_index=False)
+    bucket = models.DateTimeField()
+    battery = models.PositiveSmallIntegerField()
+    rssi = models.SmallIntegerField()
+    firmware_version = models.CharField(max_length=32)
+    uptime = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # Índice de las consultas por dispositivo y clave del ON CONFLICT DO NOTHING
+            models.UniqueConstraint(fields=['device', 'bucket'], name='telemetry_device_bucket_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='telemetry_bucket_idx'),  # purga por antigüedad
+        ]
+
+    def __str__(self):
+        return f"{self.device_id} @ {self.bucket}"
@@ -0,0 +1,204 @@
+# locks/outbox.py
+"""
+Entrega de OutboxEvent al webhook del edificio.
+
+Cada ronda:
+  1. claim_due(): reclama (con un lease) los eventos pendientes ya vencidos, respetando
+     el orden por cerradura: si un evento anterior de la misma cerradura sigue pendiente
+     y no es de este worker (esperando un reintento, con lease de otro worker o bloqueado
+     por el claim de otro en curso), los posteriores no se envían aún. Los bloqueados por
+     reintento o lease se descartan en la propia consulta, antes del LIMIT FETCH_SIZE. Así
+     varios workers sin --partition nunca envían a la vez eventos de la misma cerradura.
+  2. deliver(): envía los eventos de cada cerradura en orden, en lotes de BATCH_SIZE,
+     con varias cerraduras en paralelo sobre un pool de conexiones HTTP asíncronas.
+     El lease se calcula para el peor caso de la ronda (lease_seconds()) y deliver() no
+     empieza un POST que pueda terminar después de que venza.
+  3. apply_results(): marca entregados; los lotes fallidos se reintentan con backoff
+     exponencial y pasan a DEAD al agotar MAX_ATTEMPTS.
+
+Con sharding (locks.sharding) cada shard tiene su propia tabla de eventos: claim_due() y
+apply_results() trabajan sobre un alias (`using`) y el orden por cerradura se mantiene
+dentro de cada shard.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import random
+import time
+from datetime import timedelta
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, Min, OuterRef, prefetch_related_objects
+from django.db.models.functions import Mod
+from django.utils import timezone
+from .models import OutboxEvent
+
+
+def _conf(name):
+    return settings.OUTBOX[name]
+
+
+def lease_seconds(groups):
+    """
+    Peor caso de una ronda: cada POST tarda como mucho TIMEOUT_SECONDS, se hacen a lo sumo
+    CONCURRENCY a la vez y los lotes de una cerradura van en serie. Con esas restricciones
+    la ronda termina en (POSTs / CONCURRENCY + lotes de la cerradura más larga) * TIMEOUT;
+    LEASE_SECONDS se suma como margen.
+    """
+    size = _conf('BATCH_SIZE')
+    batches = [math.ceil(len(events) / size) for events in groups.values()]
+    if not batches:
+        return _conf('LEASE_SECONDS')
+    worst = (math.ceil(sum(batches) / _conf('CONCURRENCY')) + max(batches)) * _conf('TIMEOUT_SECONDS')
+    return worst + _conf('LEASE_SECONDS')
+
+
+def claim_due(partition=None, now=None, using='default'):
+    """
+    Devuelve {lock_id: [eventos en orden]} listos para enviar.
+    partition=(i, n) limita el worker a las cerraduras con lock_id % n == i.
+    """
+    now = now or timezone.now()
+    with transaction.atomic(using=using):
+        # Barrera en SQL: un evento anterior de la misma cerradura esperando reintento o con
+        # lease de otro worker bloquea a los posteriores, que ni se cuentan en FETCH_SIZE
+        # (si no, una cerradura atascada con muchos eventos dejaría sin turno a las demás)
+        blocked = OutboxEvent.objects.using(using).filter(
+            lock_id=OuterRef('lock_id'), id__lt=OuterRef('id'),
+            status=OutboxEvent.PENDING, next_attempt_at__gt=now,
+        )
+        qs = OutboxEvent.objects.using(using).filter(
+            ~Exists(blocked), status=OutboxEvent.PENDING, next_attempt_at__lte=now,
+        )
+        if partition:
+            index, total = partition
+            qs = qs.annotate(partition=Mod('lock_id', total)).filter(partition=index)
+        events = list(
+            qs.order_by('id')
+            .select_for_update(skip_locked=True)[:_conf('FETCH_SIZE')]
+        )
+        if not events:
+            return {}
+
+        # Queda el caso que la consulta no ve: eventos anteriores que otro worker está
+        # reclamando ahora mismo (saltados por skip_locked, o con el lease ya puesto tras
+        # nuestro snapshot). Primer pendiente de cada cerradura fuera de esta ronda: nada
+        # posterior puede adelantarlo
+        barriers = dict(
+            OutboxEvent.objects.using(using).filter(
+                status=OutboxEvent.PENDING,
+                lock_id__in={e.lock_id for e in events},
+            )
+            .exclude(pk__in=[e.pk for e in events])
+            .values('lock_id')
+            .annotate(first=Min('id'))
+            .values_list('lock_id', 'first')
+        )
+        events = [e for e in events if e.pk < barriers.get(e.lock_id, float('inf'))]
+
+        groups = {}
+        for event in events:
+            groups.setdefault(event.lock_id, []).append(event)
+        OutboxEvent.objects.using(using).filter(pk__in=[e.pk for e in events]).update(
+            next_attempt_at=now + timedelta(seconds=lease_seconds(groups))
+        )
+
+    # La cerradura (para el uuid del mensaje) está en 'default', no en el shard
+    prefetch_related_objects(events, 'lock')
+    return groups
+
+
+def _message(event):
+    return {
+        'id': event.pk,
+        'type': event.event_type,
+        'lock': str(event.lock.uuid),
+        'created_at': event.created_at.isoformat(),
+        'data': event.payload,
+    }
+
+
+def _headers(body):
+    headers = {'Content-Type': 'application/json'}
+    secret = settings.OUTBOX_WEBHOOK_SECRET
+    if secret:
+        headers['X-Signature'] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return headers
+
+
+async def deliver(groups, client):
+    """
+    Envía cada grupo en orden. Devuelve una lista de
+    (entregados, lote_fallido, no_intentados, error) por cerradura. Los lotes que no
+    pueden terminar antes de que venza el lease de claim_due() quedan como no intentados.
+    """
+    semaphore = asyncio.Semaphore(_conf('CONCURRENCY'))
+    size = _conf('BATCH_SIZE')
+    deadline = time.monotonic() + lease_seconds(groups) - _conf('TIMEOUT_SECONDS')
+
+    async def deliver_lock(events):
+        delivered = []
+        for start in range(0, len(events), size):
+            batch = events[start:start + size]
+            body = json.dumps({'events': [_message(e) for e in batch]}).encode()
+            try:
+                async with semaphore:
+                    if time.monotonic() > deadline:
+                        return delivered, [], events[start:], None
+                    response = await client.post(settings.OUTBOX_WEBHOOK_URL, content=body, headers=_headers(body))
+                response.raise_for_status()
+            except httpx.HTTPError as exc:
+                return delivered, batch, events[start + size:], str(exc) or exc.__class__.__name__
+            delivered.extend(batch)
+        return delivered, [], [], None
+
+    return await asyncio.gather(*(deliver_lock(events) for events in groups.values()))
+
+
+def _backoff(attempts):
+    delay = min(_conf('BACKOFF_BASE_SECONDS') * 2 ** attempts, _conf('BACKOFF_MAX_SECONDS'))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def apply_results(results, now=None, using='default'):
+    now = now or timezone.now()
+    stats = {'delivered': 0, 'failed': 0, 'dead': 0}
+    events = OutboxEvent.objects.using(using)
+    with transaction.atomic(using=using):
+        delivered_ids = [e.pk for delivered, _, _, _ in results for e in delivered]
+        if delivered_ids:
+            stats['delivered'] = events.filter(pk__in=delivered_ids).update(
+                status=OutboxEvent.DELIVERED, delivered_at=now, last_error='',
+            )
+
+        for _, failed, untried, error in results:
+            # Los que iban detrás no se intentaron: se libera el lease (si hubo fallo, el
+            # lote fallido hace de barrera)
+            if untried:
+                events.filter(pk__in=[e.pk for e in untried]).update(next_attempt_at=now)
+            if not failed:
+                continue
+            attempts = max(e.attempts for e in failed) + 1
+            failed_ids = [e.pk for e in failed]
+            stats['failed'] += events.filter(pk__in=failed_ids).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + _backoff(attempts),
+                last_error=error[:2000],
+            )
+            stats['dead'] += events.filter(
+                pk__in=failed_ids, attempts__gte=_conf('MAX_ATTEMPTS'),
+            ).update(status=OutboxEvent.DEAD)
+    return stats
+
+
+def make_client():
+    return httpx.AsyncClient(
+        timeout=_conf('TIMEOUT_SECONDS'),
+        limits=httpx.Limits(
+            max_connections=_conf('MAX_CONNECTIONS'),
+            max_keepalive_connections=_conf('MAX_CONNECTIONS'),
+        ),
+    )
@@ -1,6 +1,10 @@
 from rest_framework import permissions
-from .models import UserRole, Device
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .models import UserRole, Device, Lock
+from .signing import has_signature, verify_request, SignatureError
 from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
 
 class HasLockRolePermission(permissions.BasePermission):
     """
@@ -79,7 +83,7 @@ class DeviceAPIKeyPermission(permissions.BasePermission):
         if not api_key:
             return False
 
-        device = Device.objects.filter(api_key=api_key, is_active=True).first()
+        device = Device.objects.select_related('lock', 'user').filter(api_key=api_key, is_active=True).first()
         if not device:
             return False
 
@@ -94,6 +98,45 @@ class DeviceAPIKeyPermission(permissions.BasePermission):
 
         return True
 
+class DeviceSignaturePermission(permissions.BasePermission):
+    """
+    Alternativa a DeviceAPIKeyPermission: valida la firma HMAC del request (ver locks.signing)
+    sin tocar la base de datos. request.device se carga de forma perezosa solo si la vista lo usa.
+    Se combina con la API key así: permission_classes=[DeviceSignaturePermission | DeviceAPIKeyPermission]
+    """
+    def has_permission(self, request, view):
+        if not has_signature(request):
+            return False
+        try:
+            uid = verify_request(request)
+        except SignatureError:
+            return False
+
+        request.device_uid = uid
+        request.device = SimpleLazyObject(
+            lambda: Device.objects.select_related('lock', 'user').filter(uid=uid, is_active=True).first()
+        )
+        return True
+
+
+def authenticate_device(request):
+    """
+    Para vistas fuera de DRF (views.poll_commands): el mismo criterio que
+    DeviceSignaturePermission | DeviceAPIKeyPermission. Devuelve el Device activo o None.
+    """
+    queryset = Device.objects.select_related('lock').filter(is_active=True)
+    if has_signature(request):
+        try:
+            uid = verify_request(request)
+        except SignatureError:
+            return None
+        return queryset.filter(uid=uid).first()
+    api_key = request.headers.get('X-API-KEY')
+    if not api_key:
+        return None
+    return queryset.filter(api_key=api_key).first()
+
+
 def user_has_allowed_role(lock, user, allowed_names=("propietario", "administrador", "owner", "admin")):
     """
     Retorna True si user es owner OR tiene un UserRole en la lock
@@ -105,4 +148,23 @@ def user_has_allowed_role(lock, user, allowed_names=("propietario", "administrad
     if lock.owner and lock.owner == user:
         return True
     # role name check (case-insensitive)
-    return lock.user_roles.filter(user=user, role__name__in=allowed_names).exists()
\ No newline at end of file
+    return lock.user_roles.filter(user=user, role__name__in=allowed_names).exists()
+
+
+def managed_locks(user, allowed_names=("propietario", "administrador", "owner", "admin")):
+    """Cerraduras que el usuario puede gestionar (propias o con uno de esos roles)."""
+    managed_roles = (
+        UserRole.objects.filter(user=user)
+        .annotate(role_name=Lower('role__name'))
+        .filter(role_name__in=allowed_names)
+        .values('lock')
+    )
+    return Lock.objects.filter(Q(owner=user) | Q(pk__in=managed_roles))
+
+
+def locks_with_allowed_role(user, lock_ids, allowed_names=("propietario", "administrador", "owner", "admin")):
+    """
+    Versión por lotes de user_has_allowed_role: subconjunto de lock_ids que el usuario
+    puede gestionar, con una sola consulta.
+    """
+    return set(managed_locks(user, allowed_names).filter(pk__in=lock_ids).values_list('pk', flat=True))
@@ -0,0 +1,97 @@
+# locks/pins.py
+"""
+Almacenamiento de PINs como digest HMAC con clave (nunca en claro).
+
+    digest_1 = HMAC-SHA256(PIN_HASH_KEYS[1], "<lock_id>:<código>")
+    digest_v = HMAC-SHA256(PIN_HASH_KEYS[v], digest_{v-1})
+
+Un PIN con key_version=v guarda digest_v. Al ser determinista, validate_pin lo busca con
+el índice único (lock, digest): un IN con un digest por versión aceptada (de
+PIN_HASH_MIN_VERSION a PIN_HASH_VERSION), sin recorrer los PINs de la cerradura.
+
+Rotación sin parada ni códigos en claro (cada versión envuelve la anterior):
+  1. añadir la clave nueva a PIN_HASH_KEYS y subir PIN_HASH_VERSION (los PINs nuevos se
+     guardan con ella; las búsquedas aceptan también las anteriores),
+  2. `manage.py rotate_pin_keys` reenvuelve por lotes los digest de versiones anteriores,
+  3. subir PIN_HASH_MIN_VERSION a la versión nueva.
+Las claves antiguas tienen que seguir configuradas: forman parte de la cadena.
+"""
+import hashlib
+import hmac
+from django.conf import settings
+
+
+class PinHashError(Exception):
+    pass
+
+
+def _key(version):
+    try:
+        return settings.PIN_HASH_KEYS[version].encode()
+    except KeyError:
+        raise PinHashError(f"Falta la clave {version} en PIN_HASH_KEYS.")
+
+
+def current_version():
+    return settings.PIN_HASH_VERSION
+
+
+def wrap(digest, version):
+    """digest_{version} a partir de digest_{version-1} (hex)."""
+    return hmac.new(_key(version), bytes.fromhex(digest), hashlib.sha256).hexdigest()
+
+
+def digests(lock_id, code, upto=None):
+    """{versión: digest} de 1 a `upto` (por defecto PIN_HASH_VERSION)."""
+    upto = current_version() if upto is None else upto
+    digest = hmac.new(_key(1), f"{lock_id}:{code}".encode(), hashlib.sha256).hexdigest()
+    result = {1: digest}
+    for version in range(2, upto + 1):
+        digest = wrap(digest, version)
+        result[version] = digest
+    return result
+
+
+def make_digest(lock_id, code):
+    """(digest, versión) con la clave actual, para guardar un PIN."""
+    version = current_version()
+    return digests(lock_id, code, version)[version], version
+
+
+def candidate_digests(lock_id, code):
+    """Digest del código en cada versión aceptada, para buscarlo con un IN sobre el índice."""
+    return [
+        digest for version, digest in digests(lock_id, code).items()
+        if version >= settings.PIN_HASH_MIN_VERSION
+    ]
+
+
+def rotate_digests(batch_size=1000, log=None):
+    """
+    Reenvuelve hasta PIN_HASH_VERSION los digest guardados con versiones anteriores, por
+    lotes cortos (cada uno en su transacción). Devuelve cuántos PINs se actualizaron.
+    """
+    from django.db import transaction
+    from .models import Pin
+
+    target = current_version()
+    rotated = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Pin.objects.select_for_update()
+                .filter(pk__gt=last_id, key_version__lt=target)
+                .order_by('pk').only('pk', 'digest', 'key_version')[:batch_size]
+            )
+            if not batch:
+                return rotated
+            for pin in batch:
+                for version in range(pin.key_version + 1, target + 1):
+                    pin.digest = wrap(pin.digest, version)
+                pin.key_version = target
+            Pin.objects.bulk_update(batch, ['digest', 'key_version'])
+        rotated += len(batch)
+        last_id = batch[-1].pk
+        if log:
+            log(f"{rotated} PINs en la versión {target}")
@@ -0,0 +1,80 @@
+# locks/provisioning.py
+"""
+Pre-registro masivo de cerraduras fabricadas (solo UUID, sin propietario).
+
+En PostgreSQL se usa COPY a una tabla temporal y un único
+INSERT ... SELECT ... ON CONFLICT DO NOTHING por lote; sin COPY (SQLite, o psycopg sin
+copy_expert), INSERT ... VALUES ... ON CONFLICT DO NOTHING RETURNING id. En ambos casos
+las cerraduras creadas se cuentan en el propio INSERT (rowcount / filas devueltas), no
+con COUNT(*) de la tabla. Las UUID ya registradas se ignoran, por lo que la carga se
+puede repetir sin duplicar.
+"""
+import io
+import uuid
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Lock
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def parse_uuids(values):
+    """Normaliza y valida UUIDs; lanza ValueError con la primera inválida."""
+    parsed = []
+    for value in values:
+        value = str(value).strip()
+        if not value:
+            continue
+        try:
+            parsed.append(uuid.UUID(value))
+        except ValueError:
+            raise ValueError(f"UUID inválida: {value}")
+    return parsed
+
+
+def _copy_batch(batch):
+    table = Lock._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS lock_import (uuid uuid) ON COMMIT DELETE ROWS")
+        buffer = io.StringIO(''.join(f"{u}\n" for u in batch))
+        cursor.cursor.copy_expert("COPY lock_import (uuid) FROM STDIN", buffer)
+        cursor.execute(
+            f"INSERT INTO {table} (uuid, is_active, created_at, schedule_version) "
+            f"SELECT DISTINCT uuid, TRUE, %s, 0 FROM lock_import "
+            f"ON CONFLICT (uuid) DO NOTHING",
+            [timezone.now()],
+        )
+        return cursor.rowcount
+
+
+def _insert_batch(batch):
+    table = connection.ops.quote_name(Lock._meta.db_table)
+    fields = [Lock._meta.get_field(name) for name in ('uuid', 'is_active', 'created_at', 'schedule_version')]
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    size = connection.ops.bulk_batch_size(fields, batch)
+    now = timezone.now()
+    created = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(batch), size):
+            chunk = batch[start:start + size]
+            params = []
+            for value in chunk:
+                params.extend(field.get_db_prep_save(v, connection) for field, v in zip(fields, (value, True, now, 0)))
+            rows = ', '.join([f"({', '.join(['%s'] * len(fields))})"] * len(chunk))
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {rows} ON CONFLICT (uuid) DO NOTHING RETURNING id",
+                params,
+            )
+            created += len(cursor.fetchall())
+    return created
+
+
+def register_uuids(uuids, batch_size=DEFAULT_BATCH_SIZE):
+    """Registra las UUID en lotes; devuelve cuántas cerraduras nuevas se crearon."""
+    use_copy = connection.vendor == 'postgresql' and hasattr(connection.cursor().cursor, 'copy_expert')
+    created = 0
+    for start in range(0, len(uuids), batch_size):
+        batch = uuids[start:start + batch_size]
+        with transaction.atomic():
+            created += _copy_batch(batch) if use_copy else _insert_batch(batch)
+    return created
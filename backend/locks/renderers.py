@@ -0,0 +1,59 @@
+# locks/renderers.py
+"""
+Renderers/parsers para los endpoints que consume el firmware.
+
+Además de JSON, los dispositivos pueden negociar MessagePack
+(Content-Type / Accept: application/msgpack), que es más compacto y más barato
+de construir y parsear en el microcontrolador.
+"""
+import datetime
+import decimal
+import uuid
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from config.renderers import ORJSONParser, ORJSONRenderer
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (uuid.UUID, decimal.Decimal)):
+        return str(obj)
+    raise TypeError(f"Tipo no serializable en MessagePack: {type(obj).__name__}")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True, default=_msgpack_default)
+
+
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f"MessagePack inválido: {exc}")
+
+
+# Para usar en las vistas/acciones del firmware (JSON sigue siendo el valor por defecto)
+DEVICE_RENDERER_CLASSES = [ORJSONRenderer, MessagePackRenderer]
+DEVICE_PARSER_CLASSES = [ORJSONParser, MessagePackParser]
+
+
+def is_compact(request):
+    """True si el dispositivo negoció MessagePack para la respuesta."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == MessagePackRenderer.format
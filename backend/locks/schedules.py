@@ -0,0 +1,150 @@
+# locks/schedules.py
+"""
+Índice de intervalos precalculado por cerradura para resolver AccessSchedule.
+
+Para cada credencial (('pin', id) o ('device', id)) se expanden sus horarios a
+intervalos absolutos en UTC (timestamps) dentro de un horizonte de
+SCHEDULE_INDEX_HORIZON_DAYS días, se fusionan y se guardan ordenados. Comprobar un
+acceso es entonces un dict lookup + bisect: O(log k) sin aritmética de fechas por
+request, aunque la cerradura tenga miles de credenciales con horario.
+
+El índice vive en memoria de cada proceso. Lock.schedule_version lo invalida entre
+procesos; dentro del proceso que guarda un horario solo se recalculan las credenciales
+afectadas, la actual y la anterior si el horario se movió (ver locks.signals).
+"""
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.utils import timezone
+from .models import AccessSchedule
+
+_lock = threading.Lock()
+_indexes = OrderedDict()  # lock_id -> LockScheduleIndex (LRU)
+
+
+def expand_schedule(schedule, window_start, window_end):
+    """Intervalos (inicio, fin) en timestamps UTC de un horario dentro de la ventana dada."""
+    try:
+        tz = ZoneInfo(schedule.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = ZoneInfo('UTC')
+    exceptions = set(schedule.exception_dates or [])
+    crosses_midnight = schedule.end_time <= schedule.start_time
+
+    intervals = []
+    # Un día antes para capturar ventanas que empiezan ayer y cruzan la medianoche
+    day = window_start.astimezone(tz).date() - timedelta(days=1)
+    last_day = window_end.astimezone(tz).date()
+    while day <= last_day:
+        if schedule.weekdays & (1 << day.weekday()) and day.isoformat() not in exceptions:
+            start = datetime.combine(day, schedule.start_time, tzinfo=tz)
+            end_day = day + timedelta(days=1) if crosses_midnight else day
+            end = datetime.combine(end_day, schedule.end_time, tzinfo=tz)
+            if end > window_start and start < window_end:
+                intervals.append((start.timestamp(), end.timestamp()))
+        day += timedelta(days=1)
+    return intervals
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [m[0] for m in merged], [m[1] for m in merged]
+
+
+class LockScheduleIndex:
+    def __init__(self, lock_id, version, schedules, now=None):
+        self.lock_id = lock_id
+        self.version = version
+        self.window_start = (now or timezone.now()) - timedelta(days=1)
+        self.valid_until = self.window_start + timedelta(days=1 + settings.SCHEDULE_INDEX_HORIZON_DAYS)
+        self.by_credential = {}
+
+        grouped = {}
+        for schedule in schedules:
+            grouped.setdefault(schedule.credential_key, []).append(schedule)
+        for key, items in grouped.items():
+            self.set_credential(key, items)
+
+    def set_credential(self, key, schedules):
+        """(Re)calcula los intervalos de una sola credencial."""
+        schedules = [s for s in schedules if s.is_active]
+        if not schedules:
+            self.by_credential.pop(key, None)
+            return
+        intervals = []
+        for schedule in schedules:
+            intervals.extend(expand_schedule(schedule, self.window_start, self.valid_until))
+        self.by_credential[key] = _merge(intervals)
+
+    def allows(self, key, when):
+        """
+        True/False si la credencial tiene horarios y `when` cae (o no) dentro de alguno;
+        None si la credencial no tiene horarios (sin restricción).
+        """
+        entry = self.by_credential.get(key)
+        if entry is None:
+            return None
+        starts, ends = entry
+        ts = when.timestamp()
+        i = bisect_right(starts, ts) - 1
+        return i >= 0 and ts < ends[i]
+
+
+def _build(lock):
+    schedules = AccessSchedule.objects.filter(lock_id=lock.pk, is_active=True)
+    return LockScheduleIndex(lock.pk, lock.schedule_version, schedules)
+
+
+def get_index(lock, now=None):
+    now = now or timezone.now()
+    with _lock:
+        index = _indexes.get(lock.pk)
+        if index is not None and index.version == lock.schedule_version and now < index.valid_until:
+            _indexes.move_to_end(lock.pk)
+            return index
+
+    index = _build(lock)
+    with _lock:
+        _indexes[lock.pk] = index
+        _indexes.move_to_end(lock.pk)
+        while len(_indexes) > settings.SCHEDULE_INDEX_MAX_LOCKS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def schedule_allows(lock, key, when=None):
+    """True si la credencial `key` puede usarse en `when` según sus horarios (o si no tiene)."""
+    when = when or timezone.now()
+    allowed = get_index(lock, when).allows(key, when)
+    return allowed is None or allowed
+
+
+def credential_changed(lock_id, new_version, *keys):
+    """
+    Actualización incremental de las credenciales `keys` tras guardar/borrar un horario en este proceso.
+    Si el índice en memoria no estaba en la versión inmediatamente anterior
+    (otro proceso también cambió horarios) se descarta y se reconstruirá entero.
+    """
+    with _lock:
+        index = _indexes.get(lock_id)
+    if index is None:
+        return
+    if index.version != new_version - 1:
+        with _lock:
+            _indexes.pop(lock_id, None)
+        return
+
+    for key in keys:
+        kind, pk = key
+        schedules = AccessSchedule.objects.filter(lock_id=lock_id, is_active=True, **{f"{kind}_id": pk})
+        index.set_credential(key, list(schedules))
+    index.version = new_version
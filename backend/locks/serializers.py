@@ -1,26 +1,31 @@
 # backend/locks/serializers.py
 from rest_framework import serializers
 from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
-from .models import Role, UserRole, Lock, NetworkConfig, Pin, Device, AccessLog
+from .models import Role, UserRole, Lock, NetworkConfig, Pin, Device, AccessLog, AccessSchedule, SecurityAlert, LockCommand, DeviceState
+from datetime import date
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config.dynamic_fields import DynamicFieldsMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
 
-class RoleSerializer(serializers.ModelSerializer):
+class RoleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Role
         fields = '__all__'
 
 
-class LockSerializer(serializers.ModelSerializer):
+class LockSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
 
     class Meta:
@@ -29,18 +34,81 @@ class LockSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at','owner']
 
 
-class NetworkConfigSerializer(serializers.ModelSerializer):
+class LockSummarySerializer(LockSerializer):
+    """
+    Lock + agregados calculados por LockViewSet.fleet_summary (anotaciones del queryset).
+    """
+    active_pin_count = serializers.IntegerField(read_only=True)
+    device_count = serializers.IntegerField(read_only=True)
+    user_count = serializers.IntegerField(read_only=True)
+    last_access_at = serializers.DateTimeField(read_only=True)
+    last_access_result = serializers.CharField(read_only=True)
+    failures_24h = serializers.IntegerField(read_only=True)
+
+    class Meta(LockSerializer.Meta):
+        fields = LockSerializer.Meta.fields + [
+            'active_pin_count', 'device_count', 'user_count',
+            'last_access_at', 'last_access_result', 'failures_24h',
+        ]
+
+
+class NetworkConfigSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = NetworkConfig
         fields = '__all__'
 
-class PinSerializer(serializers.ModelSerializer):
+class PinSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
+    # Solo de escritura: se guarda su digest HMAC (Pin.set_code), nunca el código
+    code = serializers.CharField(write_only=True, required=False, max_length=10)
+    DUPLICATE_CODE = "Ya existe un PIN con ese código en esta cerradura."
 
     class Meta:
         model = Pin
-        fields = '__all__'
+        fields = ['id', 'lock', 'code', 'created_by', 'is_temporary', 'start_time', 'end_time',
+                  'is_active', 'created_at']
         read_only_fields = ['created_at', 'created_by']
+        expandable_fields = {'lock': LockSerializer}
+
+    def _validate_code(self, data):
+        lock = data.get('lock') or getattr(self.instance, 'lock', None)
+        code = data.get('code')
+        if code is None:
+            if self.instance is None:
+                raise serializers.ValidationError({"code": "Este campo es requerido."})
+            if lock != self.instance.lock:
+                # El digest depende de la cerradura
+                raise serializers.ValidationError({"code": "Indica el código para cambiar de cerradura."})
+            return
+        duplicates = Pin.objects.matching(lock, code)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError({"code": self.DUPLICATE_CODE})
+
+    def _save(self, pin):
+        # Dos altas simultáneas con el mismo código pasan _validate_code(); el índice único
+        # (lock, digest) rechaza la segunda y se responde igual que en la validación
+        try:
+            with transaction.atomic():
+                pin.save()
+        except IntegrityError:
+            raise serializers.ValidationError({"code": [self.DUPLICATE_CODE]})
+        return pin
+
+    def create(self, validated_data):
+        code = validated_data.pop('code')
+        pin = Pin(**validated_data)
+        pin.set_code(code)
+        return self._save(pin)
+
+    def update(self, instance, validated_data):
+        code = validated_data.pop('code', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if code is not None:
+            instance.set_code(code)
+        return self._save(instance)
 
     def validate(self, data):
         # Si vienen start_time/end_time y USE_TZ True, convertir naive -> aware
@@ -58,10 +126,49 @@ class PinSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Los pines temporales requieren start_time y end_time.")
             if st >= en:
                 raise serializers.ValidationError("start_time debe ser anterior a end_time.")
+        self._validate_code(data)
+        return data
+
+
+class AccessScheduleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = AccessSchedule
+        fields = ['id', 'lock', 'pin', 'device', 'weekdays', 'start_time', 'end_time',
+                  'timezone', 'exception_dates', 'is_active', 'created_at']
+        read_only_fields = ['lock', 'created_at']
+        expandable_fields = {'lock': LockSerializer}
+
+    def validate_weekdays(self, value):
+        if not 0 < value <= AccessSchedule.ALL_DAYS:
+            raise serializers.ValidationError("weekdays debe ser una máscara de bits entre 1 y 127 (bit 0 = lunes).")
+        return value
+
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Zona horaria desconocida.")
+        return value
+
+    def validate_exception_dates(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Debe ser una lista de fechas YYYY-MM-DD.")
+        try:
+            return sorted({date.fromisoformat(str(d)).isoformat() for d in value})
+        except ValueError:
+            raise serializers.ValidationError("Debe ser una lista de fechas YYYY-MM-DD.")
+
+    def validate(self, data):
+        pin = data.get('pin', getattr(self.instance, 'pin', None))
+        device = data.get('device', getattr(self.instance, 'device', None))
+        if bool(pin) == bool(device):
+            raise serializers.ValidationError("Indica un pin o un device (solo uno).")
+        # La cerradura siempre es la de la credencial
+        data['lock'] = pin.lock if pin else device.lock
         return data
 
 
-class DeviceSerializer(serializers.ModelSerializer):
+class DeviceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     api_key = serializers.CharField(read_only=True)
 
@@ -69,6 +176,7 @@ class DeviceSerializer(serializers.ModelSerializer):
         model = Device
         fields = ['id','lock','user','device_type','uid','name','is_active','date_added','last_used','api_key']
         read_only_fields = ['date_added','last_used','api_key','user']
+        expandable_fields = {'lock': LockSerializer}
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -78,13 +186,16 @@ class DeviceSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class AccessLogSerializer(serializers.ModelSerializer):
+class AccessLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     lock_uuid = serializers.CharField(write_only=True, required=True)
+    # Acotado: AccessLog es la tabla con más escrituras y details se indexa por prefijo
+    details = serializers.CharField(max_length=1000, required=False, allow_blank=True, allow_null=True)
 
     class Meta:
         model = AccessLog
         fields = ['id', 'lock', 'lock_uuid', 'user', 'device', 'access_type', 'result', 'timestamp', 'details']
         read_only_fields = ['id', 'timestamp', 'lock', 'user']
+        expandable_fields = {'lock': LockSerializer, 'user': UserSerializer, 'device': DeviceSerializer}
 
     def create(self, validated_data):
         # Extrae el UUID enviado
@@ -98,7 +209,59 @@ class AccessLogSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class UserRoleSerializer(serializers.ModelSerializer):
+class SecurityAlertSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = SecurityAlert
+        fields = ['id', 'lock', 'device', 'ip_address', 'kind', 'details', 'acknowledged', 'created_at']
+        read_only_fields = ['lock', 'device', 'ip_address', 'kind', 'details', 'created_at']
+        expandable_fields = {'lock': LockSerializer, 'device': DeviceSerializer}
+
+
+class LockCommandSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Caducidad pedida en segundos (como mucho LOCK_COMMANDS['TTL_SECONDS'] del tipo)
+    ttl = serializers.IntegerField(write_only=True, required=False, min_value=1)
+
+    class Meta:
+        model = LockCommand
+        fields = ['id', 'lock', 'kind', 'payload', 'ttl', 'status', 'created_by', 'created_at',
+                  'expires_at', 'delivered_at', 'deliveries', 'acked_at', 'result_detail']
+        read_only_fields = ['lock', 'status', 'created_by', 'created_at', 'expires_at',
+                            'delivered_at', 'deliveries', 'acked_at', 'result_detail']
+
+
+class TelemetrySerializer(serializers.Serializer):
+    """Latido del firmware: dict o, en MessagePack, array [battery, rssi, uptime, firmware_version]."""
+    COMPACT_FIELDS = ('battery', 'rssi', 'uptime', 'firmware_version')
+
+    battery = serializers.IntegerField(min_value=0, max_value=100)
+    rssi = serializers.IntegerField(min_value=-150, max_value=0)
+    uptime = serializers.IntegerField(min_value=0, max_value=2**31 - 1)
+    firmware_version = serializers.CharField(max_length=32)
+
+    def to_internal_value(self, data):
+        if isinstance(data, (list, tuple)):
+            if len(data) != len(self.COMPACT_FIELDS):
+                raise serializers.ValidationError(
+                    f"Se esperaba [{', '.join(self.COMPACT_FIELDS)}]."
+                )
+            data = dict(zip(self.COMPACT_FIELDS, data))
+        return super().to_internal_value(data)
+
+
+class DeviceStateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    device_uid = serializers.CharField(source='device.uid', read_only=True)
+    device_name = serializers.CharField(source='device.name', read_only=True)
+    lock_uuid = serializers.UUIDField(source='lock.uuid', read_only=True)
+    lock_name = serializers.CharField(source='lock.name', read_only=True)
+
+    class Meta:
+        model = DeviceState
+        fields = ['device', 'device_uid', 'device_name', 'lock', 'lock_uuid', 'lock_name',
+                  'battery', 'rssi', 'firmware_version', 'uptime', 'last_seen']
+        read_only_fields = fields
+
+
+class UserRoleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
     role = serializers.PrimaryKeyRelatedField(queryset=Role.objects.all())
     lock = serializers.PrimaryKeyRelatedField(queryset=Lock.objects.all())
@@ -140,22 +303,102 @@ class LockClaimSerializer(serializers.Serializer):
     name = serializers.CharField(required=True)
     location = serializers.CharField(required=True)
 
-    def validate_uuid(self, value):
-        try:
-            lock = Lock.objects.get(uuid=value)
-        except Lock.DoesNotExist:
-            raise serializers.ValidationError("No existe una cerradura con este UUID.")
-        if lock.owner:
-            raise serializers.ValidationError("Esta cerradura ya está asignada a otro usuario.")
-        return value
-
     def save(self, **kwargs):
+        """
+        Reclama la cerradura con un único UPDATE condicional (owner IS NULL): si dos usuarios
+        reclaman a la vez, solo uno actualiza la fila y el otro recibe el error de "ya asignada".
+        """
         user = self.context['request'].user
         data = self.validated_data
 
-        lock = Lock.objects.get(uuid=data['uuid'])
-        lock.name = data['name']
-        lock.location = data['location']
-        lock.owner = user
-        lock.save()
+        with transaction.atomic():
+            claimed = Lock.objects.filter(uuid=data['uuid'], owner__isnull=True).update(
+                owner=user, name=data['name'], location=data['location'],
+            )
+            if not claimed:
+                # Solo en el caso de error se distingue el motivo
+                if Lock.objects.filter(uuid=data['uuid']).exists():
+                    raise serializers.ValidationError({"uuid": ["Esta cerradura ya está asignada a otro usuario."]})
+                raise serializers.ValidationError({"uuid": ["No existe una cerradura con este UUID."]})
+
+            lock = Lock.objects.select_related('owner').get(uuid=data['uuid'])
+            # Igual que al crear una cerradura (signals.create_owner_userrole)
+            role, _ = Role.objects.get_or_create(name='Propietario')
+            UserRole.objects.get_or_create(user=user, lock=lock, role=role)
         return lock
+
+
+class LockBulkRegisterSerializer(serializers.Serializer):
+    uuids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=10000)
+
+
+class UserRoleBulkSerializer(serializers.Serializer):
+    """
+    Asignación/retirada masiva de roles: { "users": [...], "locks": [...], "roles": [...] }
+    (ids). Se aplica al producto users × locks × roles. Cada lista se resuelve con una sola
+    consulta (PrimaryKeyRelatedField(many=True) haría una por id).
+    """
+    MAX_ASSIGNMENTS = 50000
+
+    users = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+    locks = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+    roles = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=20)
+
+    def _resolve(self, model, field, ids):
+        ids = set(ids)
+        objects = model.objects.in_bulk(ids)
+        missing = sorted(ids - set(objects))
+        if missing:
+            raise serializers.ValidationError({field: [f"No existen: {missing}"]})
+        return list(objects.values())
+
+    def validate(self, data):
+        sizes = [len(set(data[name])) for name in ('users', 'locks', 'roles') if name in data]
+        total = 1
+        for size in sizes:
+            total *= size
+        if total > self.MAX_ASSIGNMENTS:
+            raise serializers.ValidationError(f"Como mucho {self.MAX_ASSIGNMENTS} asignaciones por llamada.")
+        data['users'] = self._resolve(User, 'users', data['users'])
+        data['locks'] = self._resolve(Lock, 'locks', data['locks'])
+        if 'roles' in data:
+            data['roles'] = self._resolve(Role, 'roles', data['roles'])
+        return data
+
+
+class UserRoleBulkGrantSerializer(UserRoleBulkSerializer):
+
+    def save(self, **kwargs):
+        """Crea las asignaciones que falten; devuelve cuántas se crearon."""
+        users, locks, roles = (self.validated_data[name] for name in ('users', 'locks', 'roles'))
+        existing = set(
+            UserRole.objects.filter(user__in=users, lock__in=locks, role__in=roles)
+            .values_list('user_id', 'lock_id', 'role_id')
+        )
+        new = [
+            UserRole(user=user, lock=lock, role=role)
+            for user in users for lock in locks for role in roles
+            if (user.pk, lock.pk, role.pk) not in existing
+        ]
+        with transaction.atomic():
+            # ignore_conflicts: otra petición concurrente puede haber creado alguna
+            UserRole.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        return len(new)
+
+
+class UserRoleBulkRevokeSerializer(UserRoleBulkSerializer):
+    roles = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=20, required=False)
+
+    def save(self, **kwargs):
+        """
+        Borra las asignaciones (todas las de esos usuarios en esas cerraduras si no se indican
+        roles) con un solo DELETE; el rol del propietario de cada cerradura no se toca.
+        Devuelve cuántas se borraron.
+        """
+        data = self.validated_data
+        queryset = UserRole.objects.filter(user__in=data['users'], lock__in=data['locks'])
+        if 'roles' in data:
+            queryset = queryset.filter(role__in=data['roles'])
+        with transaction.atomic():
+            deleted, _ = queryset.exclude(user=F('lock__owner')).delete()
+        return deleted
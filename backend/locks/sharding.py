@@ -0,0 +1,276 @@
+# locks/sharding.py
+"""
+Sharding de AccessLog (y de su OutboxEvent) por cerradura.
+
+- ACCESS_LOG_SHARDS lista los alias de base de datos; 'default' siempre es el primero.
+  Con un solo alias todo funciona como sin sharding.
+- Cada cerradura tiene un shard: el fijado en LockShard o, si no hay, el que sale del
+  hash del uuid (rendezvous hashing: al añadir un shard solo cambian de sitio ~1/N de
+  las cerraduras). El mapa se cachea SHARD_MAP_CACHE_SECONDS.
+- ShardRouter enruta las instancias (save(), lock.access_logs...) y
+  ShardedQuerySet.create()/bulk_create() escriben en el shard de la cerradura.
+  Las consultas sin cerradura conocida se hacen en todos los shards con scatter()
+  y se combinan por timestamp con merge_by_timestamp().
+- Los shards tienen el esquema completo (migrate --database shard_N) pero solo filas de
+  AccessLog/OutboxEvent: en ellos no se puede hacer JOIN con Lock, Device o User, por
+  eso esas FKs no tienen constraint en los shards (en 'default' lo conservan, ver la
+  migración 0010) y las relaciones se cargan con prefetch_related().
+- Los ids de AccessLog deben ser únicos entre shards para poder mover filas:
+  `manage.py rebalance_shards --configure-sequences` (PostgreSQL) intercala las
+  secuencias (shard i genera ids ≡ i mod N). El system check locks.E001 (que ejecuta
+  migrate) falla mientras no lo estén.
+"""
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from heapq import merge
+from operator import attrgetter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from .models import AccessLog, Lock, LockShard, OutboxEvent
+
+SHARDED_MODELS = (AccessLog, OutboxEvent)
+_CACHE_PREFIX = 'shard:lock:'
+
+
+class ShardingError(Exception):
+    pass
+
+
+def shard_aliases():
+    return list(settings.ACCESS_LOG_SHARDS)
+
+
+def is_sharded():
+    return len(settings.ACCESS_LOG_SHARDS) > 1
+
+
+def hashed_shard(lock_uuid, aliases=None):
+    aliases = aliases or shard_aliases()
+    key = str(lock_uuid)
+    return max(aliases, key=lambda alias: hashlib.blake2b(f"{key}:{alias}".encode(), digest_size=8).digest())
+
+
+def shard_for_lock(lock):
+    """Alias del shard de una cerradura (instancia de Lock o su id)."""
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return aliases[0]
+    lock_id = lock.pk if isinstance(lock, Lock) else lock
+    key = f"{_CACHE_PREFIX}{lock_id}"
+    alias = cache.get(key)
+    if alias in aliases:
+        return alias
+
+    alias = LockShard.objects.filter(lock_id=lock_id).values_list('alias', flat=True).first()
+    if alias not in aliases:
+        uuid = lock.uuid if isinstance(lock, Lock) else (
+            Lock.objects.filter(pk=lock_id).values_list('uuid', flat=True).first()
+        )
+        alias = hashed_shard(uuid, aliases) if uuid else aliases[0]
+    cache.set(key, alias, settings.SHARD_MAP_CACHE_SECONDS)
+    return alias
+
+
+def assign_shard(lock_id, alias):
+    """Fija el shard de una cerradura (LockShard) y actualiza la caché."""
+    LockShard.objects.update_or_create(lock_id=lock_id, defaults={'alias': alias})
+    cache.set(f"{_CACHE_PREFIX}{lock_id}", alias, settings.SHARD_MAP_CACHE_SECONDS)
+
+
+class ShardRouter:
+    """Debe ir antes de PrimaryReplicaRouter en DATABASE_ROUTERS."""
+
+    def _route(self, model, hints):
+        if model not in SHARDED_MODELS or not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, Lock):
+            return shard_for_lock(instance)
+        if isinstance(instance, SHARDED_MODELS):
+            if instance._state.db:
+                return instance._state.db
+            if instance.lock_id:
+                return shard_for_lock(instance.lock_id)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Un AccessLog en un shard puede apuntar a la cerradura/usuario/dispositivo de 'default'
+        if isinstance(obj1, SHARDED_MODELS) or isinstance(obj2, SHARDED_MODELS):
+            return True
+        return None
+
+
+def _evaluate(queryset, alias):
+    try:
+        return list(queryset.using(alias))
+    finally:
+        # Hilo del pool: no dejar conexiones abiertas
+        connections[alias].close()
+
+
+def scatter(queryset, lock=None):
+    """
+    Evalúa el queryset en cada shard (en paralelo) y devuelve una lista por shard.
+    Si se conoce la cerradura, solo se consulta su shard.
+    """
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return [list(queryset)]
+    if lock is not None:
+        return [list(queryset.using(shard_for_lock(lock)))]
+    # Dentro de una transacción (tests, atomic requests) se usan las conexiones del hilo actual
+    if any(connections[alias].in_atomic_block for alias in aliases):
+        return [list(queryset.using(alias)) for alias in aliases]
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        return list(pool.map(lambda alias: _evaluate(queryset, alias), aliases))
+
+
+def merge_by_timestamp(results, reverse=True):
+    """Combina listas ya ordenadas por timestamp (una por shard) en una sola."""
+    if len(results) == 1:
+        return results[0]
+    return list(merge(*results, key=attrgetter('timestamp'), reverse=reverse))
+
+
+def lock_log_stats(lock_ids, failures_since):
+    """
+    {lock_id: {'last_access_at', 'last_access_result', 'failures_24h'}} calculado en cada
+    shard (sin JOIN con Lock) y combinado; para LockViewSet.fleet_summary con sharding.
+    """
+    latest = AccessLog.objects.filter(lock_id=OuterRef('lock_id')).order_by('-timestamp').values('result')[:1]
+    queryset = (
+        AccessLog.objects.filter(lock_id__in=lock_ids)
+        .order_by()
+        .values('lock_id')
+        .annotate(
+            last_access_at=Max('timestamp'),
+            last_access_result=Subquery(latest),
+            failures_24h=Count('pk', filter=Q(result='FAIL', timestamp__gte=failures_since)),
+        )
+    )
+    stats = {}
+    for rows in scatter(queryset):
+        for row in rows:
+            current = stats.get(row['lock_id'])
+            if current is None:
+                stats[row['lock_id']] = row
+                continue
+            # Durante un rebalanceo una cerradura puede tener filas en dos shards
+            current['failures_24h'] += row['failures_24h']
+            if row['last_access_at'] > current['last_access_at']:
+                current['last_access_at'] = row['last_access_at']
+                current['last_access_result'] = row['last_access_result']
+    return stats
+
+
+def delete_lock_rows(lock_id, exclude=None):
+    """Borra los AccessLog/OutboxEvent de una cerradura en todos los shards (salvo `exclude`)."""
+    for alias in shard_aliases():
+        if alias != exclude:
+            for model in SHARDED_MODELS:
+                model.objects.using(alias).filter(lock_id=lock_id).delete()
+
+
+def clear_reference(field, value, exclude=None):
+    """SET_NULL de AccessLog.<field> en todos los shards (salvo `exclude`)."""
+    for alias in shard_aliases():
+        if alias != exclude:
+            AccessLog.objects.using(alias).filter(**{field: value}).update(**{field: None})
+
+
+def locks_on_shard(alias):
+    """Ids de cerradura con AccessLog en el shard (usa accesslog_lock_ts_idx)."""
+    return set(AccessLog.objects.using(alias).order_by().values_list('lock_id', flat=True).distinct())
+
+
+def _copy_logs(lock_id, source, target, chunk_size, last_id=0):
+    """Copia las filas con id > last_id; devuelve (copiadas, último id copiado)."""
+    copied = 0
+    fields = [f.attname for f in AccessLog._meta.concrete_fields]
+    while True:
+        rows = list(
+            AccessLog.objects.using(source).filter(lock_id=lock_id, pk__gt=last_id)
+            .order_by('pk').values(*fields)[:chunk_size]
+        )
+        if not rows:
+            return copied, last_id
+        ids = [row['id'] for row in rows]
+        if AccessLog.objects.using(target).filter(pk__in=ids).exclude(lock_id=lock_id).exists():
+            raise ShardingError(
+                f"Ids de AccessLog repetidos entre {source} y {target}; "
+                "ejecuta rebalance_shards --configure-sequences antes de mover filas."
+            )
+        # ignore_conflicts: la copia se puede repetir si un rebalanceo anterior se cortó
+        AccessLog.objects.using(target).bulk_create([AccessLog(**row) for row in rows], ignore_conflicts=True)
+        copied += len(rows)
+        last_id = ids[-1]
+
+
+def move_locks(moves, chunk_size=5000, settle=None, sleep=None, log=None):
+    """
+    Mueve los AccessLog de cada (lock_id, source, target) sin parar las escrituras:
+      1. copia lo existente al destino,
+      2. fija el shard nuevo (LockShard + caché): las escrituras nuevas van al destino,
+      3. espera `settle` segundos una sola vez (procesos con el mapa viejo en caché),
+      4. copia lo escrito mientras tanto y borra el origen.
+    Los OutboxEvent pendientes no se mueven: deliver_outbox los entrega desde el origen.
+    """
+    settle = settings.SHARD_MAP_CACHE_SECONDS if settle is None else settle
+    sleep = sleep or time.sleep
+
+    copied, last_ids = {}, {}
+    for lock_id, source, target in moves:
+        try:
+            copied[lock_id], last_ids[lock_id] = _copy_logs(lock_id, source, target, chunk_size)
+        except ShardingError:
+            # Aún no se ha fijado ningún shard: quitar las copias para no duplicar lecturas
+            for done_id, _, done_target in moves:
+                AccessLog.objects.using(done_target).filter(lock_id=done_id).delete()
+                if done_id == lock_id:
+                    break
+            raise
+    for lock_id, _, target in moves:
+        assign_shard(lock_id, target)
+    if settle:
+        sleep(settle)
+    for lock_id, source, target in moves:
+        copied[lock_id] += _copy_logs(lock_id, source, target, chunk_size, last_ids[lock_id])[0]
+        with transaction.atomic(using=source):
+            deleted, _ = AccessLog.objects.using(source).filter(lock_id=lock_id).delete()
+        if log:
+            log(f"lock {lock_id}: {source} -> {target} ({copied[lock_id]} copiadas, {deleted} borradas del origen)")
+    return copied
+
+
+def configure_sequences():
+    """
+    PostgreSQL: intercala la secuencia de ids de AccessLog de cada shard (INCREMENT BY N,
+    shard i -> ids ≡ i mod N) a partir del máximo global, para que sean únicos entre shards.
+    """
+    aliases = shard_aliases()
+    total = len(aliases)
+    table = AccessLog._meta.db_table
+    current_max = max(
+        AccessLog.objects.using(alias).aggregate(m=Max('pk'))['m'] or 0 for alias in aliases
+    )
+    configured = {}
+    for index, alias in enumerate(aliases):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            raise ShardingError(f"{alias}: solo se pueden configurar secuencias en PostgreSQL.")
+        start = current_max + 1 + (index - (current_max + 1)) % total
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY {total} RESTART WITH {start}")
+        configured[alias] = start
+    return configured
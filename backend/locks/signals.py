@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Lock, UserRole, Role
+from django.contrib.auth import get_user_model
+from .models import Lock, UserRole, Role, AccessSchedule, Device
+from .schedules import credential_changed
+from . import sharding
 
 @receiver(post_save, sender=Lock)
 def create_owner_userrole(sender, instance, created, **kwargs):
@@ -8,10 +13,68 @@ def create_owner_userrole(sender, instance, created, **kwargs):
     Cuando se crea una cerradura, asegurar que exista un UserRole con rol 'Propietario'
     para el owner de la cerradura.
     """
-    if not created:
+    # Las cerraduras pre-registradas en fábrica no tienen owner hasta que se reclaman
+    if not created or not instance.owner_id:
         return
 
     # Buscar o crear Role 'Propietario'
     role_obj, _ = Role.objects.get_or_create(name='Propietario')
     # Crear UserRole solo si no existe
     UserRole.objects.get_or_create(user=instance.owner, lock=instance, role=role_obj)
+
+
+@receiver(pre_save, sender=AccessSchedule)
+def remember_schedule_target(sender, instance, **kwargs):
+    """
+    Guarda la cerradura y la credencial que tenía el horario antes de este save: si cambian,
+    hay que recalcular también las antiguas (ver bump_schedule_version).
+    """
+    previous = None
+    if instance.pk:
+        previous = AccessSchedule.objects.filter(pk=instance.pk).values_list('lock_id', 'pin_id', 'device_id').first()
+    if previous is None:
+        instance._previous_target = None
+    else:
+        lock_id, pin_id, device_id = previous
+        instance._previous_target = (lock_id, ('pin', pin_id) if pin_id else ('device', device_id))
+
+
+@receiver([post_save, post_delete], sender=AccessSchedule)
+def bump_schedule_version(sender, instance, **kwargs):
+    """
+    Invalida el índice de horarios de la cerradura en todos los procesos (schedule_version)
+    y lo actualiza de forma incremental en este. Si el horario cambió de cerradura o de
+    credencial se hace lo mismo con la cerradura/credencial anterior.
+    """
+    targets = {instance.lock_id: {instance.credential_key}}
+    previous = getattr(instance, '_previous_target', None)
+    if previous is not None:
+        lock_id, key = previous
+        targets.setdefault(lock_id, set()).add(key)
+
+    for lock_id, keys in targets.items():
+        updated = Lock.objects.filter(pk=lock_id).update(schedule_version=F('schedule_version') + 1)
+        if not updated:
+            continue  # la cerradura se está borrando
+        version = Lock.objects.filter(pk=lock_id).values_list('schedule_version', flat=True).first()
+        transaction.on_commit(lambda lock_id=lock_id, version=version, keys=keys: credential_changed(lock_id, version, *keys))
+
+
+# El CASCADE / SET_NULL de Django solo actúa en la base de datos del objeto borrado;
+# las filas de AccessLog/OutboxEvent en otros shards se limpian aquí.
+@receiver(pre_delete, sender=Lock)
+def delete_sharded_lock_rows(sender, instance, using, **kwargs):
+    if sharding.is_sharded():
+        sharding.delete_lock_rows(instance.pk, exclude=using)
+
+
+@receiver(pre_delete, sender=Device)
+def clear_sharded_device_refs(sender, instance, using, **kwargs):
+    if sharding.is_sharded():
+        sharding.clear_reference('device', instance.pk, exclude=using)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def clear_sharded_user_refs(sender, instance, using, **kwargs):
+    if sharding.is_sharded():
+        sharding.clear_reference('user', instance.pk, exclude=using)
@@ -0,0 +1,97 @@
+# locks/signing.py
+"""
+Autenticación de dispositivos por firma HMAC (sin consultar la base de datos).
+
+Clave del dispositivo (se provisiona una vez en el firmware):
+    device_key = HMAC-SHA256(DEVICE_SIGNING_KEYS[epoch], "smartlock-device:" + Device.uid)
+
+Cada request lleva las cabeceras:
+    X-Device-UID, X-Key-Epoch, X-Timestamp (epoch Unix, segundos), X-Nonce, X-Signature
+
+y la firma es el hex de HMAC-SHA256(device_key, canonical) con:
+    canonical = METHOD \\n PATH_CON_QUERY \\n SHA256_HEX(body) \\n TIMESTAMP \\n NONCE
+
+El servidor rederiva la clave a partir del secreto maestro de la época, por lo que
+verificar no requiere leer el Device. Rotación: se añade una época nueva a
+DEVICE_SIGNING_KEYS, se reprovisionan los dispositivos y se retira la antigua.
+"""
+import hashlib
+import hmac
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+UID_HEADER = 'X-Device-UID'
+EPOCH_HEADER = 'X-Key-Epoch'
+TIMESTAMP_HEADER = 'X-Timestamp'
+NONCE_HEADER = 'X-Nonce'
+SIGNATURE_HEADER = 'X-Signature'
+
+_MAX_NONCE_LENGTH = 64
+
+
+class SignatureError(Exception):
+    pass
+
+
+def _master_secret(epoch):
+    try:
+        return settings.DEVICE_SIGNING_KEYS[int(epoch)].encode()
+    except (KeyError, ValueError, TypeError):
+        raise SignatureError("Época de clave desconocida.")
+
+
+def device_key(uid, epoch=None):
+    """Clave HMAC del dispositivo `uid` para la época dada (por defecto la actual)."""
+    if epoch is None:
+        epoch = settings.DEVICE_SIGNING_EPOCH
+    return hmac.new(_master_secret(epoch), f"smartlock-device:{uid}".encode(), hashlib.sha256).digest()
+
+
+def canonical_string(method, path, body, timestamp, nonce):
+    body_digest = hashlib.sha256(body or b'').hexdigest()
+    return '\n'.join([method.upper(), path, body_digest, str(timestamp), nonce]).encode()
+
+
+def sign(key, method, path, body, timestamp, nonce):
+    return hmac.new(key, canonical_string(method, path, body, timestamp, nonce), hashlib.sha256).hexdigest()
+
+
+def has_signature(request):
+    return SIGNATURE_HEADER in request.headers
+
+
+def verify_request(request):
+    """
+    Verifica la firma del request y devuelve el uid del dispositivo.
+    Lanza SignatureError si falta algo, la marca de tiempo está fuera de la ventana,
+    el nonce ya se usó o la firma no coincide.
+    """
+    headers = request.headers
+    uid = headers.get(UID_HEADER)
+    epoch = headers.get(EPOCH_HEADER)
+    timestamp = headers.get(TIMESTAMP_HEADER)
+    nonce = headers.get(NONCE_HEADER)
+    signature = headers.get(SIGNATURE_HEADER)
+    if not all((uid, epoch, timestamp, nonce, signature)):
+        raise SignatureError("Faltan cabeceras de firma.")
+    if len(nonce) > _MAX_NONCE_LENGTH:
+        raise SignatureError("Nonce demasiado largo.")
+
+    try:
+        ts = int(timestamp)
+    except ValueError:
+        raise SignatureError("X-Timestamp inválido.")
+    window = settings.DEVICE_SIGNATURE_MAX_SKEW
+    if abs(time.time() - ts) > window:
+        raise SignatureError("Marca de tiempo fuera de la ventana permitida.")
+
+    expected = sign(device_key(uid, epoch), request.method, request.get_full_path(), request.body, ts, nonce)
+    if not hmac.compare_digest(expected, signature.lower()):
+        raise SignatureError("Firma inválida.")
+
+    # Anti-replay: el nonce solo puede usarse una vez dentro de la ventana (add es atómico;
+    # la caché tiene que ser compartida entre procesos, ver locks.checks.check_shared_cache)
+    if not cache.add(f"devsig:nonce:{uid}:{nonce}", 1, timeout=2 * window):
+        raise SignatureError("Nonce reutilizado.")
+    return uid
@@ -0,0 +1,176 @@
+# locks/telemetry.py
+"""
+Telemetría de los dispositivos (batería, RSSI, firmware, uptime).
+
+- record() solo guarda la última lectura de cada dispositivo en un búfer en memoria del
+  proceso: varios latidos del mismo dispositivo entre dos escrituras se quedan en uno.
+- flush() (FLUSH_SECONDS después del primer latido pendiente, desde un temporizador en
+  segundo plano, o antes si se juntan FLUSH_MAX_DEVICES dispositivos, y al salir del
+  proceso) resuelve los uid con una consulta y escribe todo el lote con un único upsert
+  sobre DeviceState (INSERT ... ON CONFLICT DO UPDATE ... WHERE). El upsert solo pisa
+  una fila con una lectura más reciente: dos procesos con latidos del mismo dispositivo
+  nunca dejan el estado retrocedido, escriban en el orden que escriban.
+- El histórico (TelemetrySample) guarda como mucho una muestra por dispositivo y
+  HISTORY_BUCKET_SECONDS; las ya escritas en este proceso ni se envían a la base de datos.
+- unhealthy() lista los dispositivos desconectados o con batería baja usando los índices
+  de last_seen y battery.
+
+Lo pendiente en el búfer se pierde si el proceso muere sin salir limpiamente (como mucho
+FLUSH_SECONDS de latidos; el siguiente latido lo repone).
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils import timezone
+from .models import Device, DeviceState, TelemetrySample
+
+logger = logging.getLogger(__name__)
+
+STATE_FIELDS = ['lock', 'battery', 'rssi', 'firmware_version', 'uptime', 'last_seen']
+
+
+def _conf(name):
+    return settings.TELEMETRY[name]
+
+
+_pending = {}               # uid -> (lectura, datetime)
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_timer = None               # threading.Timer del próximo flush, si hay latidos pendientes
+_written_buckets = {}       # device_id -> último bucket de histórico escrito por este proceso
+
+
+def bucket_start(when):
+    seconds = _conf('HISTORY_BUCKET_SECONDS')
+    ts = int(when.timestamp())
+    return datetime.fromtimestamp(ts - ts % seconds, tz=dt_timezone.utc)
+
+
+def record(uid, reading, now=None):
+    """
+    Registra un latido ya validado ({'battery', 'rssi', 'firmware_version', 'uptime'}).
+    Escribe el lote si toca; devuelve el número de dispositivos escritos (0 si no). Si no
+    toca, el temporizador lo escribe a los FLUSH_SECONDS aunque no lleguen más latidos.
+    """
+    global _last_flush, _timer
+    now = now or timezone.now()
+    with _pending_lock:
+        _pending[uid] = (reading, now)
+        due = (
+            len(_pending) >= _conf('FLUSH_MAX_DEVICES')
+            or time.monotonic() - _last_flush >= _conf('FLUSH_SECONDS')
+        )
+        if due:
+            _last_flush = time.monotonic()
+        elif _timer is None:
+            _timer = threading.Timer(_conf('FLUSH_SECONDS'), _timed_flush)
+            _timer.daemon = True
+            _timer.start()
+    return flush() if due else 0
+
+
+def _timed_flush():
+    global _last_flush, _timer
+    with _pending_lock:
+        _timer = None
+        _last_flush = time.monotonic()
+    try:
+        flush()
+    finally:
+        # El hilo del temporizador no vuelve a usarse: sus conexiones no deben quedar abiertas
+        connections.close_all()
+
+
+def flush():
+    """Escribe los latidos pendientes de este proceso; devuelve cuántos dispositivos."""
+    global _pending
+    with _pending_lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+    try:
+        return _write(batch)
+    except Exception:
+        # Se reintenta en el siguiente flush salvo que ya haya lecturas más nuevas
+        logger.exception("No se pudo escribir la telemetría de %d dispositivos", len(batch))
+        with _pending_lock:
+            for uid, item in batch.items():
+                _pending.setdefault(uid, item)
+        return 0
+
+
+def _write(batch):
+    devices = Device.objects.filter(uid__in=list(batch), is_active=True).values_list('uid', 'pk', 'lock_id')
+    states, samples = [], []
+    for uid, device_id, lock_id in devices:
+        reading, seen = batch[uid]
+        states.append(DeviceState(device_id=device_id, lock_id=lock_id, last_seen=seen, **reading))
+        bucket = bucket_start(seen)
+        if _written_buckets.get(device_id) != bucket:
+            samples.append(TelemetrySample(device_id=device_id, bucket=bucket, **reading))
+    if states:
+        _upsert_states(states)
+    if samples:
+        # Otro proceso puede haber escrito ya la muestra de este bucket: gana la primera
+        TelemetrySample.objects.bulk_create(samples, ignore_conflicts=True)
+        for sample in samples:
+            _written_buckets[sample.device_id] = sample.bucket
+    return len(states)
+
+
+def _upsert_states(states):
+    """
+    INSERT ... ON CONFLICT (device_id) DO UPDATE ... WHERE EXCLUDED.last_seen > actual.
+    bulk_create(update_conflicts=True) no admite la condición, de ahí el SQL a mano
+    (misma sintaxis en PostgreSQL y SQLite).
+    """
+    alias = router.db_for_write(DeviceState)
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    fields = [DeviceState._meta.get_field('device'), *(DeviceState._meta.get_field(name) for name in STATE_FIELDS)]
+    table = quote(DeviceState._meta.db_table)
+    columns = [quote(field.column) for field in fields]
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns[1:])
+    last_seen = quote(DeviceState._meta.get_field('last_seen').column)
+    row = f"({', '.join(['%s'] * len(fields))})"
+    batch_size = connection.ops.bulk_batch_size(fields, states)
+    with connection.cursor() as cursor:
+        for start in range(0, len(states), batch_size):
+            batch = states[start:start + batch_size]
+            params = [
+                field.get_db_prep_save(field.pre_save(state, True), connection)
+                for state in batch for field in fields
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row] * len(batch))} "
+                f"ON CONFLICT ({columns[0]}) DO UPDATE SET {updates} "
+                f"WHERE EXCLUDED.{last_seen} > {table}.{last_seen}",
+                params,
+            )
+
+
+atexit.register(flush)
+
+
+def unhealthy(queryset=None, now=None):
+    """
+    DeviceState de los dispositivos sin latidos en OFFLINE_AFTER_SECONDS o con batería
+    <= LOW_BATTERY_PERCENT (un OR de dos rangos indexados), los más antiguos primero.
+    """
+    now = now or timezone.now()
+    queryset = DeviceState.objects.all() if queryset is None else queryset
+    offline_since = now - timedelta(seconds=_conf('OFFLINE_AFTER_SECONDS'))
+    return queryset.filter(
+        Q(last_seen__lt=offline_since) | Q(battery__lte=_conf('LOW_BATTERY_PERCENT'))
+    ).order_by('last_seen')
+
+
+def purge_history(before):
+    """Borra las muestras históricas anteriores a `before`; devuelve cuántas."""
+    deleted, _ = TelemetrySample.objects.filter(bucket__lt=before).delete()
+    return deleted
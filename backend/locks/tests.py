@@ -1,3 +1,251 @@
-from django.test import TestCase
+import io
+import tempfile
+import time
+import uuid
+from unittest import skipUnless
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from . import anomaly, archive, outbox, telemetry
+from .checks import check_shared_cache
+from .provisioning import register_uuids
+from .models import AccessLog, AccessSchedule, Device, DeviceState, Lock, OutboxEvent, Pin, SecurityAlert
+from .schedules import schedule_allows
 
-# Create your tests here.
+
+class LockTestCase(TestCase):
+    """Cerradura con propietario, un dispositivo con API key y un PIN 1234."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.lock = Lock.objects.create(name='L1', owner=self.owner)
+        self.device = Device.objects.create(lock=self.lock, user=self.owner, device_type='RFID', uid='dev-1', name='kp')
+        self.pin = self.make_pin(self.lock, '1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.device_client = APIClient()
+
+    def make_pin(self, lock, code):
+        pin = Pin(lock=lock, created_by=self.owner)
+        pin.set_code(code)
+        pin.save()
+        return pin
+
+    def validate_pin(self, code, lock=None):
+        lock = lock or self.lock
+        return self.device_client.post(
+            f'/api/locks/{lock.uuid}/validate_pin/', {'code': code}, format='json',
+            HTTP_X_API_KEY=self.device.api_key,
+        )
+
+
+class SecurityAlertViewSetTests(LockTestCase):
+    def test_lock_filter(self):
+        SecurityAlert.objects.create(lock=self.lock, kind=SecurityAlert.FAILURE_BURST, details='x')
+        response = self.client.get('/api/alerts/', {'lock': self.lock.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_non_integer_lock_is_rejected(self):
+        response = self.client.get('/api/alerts/', {'lock': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lock', response.json())
+
+
+class ScheduleIndexTests(LockTestCase):
+    """El índice en memoria tras mover un horario entre credenciales y entre cerraduras."""
+
+    def setUp(self):
+        super().setUp()
+        # weekdays=0: la credencial tiene horario pero nunca está dentro de él
+        self.schedule = AccessSchedule.objects.create(
+            lock=self.lock, pin=self.pin, weekdays=0, start_time='08:00', end_time='12:00',
+        )
+
+    def save_schedule(self, **fields):
+        for name, value in fields.items():
+            setattr(self.schedule, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.save()
+
+    def allows(self, lock, pin):
+        lock.refresh_from_db()
+        return schedule_allows(lock, ('pin', pin.pk))
+
+    def test_move_between_credentials(self):
+        other = self.make_pin(self.lock, '5678')
+        self.assertFalse(self.allows(self.lock, self.pin))
+        self.assertTrue(self.allows(self.lock, other))
+
+        self.save_schedule(pin=other)
+
+        self.assertTrue(self.allows(self.lock, self.pin))
+        self.assertFalse(self.allows(self.lock, other))
+
+    def test_move_between_locks(self):
+        lock2 = Lock.objects.create(name='L2', owner=self.owner)
+        pin2 = self.make_pin(lock2, '5678')
+        self.assertFalse(self.allows(self.lock, self.pin))
+        self.assertTrue(self.allows(lock2, pin2))
+
+        self.save_schedule(lock=lock2, pin=pin2)
+
+        self.assertTrue(self.allows(self.lock, self.pin))
+        self.assertFalse(self.allows(lock2, pin2))
+
+
+class OutboxClaimTests(LockTestCase):
+    def event(self, lock, **fields):
+        return OutboxEvent.objects.create(lock=lock, event_type='access', payload={}, **fields)
+
+    def test_blocked_lock_does_not_starve_others(self):
+        fetch_size = 5
+        now = timezone.now()
+        # Primer evento de self.lock esperando reintento: los FETCH_SIZE+1 siguientes quedan detrás
+        self.event(self.lock, attempts=1, next_attempt_at=now + timedelta(minutes=5))
+        for _ in range(fetch_size + 1):
+            self.event(self.lock, next_attempt_at=now - timedelta(seconds=1))
+        other = Lock.objects.create(name='L2', owner=self.owner)
+        ready = self.event(other, next_attempt_at=now - timedelta(seconds=1))
+
+        with override_settings(OUTBOX={**settings.OUTBOX, 'FETCH_SIZE': fetch_size}):
+            groups = outbox.claim_due(now=now)
+
+        self.assertEqual({lock_id: [e.pk for e in events] for lock_id, events in groups.items()}, {other.pk: [ready.pk]})
+
+
+@override_settings(ANOMALY_DETECTION={
+    **settings.ANOMALY_DETECTION, 'MAX_FAILURES': 1000, 'BLOCK_SECONDS': 0,
+    'UNUSUAL_HOUR_MIN_EVENTS': 10, 'UNUSUAL_HOUR_MAX_SHARE': 0.1, 'UNUSUAL_HOUR_PERIOD_DAYS': 1,
+})
+class AnomalyTests(LockTestCase):
+    def kinds(self, alerts):
+        return {alert.kind for alert in alerts}
+
+    def test_repeated_code_counts_once_across_buckets(self):
+        conf = settings.ANOMALY_DETECTION
+        width = conf['WINDOW_SECONDS'] // conf['BUCKETS']
+        now = 1_000_000.0
+        # El mismo código en cada cubo de la ventana y uno distinto menos que el umbral
+        for i in range(conf['BUCKETS']):
+            alerts = anomaly.observe(self.lock, self.device, '10.0.0.1', '0000', False, now=now + i * width)
+            self.assertNotIn(SecurityAlert.CODE_SWEEP, self.kinds(alerts))
+        # Códigos nuevos de sobra (el bitmap es aproximado y dos códigos pueden coincidir)
+        sweep = []
+        for n in range(1, conf['MAX_DISTINCT_CODES'] + 3):
+            sweep += anomaly.observe(self.lock, self.device, '10.0.0.1', f'{n:04d}', False, now=now + i * width)
+        self.assertIn(SecurityAlert.CODE_SWEEP, self.kinds(sweep))
+
+    def test_unusual_hour_waits_for_a_full_period(self):
+        day = 24 * 3600
+        start = 100 * day + 3600  # 01h UTC, al principio de un periodo
+        for i in range(20):
+            anomaly.observe(self.lock, self.device, '10.0.0.1', '1234', True, now=start + i)
+        # A las 03h con historial suficiente pero de menos de un periodo: sin alerta
+        alerts = anomaly.observe(self.lock, self.device, '10.0.0.1', '1234', True, now=start + 2 * 3600)
+        self.assertNotIn(SecurityAlert.UNUSUAL_HOUR, self.kinds(alerts))
+        alerts = anomaly.observe(self.lock, self.device, '10.0.0.1', '1234', True, now=start + day + 2 * 3600)
+        self.assertIn(SecurityAlert.UNUSUAL_HOUR, self.kinds(alerts))
+
+
+class TelemetryTests(TransactionTestCase):
+    reading = {'battery': 80, 'rssi': -60, 'firmware_version': '1.0', 'uptime': 10}
+
+    def setUp(self):
+        owner = User.objects.create_user('owner')
+        self.lock = Lock.objects.create(name='L1', owner=owner)
+        self.device = Device.objects.create(lock=self.lock, user=owner, device_type='RFID', uid='dev-1', name='kp')
+        telemetry.flush()
+        telemetry._written_buckets.clear()
+
+    def test_older_reading_does_not_overwrite_state(self):
+        now = timezone.now()
+        telemetry._write({'dev-1': ({**self.reading, 'battery': 50}, now)})
+        telemetry._write({'dev-1': ({**self.reading, 'battery': 90}, now - timedelta(seconds=30))})
+        state = DeviceState.objects.get(device=self.device)
+        self.assertEqual((state.battery, state.last_seen), (50, now))
+
+    @override_settings(TELEMETRY={**settings.TELEMETRY, 'FLUSH_SECONDS': 0.2})
+    def test_pending_reading_is_flushed_without_more_heartbeats(self):
+        telemetry._last_flush = time.monotonic()
+        self.assertEqual(telemetry.record('dev-1', self.reading), 0)
+        deadline = time.monotonic() + 5
+        while not DeviceState.objects.filter(device=self.device).exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(DeviceState.objects.get(device=self.device).battery, 80)
+
+
+@override_settings(DEBUG=False, DEVICE_SIGNING_KEYS={1: 'master'})
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_rejected(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([error.id for error in check_shared_cache()], ['locks.E002'])
+
+    def test_shared_cache_is_accepted(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0',
+        }}):
+            self.assertEqual(check_shared_cache(), [])
+
+
+class ArchivedAccessLogTests(LockTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(ACCESS_LOG_ARCHIVE_DIR=directory.name, ACCESS_LOG_ARCHIVE_MAX_RESULTS=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        old = timezone.now() - timedelta(days=60)
+        for days in range(3):
+            log = AccessLog.objects.create(lock=self.lock, access_type='PIN', result='FAIL')
+            AccessLog.objects.filter(pk=log.pk).update(timestamp=old + timedelta(days=days))
+        archive.archive_before(timezone.now() - timedelta(days=30))
+
+    def test_unbounded_archive_query_is_rejected(self):
+        response = self.client.get('/api/accesslogs/', {'include_archived': '1'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('include_archived', response.json())
+
+    def test_archive_results_are_capped_to_the_newest(self):
+        response = self.client.get('/api/accesslogs/', {'include_archived': '1', 'lock': self.lock.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Archive-Truncated'], '2')
+        timestamps = [row['timestamp'] for row in response.json()]
+        self.assertEqual(len(timestamps), 2)
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+        newest = max(record['timestamp'] for record in archive.iter_archived({}))
+        self.assertTrue(timestamps[0].startswith(newest.strftime('%Y-%m-%dT%H:%M')))
+
+
+@skipUnless(connection.vendor == 'postgresql', "Los planes que se comprueban son los de PostgreSQL")
+class AccessLogPlanTests(LockTestCase):
+    """check_accesslog_plans: los filtros habituales de AccessLogViewSet usan índices."""
+
+    def test_filters_use_indexes(self):
+        for result in ('SUCCESS', 'FAIL'):
+            AccessLog.objects.create(
+                lock=self.lock, device=self.device, user=self.owner, access_type='PIN', result=result,
+                details='Checked by test',
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(AccessLog._meta.db_table)}")
+        out = io.StringIO()
+        call_command('check_accesslog_plans', stdout=out)  # CommandError si hay un Seq Scan
+        self.assertNotIn('SCAN', out.getvalue())
+
+
+class ProvisioningTests(LockTestCase):
+    def test_register_counts_only_new_locks(self):
+        uuids = [uuid.uuid4() for _ in range(5)]
+        self.assertEqual(register_uuids(uuids[:3], batch_size=2), 3)
+        self.assertEqual(register_uuids(uuids, batch_size=2), 2)
+        self.assertEqual(Lock.objects.filter(uuid__in=uuids, owner__isnull=True).count(), 5)
@@ -1,18 +1,23 @@
+from django.core.cache import cache as default_cache
 from rest_framework.throttling import SimpleRateThrottle
+from monitoring.metrics import InstrumentedCache
 
 class ValidatePinThrottle(SimpleRateThrottle):
     scope = 'validate_pin'
+    cache = InstrumentedCache(default_cache, 'throttle')
 
     def get_cache_key(self, request, view):
-        # Throttle by device API key if available, otherwise by IP
-        api_key = request.headers.get('X-API-KEY') or request.META.get('HTTP_X_API_KEY')
-        if api_key:
-            return self.cache_format % {
-                'scope': self.scope,
-                'ident': api_key
-            }
-        # fallback to IP
-        ident = self.get_ident(request)
+        # Se ejecuta después de los permisos: throttle por la identidad ya verificada
+        # (uid de la firma HMAC o dispositivo de la API key), nunca por cabeceras sin comprobar.
+        uid = getattr(request, 'device_uid', None)
+        device = getattr(request, 'device', None)
+        if uid:
+            ident = f"uid:{uid}"
+        elif device is not None:
+            ident = f"device:{device.pk}"
+        else:
+            # fallback to IP
+            ident = self.get_ident(request)
         return self.cache_format % {
             'scope': self.scope,
             'ident': ident
@@ -1,7 +1,7 @@
 # locks/urls.py
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import LockViewSet, PinViewSet, DeviceViewSet, AccessLogViewSet, RoleViewSet, UserRoleViewSet
+from .views import poll_commands, LockViewSet, PinViewSet, DeviceViewSet, AccessLogViewSet, RoleViewSet, UserRoleViewSet, AccessScheduleViewSet, SecurityAlertViewSet
 from accounts.views import UserViewSet
 
 router = DefaultRouter()
@@ -9,10 +9,14 @@ router.register('locks', LockViewSet, basename='lock')
 router.register('pins', PinViewSet)
 router.register('devices', DeviceViewSet)
 router.register(r'accesslogs', AccessLogViewSet, basename='accesslog')
+router.register('schedules', AccessScheduleViewSet)
+router.register('alerts', SecurityAlertViewSet)
 router.register('roles', RoleViewSet)
 router.register('user-roles', UserRoleViewSet)
 router.register(r'lock-users', UserViewSet, basename='user')
 
 urlpatterns = [
+    # Vista asíncrona (long-poll del firmware), fuera del router de DRF
+    path('locks/<str:uuid>/commands/poll/', poll_commands, name='lock-commands-poll'),
     path('', include(router.urls)),
 ]
@@ -5,27 +5,84 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from .throttles import ValidatePinThrottle
+from .renderers import DEVICE_RENDERER_CLASSES, DEVICE_PARSER_CLASSES, MSGPACK_MEDIA_TYPE, MessagePackRenderer, is_compact
 from django.utils import timezone
-from django.db.models import Q
-from .models import Role, UserRole, Lock, NetworkConfig, Pin, Device, AccessLog
+from django.db.models import Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from datetime import timedelta
+from .models import Role, UserRole, Lock, NetworkConfig, Pin, Device, AccessLog, AccessSchedule, SecurityAlert, LockCommand, DeviceState
+from . import anomaly
+from .events import record_access
+from .schedules import schedule_allows
+from .filters import filter_access_logs, parse_access_log_filters
+from . import archive, sharding
+from . import commands as lock_commands
+from . import telemetry
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
+from asgiref.sync import sync_to_async
+import time
+from django.db.models import prefetch_related_objects
+from config.dynamic_fields import DynamicFieldsViewMixin, related_paths
 from .serializers import (
     RoleSerializer, UserRoleSerializer, LockSerializer,
-    NetworkConfigSerializer, PinSerializer, DeviceSerializer, AccessLogSerializer, LockClaimSerializer
+    NetworkConfigSerializer, PinSerializer, DeviceSerializer, AccessLogSerializer, LockClaimSerializer,
+    LockSummarySerializer, AccessScheduleSerializer, SecurityAlertSerializer, LockBulkRegisterSerializer,
+    UserRoleBulkGrantSerializer, UserRoleBulkRevokeSerializer, LockCommandSerializer,
+    TelemetrySerializer, DeviceStateSerializer,
 )
-from .permissions import HasLockRolePermission, DeviceAPIKeyPermission, user_has_allowed_role
+from .provisioning import register_uuids
+from .permissions import (
+    HasLockRolePermission, DeviceAPIKeyPermission, DeviceSignaturePermission, user_has_allowed_role,
+    locks_with_allowed_role, authenticate_device,
+)
+from .signing import device_key
 from django.contrib.auth import get_user_model
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 UserModel = get_user_model()
 
-class RoleViewSet(viewsets.ModelViewSet):
+
+def count_per_lock(queryset, field='pk', distinct=False):
+    """
+    Subquery correlacionado con el lock externo que devuelve COUNT(field) (0 si no hay filas).
+    """
+    counts = (
+        queryset.filter(lock=OuterRef('pk'))
+        .order_by()
+        .values('lock')
+        .annotate(n=Count(field, distinct=distinct))
+        .values('n')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+# Códigos de las respuestas compactas (MessagePack) al firmware: [granted, reason]
+DEVICE_OK = 0
+DEVICE_DENIED = 1
+DEVICE_NOT_AUTHORIZED = 2
+DEVICE_BAD_REQUEST = 3
+DEVICE_BLOCKED = 4
+
+
+def device_response(request, payload, reason, http_status):
+    """
+    Respuesta a un dispositivo: el dict JSON habitual o, si negoció MessagePack,
+    un array fijo de dos enteros [granted, reason].
+    """
+    if is_compact(request):
+        return Response([int(reason == DEVICE_OK), reason], status=http_status)
+    return Response(payload, status=http_status)
+
+
+class RoleViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class LockViewSet(viewsets.ModelViewSet):
+class LockViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Lock.objects.all()
     serializer_class = LockSerializer
     permission_classes = [permissions.IsAuthenticated, HasLockRolePermission]
@@ -41,22 +98,95 @@ class LockViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-    @action(detail=True, methods=['post'], permission_classes=[DeviceAPIKeyPermission], throttle_classes=[ValidatePinThrottle])
+    @action(detail=False, methods=['get'], url_path='summary')
+    def fleet_summary(self, request):
+        """
+        Todas las cerraduras visibles con sus agregados (PINs activos, dispositivos, usuarios,
+        último acceso y fallos en 24h) en una sola consulta, para pintar las tarjetas del
+        dashboard sin pedir pins/devices/users/logs por cada cerradura.
+        """
+        now = timezone.now()
+        latest_log = AccessLog.objects.filter(lock=OuterRef('pk')).order_by('-timestamp')
+        active_pins = Pin.objects.filter(is_active=True).exclude(is_temporary=True, end_time__lt=now)
+
+        annotations = {
+            'active_pin_count': count_per_lock(active_pins),
+            'device_count': count_per_lock(Device.objects.all()),
+            'user_count': count_per_lock(UserRole.objects.all(), field='user', distinct=True),
+        }
+        sharded = sharding.is_sharded()
+        if not sharded:
+            annotations.update(
+                last_access_at=Subquery(latest_log.values('timestamp')[:1]),
+                last_access_result=Subquery(latest_log.values('result')[:1]),
+                failures_24h=count_per_lock(
+                    AccessLog.objects.filter(result='FAIL', timestamp__gte=now - timedelta(hours=24))
+                ),
+            )
+        locks = Lock.objects.visible_to(request.user).select_related('owner').annotate(**annotations).order_by('id')
+
+        if sharded:
+            # Los AccessLog están en otros shards: una consulta agregada por shard
+            locks = list(locks)
+            stats = sharding.lock_log_stats([lock.pk for lock in locks], now - timedelta(hours=24))
+            for lock in locks:
+                row = stats.get(lock.pk, {})
+                lock.last_access_at = row.get('last_access_at')
+                lock.last_access_result = row.get('last_access_result')
+                lock.failures_24h = row.get('failures_24h', 0)
+        return Response(LockSummarySerializer(locks, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['get'], url_path='health')
+    def fleet_health(self, request):
+        """
+        Dispositivos de las cerraduras visibles que están desconectados (sin latidos en
+        TELEMETRY['OFFLINE_AFTER_SECONDS']) o con batería baja, los más antiguos primero.
+        ?limit= (por defecto 200, máximo 1000).
+        """
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 200)), 1000))
+        except ValueError:
+            return Response({"detail": "limit debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        now = timezone.now()
+        states = telemetry.unhealthy(
+            DeviceState.objects.filter(lock__in=Lock.objects.visible_to(request.user))
+            .select_related('device', 'lock'),
+            now=now,
+        )[:limit]
+        offline_since = now - timedelta(seconds=settings.TELEMETRY['OFFLINE_AFTER_SECONDS'])
+        data = DeviceStateSerializer(states, many=True, context=self.get_serializer_context()).data
+        for row, state in zip(data, states):
+            row['offline'] = state.last_seen < offline_since
+            row['low_battery'] = state.battery <= settings.TELEMETRY['LOW_BATTERY_PERCENT']
+        return Response(data)
+
+    @action(detail=True, methods=['post'], permission_classes=[DeviceSignaturePermission | DeviceAPIKeyPermission],
+            throttle_classes=[ValidatePinThrottle],
+            renderer_classes=DEVICE_RENDERER_CLASSES, parser_classes=DEVICE_PARSER_CLASSES)
     def validate_pin(self, request, uuid=None):
-        lock = self.get_object()
         device = getattr(request, 'device', None)
 
         logger.debug("validate_pin called. request.user=%r (%s), request.device=%r", request.user, type(request.user), device)
 
-        if not device or device.lock != lock:
-            return Response({"detail": "Device not authorized for this lock."}, status=status.HTTP_403_FORBIDDEN)
+        # La cerradura se toma del propio dispositivo: con firma HMAC no hay request.user
+        # con el que filtrar get_queryset(), y así se evita otra consulta.
+        if not device or str(device.lock.uuid) != str(uuid):
+            return device_response(request, {"detail": "Device not authorized for this lock."},
+                                   DEVICE_NOT_AUTHORIZED, status.HTTP_403_FORBIDDEN)
 
-        code = request.data.get('code')
+        lock = device.lock
+        code = request.data.get('code') if isinstance(request.data, dict) else None
         if not code:
-            return Response({"detail":"code is required"}, status=status.HTTP_400_BAD_REQUEST)
+            return device_response(request, {"detail": "code is required"},
+                                   DEVICE_BAD_REQUEST, status.HTTP_400_BAD_REQUEST)
+
+        # Bloqueo temporal impuesto por el detector de anomalías
+        if anomaly.is_blocked(device):
+            return device_response(request, {"success": False, "detail": "Device temporarily blocked"},
+                                   DEVICE_BLOCKED, status.HTTP_423_LOCKED)
 
         now = timezone.now()
-        pin_obj = Pin.objects.filter(lock=lock, code=code, is_active=True).first()
+        pin_obj = Pin.objects.select_related('created_by').matching(lock, str(code)).filter(is_active=True).first()
         granted = False
 
         if pin_obj:
@@ -65,6 +195,13 @@ class LockViewSet(viewsets.ModelViewSet):
                     granted = True
             else:
                 granted = True
+            # Horarios recurrentes del PIN (índice precalculado por cerradura)
+            if granted and not schedule_allows(lock, ('pin', pin_obj.pk), now):
+                granted = False
+
+        # Horarios recurrentes del propio dispositivo
+        if granted and not schedule_allows(lock, ('device', device.pk), now):
+            granted = False
 
         # --- Selección segura del usuario para el AccessLog ---
         user_for_log = None
@@ -84,7 +221,8 @@ class LockViewSet(viewsets.ModelViewSet):
         # 3) si sigue siendo None, dejar user_for_log == None (campo FK debe permitir null)
         logger.debug("user_for_log chosen: %r (type=%s)", user_for_log, type(user_for_log) if user_for_log else None)
 
-        AccessLog.objects.create(
+        # AccessLog + evento del outbox (webhook) en la misma transacción
+        record_access(
             lock=lock,
             user=user_for_log,
             device=device,
@@ -93,12 +231,17 @@ class LockViewSet(viewsets.ModelViewSet):
             details=f"Checked by device {getattr(device, 'uid', 'unknown')}"
         )
 
+        # Detector de anomalías incremental (contadores en caché; no relee AccessLog)
+        anomaly.observe(lock, device, anomaly.client_ip(request), code, granted)
+
         if granted:
             device.last_used = now
             device.save(update_fields=['last_used'])
-            return Response({"success": True, "detail": "Access granted"}, status=status.HTTP_200_OK)
+            return device_response(request, {"success": True, "detail": "Access granted"},
+                                   DEVICE_OK, status.HTTP_200_OK)
 
-        return Response({"success": False, "detail": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+        return device_response(request, {"success": False, "detail": "Access denied"},
+                               DEVICE_DENIED, status.HTTP_403_FORBIDDEN)
     
     @action(detail=False, methods=['post'], url_path='claim')
     def claim_lock(self, request):
@@ -107,6 +250,18 @@ class LockViewSet(viewsets.ModelViewSet):
             lock = serializer.save()
             return Response(LockSerializer(lock).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], url_path='bulk-register', permission_classes=[permissions.IsAdminUser])
+    def bulk_register(self, request):
+        """
+        Pre-registro de fábrica: { "uuids": [...] } (hasta 10.000 por llamada; para lotes
+        mayores usar `manage.py register_locks`). Las UUID ya existentes se ignoran.
+        """
+        serializer = LockBulkRegisterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uuids = serializer.validated_data['uuids']
+        created = register_uuids(uuids)
+        return Response({"received": len(uuids), "created": created}, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['get', 'post', 'patch'], url_path='network', permission_classes=[permissions.IsAuthenticated, HasLockRolePermission])
     def network(self, request, uuid=None):
@@ -147,13 +302,61 @@ class LockViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class NetworkConfigViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get', 'post'], url_path='commands', permission_classes=[permissions.IsAuthenticated])
+    def remote_commands(self, request, uuid=None):
+        """
+        GET:  últimos comandos remotos de la cerradura con su estado.
+        POST: encolar un comando { "kind": "UNLOCK"|"SYNC"|"REBOOT", "payload": {...}, "ttl": s }
+              (propietario o administrador). El firmware lo recoge con commands/poll/.
+        """
+        lock = self.get_object()
+        if request.method == 'GET':
+            lock_commands.expire_overdue(lock.pk)
+            queryset = LockCommand.objects.filter(lock=lock).order_by('-created_at')[:50]
+            return Response(LockCommandSerializer(queryset, many=True, context=self.get_serializer_context()).data)
+
+        if not user_has_allowed_role(lock, request.user):
+            raise PermissionDenied("Solo el propietario o un administrador pueden enviar comandos.")
+        serializer = LockCommandSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        command = lock_commands.enqueue(
+            lock, data['kind'], user=request.user, payload=data.get('payload'), ttl=data.get('ttl'),
+        )
+        return Response(LockCommandSerializer(command).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path=r'commands/(?P<command_id>[0-9]+)/ack',
+            permission_classes=[DeviceSignaturePermission | DeviceAPIKeyPermission],
+            renderer_classes=DEVICE_RENDERER_CLASSES, parser_classes=DEVICE_PARSER_CLASSES)
+    def ack_command(self, request, uuid=None, command_id=None):
+        """Confirmación del firmware: { "ok": true|false, "detail": "..." }."""
+        device = getattr(request, 'device', None)
+        if not device or str(device.lock.uuid) != str(uuid):
+            return device_response(request, {"detail": "Device not authorized for this lock."},
+                                   DEVICE_NOT_AUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+        data = request.data if isinstance(request.data, dict) else {}
+        ok = bool(data.get('ok', True))
+        command = lock_commands.acknowledge(device.lock_id, int(command_id), ok, str(data.get('detail') or ''))
+        if command is None:
+            return device_response(request, {"detail": "Command not pending."},
+                                   DEVICE_BAD_REQUEST, status.HTTP_409_CONFLICT)
+        if command.kind == LockCommand.UNLOCK:
+            # Las aperturas remotas quedan en el registro de accesos como las del teclado
+            record_access(
+                lock=device.lock, user=command.created_by, device=device,
+                access_type='MOBILE', result='SUCCESS' if ok else 'FAIL',
+                details=f"Remote unlock #{command.pk}",
+            )
+        return device_response(request, {"success": True}, DEVICE_OK, status.HTTP_200_OK)
+
+class NetworkConfigViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = NetworkConfig.objects.all()
     serializer_class = NetworkConfigSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class PinViewSet(viewsets.ModelViewSet):
+class PinViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Pin.objects.all()
     serializer_class = PinSerializer
     permission_classes = [permissions.IsAuthenticated, HasLockRolePermission]
@@ -177,7 +380,7 @@ class PinViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=user)
 
 
-class DeviceViewSet(viewsets.ModelViewSet):
+class DeviceViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Device.objects.all()
     serializer_class = DeviceSerializer
     permission_classes = [permissions.IsAuthenticated, HasLockRolePermission]
@@ -196,6 +399,24 @@ class DeviceViewSet(viewsets.ModelViewSet):
         serializer.save(user=user)
 
 
+    @action(detail=False, methods=['post'], url_path='telemetry',
+            permission_classes=[DeviceSignaturePermission | DeviceAPIKeyPermission],
+            # Sin throttle: muchas cerraduras salen por la misma IP (NAT) y el de anónimos las cortaría
+            throttle_classes=[],
+            renderer_classes=DEVICE_RENDERER_CLASSES, parser_classes=DEVICE_PARSER_CLASSES)
+    def report_telemetry(self, request):
+        """
+        Latido del firmware: { "battery": %, "rssi": dBm, "uptime": s, "firmware_version": "..." }
+        o, en MessagePack, [battery, rssi, uptime, firmware_version]. Responde 204.
+        Con firma HMAC no se consulta la base de datos aquí (ver locks.telemetry).
+        """
+        serializer = TelemetrySerializer(data=request.data)
+        if not serializer.is_valid():
+            return device_response(request, serializer.errors, DEVICE_BAD_REQUEST, status.HTTP_400_BAD_REQUEST)
+        uid = getattr(request, 'device_uid', None) or request.device.uid
+        telemetry.record(uid, serializer.validated_data)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def regenerate_api_key(self, request, pk=None):
         device = self.get_object()
@@ -207,25 +428,184 @@ class DeviceViewSet(viewsets.ModelViewSet):
         device.save(update_fields=['api_key'])
         return Response({"api_key": device.api_key})
 
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def signing_key(self, request, pk=None):
+        """
+        Devuelve la clave HMAC (época actual) para provisionar el firmware con
+        autenticación por firma (ver locks.signing).
+        """
+        device = self.get_object()
+        if not HasLockRolePermission().has_object_permission(request, self, device):
+            raise PermissionDenied("No tienes permiso para obtener la clave de este dispositivo.")
+        if not settings.DEVICE_SIGNING_KEYS:
+            return Response({"detail": "La autenticación por firma no está configurada."}, status=status.HTTP_400_BAD_REQUEST)
+        epoch = settings.DEVICE_SIGNING_EPOCH
+        return Response({"uid": device.uid, "epoch": epoch, "key": device_key(device.uid, epoch).hex()})
 
-class AccessLogViewSet(viewsets.ModelViewSet):
-    queryset = AccessLog.objects.all()
-    serializer_class = AccessLogSerializer
-    permission_classes = [permissions.IsAuthenticated]
+
+class AccessScheduleViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = AccessSchedule.objects.all()
+    serializer_class = AccessScheduleSerializer
+    permission_classes = [permissions.IsAuthenticated, HasLockRolePermission]
 
     def get_queryset(self):
+        qs = AccessSchedule.objects.filter(lock__in=Lock.objects.visible_to(self.request.user))
+        lock_id = self.request.query_params.get('lock')
+        if lock_id:
+            try:
+                qs = qs.filter(lock_id=int(lock_id))
+            except ValueError:
+                raise serializers.ValidationError({"lock": "Debe ser un entero."})
+        return qs
+
+    def _check_can_manage(self, lock, message):
         user = self.request.user
-        if user.is_superuser:
-            return AccessLog.objects.all()
-        
-        # Cerraduras del usuario
-        owned_locks = Lock.objects.filter(owner=user)
-        managed_locks = Lock.objects.filter(user_roles__user=user)
+        if not user_has_allowed_role(lock, user, allowed_names=("propietario", "administrador")) and not user.is_superuser:
+            raise PermissionDenied(message)
 
-        return AccessLog.objects.filter(lock__in=(owned_locks | managed_locks)).distinct()
+    def perform_create(self, serializer):
+        self._check_can_manage(serializer.validated_data['lock'],
+                               "No tienes permiso para agregar horarios en esta cerradura.")
+        serializer.save()
+
+    def perform_update(self, serializer):
+        # La cerradura se deriva de la credencial: cambiar pin/device puede moverla a otra
+        message = "No tienes permiso para modificar horarios en esta cerradura."
+        self._check_can_manage(serializer.instance.lock, message)
+        if serializer.validated_data['lock'] != serializer.instance.lock:
+            self._check_can_manage(serializer.validated_data['lock'], message)
+        serializer.save()
+
+
+class SecurityAlertViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
+    """
+    Alertas del detector de anomalías. Solo lectura salvo marcar como revisada (PATCH acknowledged).
+    """
+    queryset = SecurityAlert.objects.all()
+    serializer_class = SecurityAlertSerializer
+    permission_classes = [permissions.IsAuthenticated, HasLockRolePermission]
+    http_method_names = ['get', 'patch', 'head', 'options']
 
+    def get_queryset(self):
+        qs = SecurityAlert.objects.filter(lock__in=Lock.objects.visible_to(self.request.user))
+        lock_id = self.request.query_params.get('lock')
+        if lock_id:
+            try:
+                qs = qs.filter(lock_id=int(lock_id))
+            except ValueError:
+                raise serializers.ValidationError({"lock": "Debe ser un entero."})
+        if self.request.query_params.get('pending'):
+            qs = qs.filter(acknowledged=False)
+        return qs.order_by('-created_at')
+
+
+class AccessLogViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = AccessLog.objects.all()
+    serializer_class = AccessLogSerializer
+    permission_classes = [permissions.IsAuthenticated]
 
-class UserRoleViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        user = self.request.user
+        qs = AccessLog.objects.all()
+        if not user.is_superuser:
+            # Cerraduras del usuario (subquery; no hace falta DISTINCT)
+            visible = Lock.objects.visible_to(user)
+            if sharding.is_sharded():
+                # En los shards no hay tabla de cerraduras: se filtra por ids
+                visible = list(visible.values_list('pk', flat=True))
+            qs = qs.filter(lock__in=visible)
+
+        # Filtros de servidor: lock, lock_uuid, device, user, access_type, result, since, until, search
+        if self.action == 'list':
+            qs = filter_access_logs(qs, self.request.query_params)
+        return qs.order_by('-timestamp')
+
+    def prefetch_relations(self):
+        return sharding.is_sharded()
+
+    def list(self, request, *args, **kwargs):
+        archived = self.include_archived()
+        if not archived and not sharding.is_sharded():
+            return super().list(request, *args, **kwargs)
+        # Scatter-gather: cada shard devuelve sus filas ordenadas y se combinan por timestamp
+        queryset = self.filter_queryset(self.get_queryset())
+        logs = sharding.merge_by_timestamp(sharding.scatter(queryset, lock=self.target_lock_id()))
+        headers = {}
+        if archived:
+            logs, truncated = self.merge_archived(logs)
+            if truncated:
+                headers['X-Archive-Truncated'] = str(settings.ACCESS_LOG_ARCHIVE_MAX_RESULTS)
+        return Response(self.get_serializer(logs, many=True).data, headers=headers)
+
+    def get_object(self):
+        if not sharding.is_sharded():
+            return super().get_object()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        matches = [obj for rows in sharding.scatter(queryset) for obj in rows]
+        if not matches:
+            raise Http404
+        self.check_object_permissions(self.request, matches[0])
+        return matches[0]
+
+    def target_lock_id(self):
+        """Cerradura filtrada (lock / lock_uuid), si la hay: basta con consultar su shard."""
+        lookups = parse_access_log_filters(self.request.query_params)
+        if 'lock_id' in lookups:
+            return lookups['lock_id']
+        if 'lock__uuid' in lookups:
+            # Ya validado por filter_access_logs()
+            return Lock.objects.filter(uuid=lookups['lock__uuid']).values_list('pk', flat=True).first()
+        return None
+
+    def include_archived(self):
+        """
+        Se consulta el archivo en frío si se pide explícitamente (include_archived=1) o si
+        el rango pedido (since) empieza antes del final de lo archivado. Hace falta acotar
+        la consulta con since o con una cerradura (lock / lock_uuid): sin eso habría que
+        leer el archivo entero.
+        """
+        params = self.request.query_params
+        if params.get('include_archived') in ('1', 'true'):
+            if not any(params.get(name) for name in ('since', 'lock', 'lock_uuid')):
+                raise serializers.ValidationError(
+                    {"include_archived": "Indica since, lock o lock_uuid para consultar el archivo."}
+                )
+            return True
+        since = params.get('since')
+        if not since:
+            return False
+        archived = archive.archived_range()
+        since = parse_access_log_filters({'since': since}).get('timestamp__gte')
+        return archived is not None and since <= archived[1]
+
+    def merge_archived(self, logs):
+        """
+        Añade a `logs` los ACCESS_LOG_ARCHIVE_MAX_RESULTS registros archivados más recientes
+        que cumplen los filtros; devuelve (logs, si se dejaron fuera registros archivados).
+        """
+        user = self.request.user
+        lookups = parse_access_log_filters(self.request.query_params)
+        lock_uuid = lookups.pop('lock__uuid', None)
+        if lock_uuid:
+            lock_id = Lock.objects.filter(uuid=lock_uuid).values_list('id', flat=True).first()
+            if lock_id is None or lookups.get('lock_id', lock_id) != lock_id:
+                return logs, False
+            lookups['lock_id'] = lock_id
+        lock_ids = None if user.is_superuser else set(Lock.objects.visible_to(user).values_list('id', flat=True))
+
+        seen = {log.pk for log in logs}
+        records, truncated = archive.latest_archived(lookups, lock_ids, limit=settings.ACCESS_LOG_ARCHIVE_MAX_RESULTS)
+        archived = [AccessLog(**record) for record in records if record['id'] not in seen]
+        # Relaciones anidadas/expandidas de los registros archivados: una consulta por relación
+        prefetch_related_objects(archived, *related_paths(self.get_serializer(), AccessLog))
+
+        logs.extend(archived)
+        logs.sort(key=lambda log: log.timestamp, reverse=True)
+        return logs, truncated
+
+
+class UserRoleViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     queryset = UserRole.objects.all()
     serializer_class = UserRoleSerializer
     permission_classes = [permissions.IsAuthenticated, HasLockRolePermission]
@@ -260,4 +640,107 @@ class UserRoleViewSet(viewsets.ModelViewSet):
             if new_role.name.lower() in ("propietario", "owner"):
                 return Response({"detail": "No se puede asignar el rol propietario desde aquí."}, status=status.HTTP_403_FORBIDDEN)
 
-        return super().update(request, *args, **kwargs)
\ No newline at end of file
+        return super().update(request, *args, **kwargs)
+
+    def _bulk_serializer(self, serializer_class, request):
+        """Valida el payload y comprueba el permiso una vez por cerradura (una sola consulta)."""
+        serializer = serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        locks = serializer.validated_data['locks']
+        allowed = locks_with_allowed_role(request.user, [lock.pk for lock in locks])
+        denied = sorted(lock.pk for lock in locks if lock.pk not in allowed)
+        if denied:
+            raise PermissionDenied(f"No puedes gestionar los usuarios de las cerraduras {denied}.")
+        return serializer
+
+    @action(detail=False, methods=['post'], url_path='bulk-grant')
+    def bulk_grant(self, request):
+        """
+        { "users": [...], "locks": [...], "roles": [...] }: asigna cada rol a cada usuario en
+        cada cerradura. Las asignaciones ya existentes se ignoran.
+        """
+        serializer = self._bulk_serializer(UserRoleBulkGrantSerializer, request)
+        if any(role.name.lower() in ("propietario", "owner") for role in serializer.validated_data['roles']):
+            return Response({"detail": "No se puede asignar el rol propietario desde aquí."}, status=status.HTTP_403_FORBIDDEN)
+        created = serializer.save()
+        return Response({"created": created}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='bulk-revoke')
+    def bulk_revoke(self, request):
+        """
+        { "users": [...], "locks": [...], "roles": [...] (opcional) }: retira esos roles (o
+        todos) a los usuarios en las cerraduras, p.ej. al dar de baja a un contratista.
+        El propietario de cada cerradura conserva su rol.
+        """
+        serializer = self._bulk_serializer(UserRoleBulkRevokeSerializer, request)
+        deleted = serializer.save()
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
+
+def _release_after(func):
+    """func en el hilo del request y, después, cierre de sus conexiones (ver poll_commands)."""
+    def wrapped(*args):
+        try:
+            return func(*args)
+        finally:
+            lock_commands.release_connections()
+    return sync_to_async(wrapped)
+
+
+def _poll_lock_id(request, uuid):
+    device = authenticate_device(request)
+    if device is None or str(device.lock.uuid) != str(uuid):
+        return None
+    return device.lock_id
+
+
+def _commands_response(request, batch):
+    """JSON o, si el firmware lo negocia, MessagePack compacto: [[id, kind, expires_ts, payload], ...]."""
+    if MSGPACK_MEDIA_TYPE in request.headers.get('Accept', ''):
+        rows = [[c.pk, c.kind, int(c.expires_at.timestamp()), c.payload] for c in batch]
+        return HttpResponse(MessagePackRenderer().render(rows), content_type=MSGPACK_MEDIA_TYPE)
+    return JsonResponse({"commands": [
+        {"id": c.pk, "kind": c.kind, "payload": c.payload, "expires_at": c.expires_at} for c in batch
+    ]})
+
+
+async def poll_commands(request, uuid):
+    """
+    GET /api/locks/{uuid}/commands/poll/?timeout=25 (firmware: firma HMAC o X-API-KEY).
+
+    Long-poll: responde en cuanto haya comandos (200, en orden de id) o al vencer el
+    timeout (204). Mientras espera no tiene conexión a la base de datos; lo despierta
+    locks.commands.wake() al encolar o confirmar un comando. Pensado para servirse con
+    ASGI (config.asgi_device); con WSGI funciona pero bloquea un worker.
+
+    Bajo ASGI la espera no bloquea el event loop, pero el request conserva su hilo: Django
+    da a cada request un executor propio (ThreadSensitiveContext) para sync_to_async y ese
+    hilo queda parado hasta que el request termina. Son N hilos ociosos para N long-polls
+    abiertos (dimensionar el límite de hilos del proceso con eso en cuenta).
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    lock_id = await _release_after(_poll_lock_id)(request, uuid)
+    if lock_id is None:
+        return JsonResponse({"detail": "Device not authorized for this lock."}, status=status.HTTP_403_FORBIDDEN)
+
+    conf = settings.LOCK_COMMANDS
+    try:
+        timeout = float(request.GET.get('timeout', conf['POLL_TIMEOUT_SECONDS']))
+    except ValueError:
+        timeout = conf['POLL_TIMEOUT_SECONDS']
+    timeout = max(0.0, min(timeout, conf['MAX_POLL_TIMEOUT_SECONDS']))
+    deadline = time.monotonic() + timeout
+
+    with lock_commands.waiter(lock_id) as wakeup:
+        while True:
+            batch, retry_at = await _release_after(lock_commands.claim)(lock_id)
+            if batch:
+                return _commands_response(request, batch)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+            if retry_at is not None:
+                # Un comando entregado espera confirmación: volver a mirar cuando venza el plazo
+                remaining = min(remaining, max((retry_at - timezone.now()).total_seconds(), 0.1))
+            await wakeup.wait(remaining)
@@ -0,0 +1,106 @@
+# monitoring/management/commands/bench_startup.py
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Se ejecuta en un proceso nuevo por medición: import + django.setup() + carga de
+# middleware/URLconf (get_wsgi_application) y después dos requests WSGI sin
+# credenciales a validate_pin (403 en la capa de permisos, sin tocar la base de datos).
+CHILD = r"""
+import io, json, os, resource, sys, time, uuid
+t0 = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = sys.argv[1]
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+t1 = time.perf_counter()
+
+from django.conf import settings
+from django.urls import reverse
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+startup_rss = rss_mb()
+path = reverse('lock-validate-pin', kwargs={'uuid': str(uuid.uuid4())})
+host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '')), 'localhost').lstrip('.')
+
+def request():
+    body = b'{"code": "0000"}'
+    environ = {
+        'REQUEST_METHOD': 'POST', 'PATH_INFO': path, 'SERVER_NAME': host, 'SERVER_PORT': '80',
+        'HTTP_HOST': host, 'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    statuses = []
+    start = time.perf_counter()
+    b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    return (time.perf_counter() - start) * 1000, statuses[0]
+
+first_ms, status = request()
+warm_ms, _ = request()
+print(json.dumps({
+    'startup_ms': (t1 - t0) * 1000,
+    'first_request_ms': first_ms,
+    'warm_request_ms': warm_ms,
+    'status': status,
+    'startup_rss_mb': startup_rss,
+    'rss_mb': rss_mb(),
+    'modules': len(sys.modules),
+    'apps': len(settings.INSTALLED_APPS),
+    'middleware': len(settings.MIDDLEWARE),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Compara tiempo de arranque y memoria (RSS) de la app completa frente al servicio de firmware."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', default='config.settings', help="Settings de la app completa")
+        parser.add_argument('--device', default='config.settings_device', help="Settings del servicio de firmware")
+        parser.add_argument('--runs', type=int, default=5, help="Procesos por configuración (se toma la mediana)")
+
+    def measure(self, settings_module):
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, settings_module],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"{settings_module}: {result.stderr.strip().splitlines()[-1:]}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        rows = {}
+        for label in ('full', 'device'):
+            samples = [self.measure(options[label]) for _ in range(options['runs'])]
+            rows[label] = {key: statistics.median(s[key] for s in samples) for key in samples[0] if key != 'status'}
+            rows[label]['status'] = samples[0]['status']
+
+        metrics = [
+            ('startup_ms', "Arranque (ms)"),
+            ('first_request_ms', "Primer request (ms)"),
+            ('warm_request_ms', "Request en caliente (ms)"),
+            ('startup_rss_mb', "RSS tras arrancar (MB)"),
+            ('rss_mb', "RSS tras 2 requests (MB)"),
+            ('modules', "Módulos importados"),
+            ('apps', "INSTALLED_APPS"),
+            ('middleware', "MIDDLEWARE"),
+        ]
+        self.stdout.write(f"{'':28}{'completa':>12}{'firmware':>12}{'ahorro':>10}")
+        for key, title in metrics:
+            full, device = rows['full'][key], rows['device'][key]
+            saving = f"{(1 - device / full) * 100:.0f}%" if full else "-"
+            self.stdout.write(f"{title:28}{full:12.1f}{device:12.1f}{saving:>10}")
+        self.stdout.write(f"Estado del request de prueba: {rows['full']['status']} / {rows['device']['status']}")
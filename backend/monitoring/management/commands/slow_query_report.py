@@ -0,0 +1,51 @@
+# monitoring/management/commands/slow_query_report.py
+import json
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Resume el log de consultas lentas agrupando por vista y call site."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(settings.LOG_DIR / 'slow_queries.log'))
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--view', help="Filtrar por nombre de vista (p.ej. accesslog-list)")
+        parser.add_argument('--plans', action='store_true', help="Mostrar el último plan capturado de cada grupo")
+
+    def handle(self, *args, **options):
+        groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'sql': '', 'plan': None})
+        try:
+            fh = open(options['file'], encoding='utf-8')
+        except FileNotFoundError:
+            self.stdout.write("No hay consultas lentas registradas.")
+            return
+
+        with fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if options['view'] and entry.get('view') != options['view']:
+                    continue
+                g = groups[(entry.get('view'), entry.get('callsite'))]
+                g['count'] += 1
+                g['total_ms'] += entry['duration_ms']
+                g['max_ms'] = max(g['max_ms'], entry['duration_ms'])
+                g['sql'] = entry.get('sql', '')
+                if entry.get('plan'):
+                    g['plan'] = entry['plan']
+
+        ranked = sorted(groups.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)
+        for (view, callsite), g in ranked[:options['top']]:
+            self.stdout.write(
+                f"{g['total_ms']:10.1f} ms total  {g['count']:6d}x  max {g['max_ms']:8.1f} ms  "
+                f"{view or '-'}  {callsite}"
+            )
+            self.stdout.write(f"    {g['sql'][:200]}")
+            if options['plans'] and g['plan']:
+                plan = g['plan'] if isinstance(g['plan'], list) else [g['plan']]
+                for row in plan:
+                    self.stdout.write(f"      {row}")
@@ -0,0 +1,226 @@
+# monitoring/metrics.py
+"""
+Registro de métricas en proceso con exportación en formato texto de Prometheus.
+
+Cada hilo escribe en su propio "shard" (diccionarios locales al hilo), de modo que
+el camino caliente (etiquetas ya vistas) no toma ningún lock: solo se sincronizan el
+registro de un hilo nuevo, la primera aparición de una combinación de etiquetas en
+el shard (con el lock del shard) y el scrape, que copia cada shard con ese mismo lock.
+Los histogramas usan buckets fijos preasignados como listas de enteros.
+
+Nota: con varios workers (gunicorn/uvicorn) cada proceso expone sus propios valores;
+Prometheus debe scrapear cada worker o agregarlos por instancia.
+"""
+import threading
+from bisect import bisect_left
+
+# Buckets por defecto (segundos) para latencias de request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets para número de consultas SQL por request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Buckets (bytes) para tamaño de respuesta
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+_registry_lock = threading.Lock()
+_shards = []
+_local = threading.local()
+_metrics = []
+
+
+class _Shard:
+    __slots__ = ('slots', 'lock')
+
+    def __init__(self):
+        self.slots = {}
+        # Protege la inserción de claves nuevas frente a la copia que hace el scrape
+        self.lock = threading.Lock()
+
+    def snapshot(self, metric):
+        """Copia de (etiquetas, valor) de una métrica; las filas de histograma se copian."""
+        with self.lock:
+            slot = self.slots.get(metric)
+            if not slot:
+                return []
+            return [(labels, list(v) if isinstance(v, list) else v) for labels, v in slot.items()]
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _Shard()
+        with _registry_lock:
+            _shards.append(shard)
+        _local.shard = shard
+    return shard
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        with _registry_lock:
+            _metrics.append(self)
+
+    def _slot(self):
+        # Cada métrica tiene su propio dict dentro del shard del hilo actual
+        shard = _shard()
+        slot = shard.slots.get(self)
+        if slot is None:
+            with shard.lock:
+                slot = shard.slots[self] = {}
+        return shard, slot
+
+    def _format_labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        body = ','.join('%s="%s"' % (k, _escape(v)) for k, v in pairs)
+        return '{%s}' % body
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        shard, slot = self._slot()
+        if labels in slot:
+            slot[labels] += amount
+        else:
+            with shard.lock:
+                slot[labels] = amount
+
+    def collect(self, shards):
+        totals = {}
+        for shard in shards:
+            for labels, value in shard.snapshot(self):
+                totals[labels] = totals.get(labels, 0) + value
+        for labels, value in sorted(totals.items()):
+            yield '%s%s %s' % (self.name, self._format_labels(labels), _number(value))
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # [bucket_0 .. bucket_n, +Inf, sum, count]
+        self._width = len(self.buckets) + 3
+
+    def observe(self, value, *labels):
+        shard, slot = self._slot()
+        row = slot.get(labels)
+        if row is None:
+            row = [0] * self._width
+            with shard.lock:
+                slot[labels] = row
+        row[bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def collect(self, shards):
+        totals = {}
+        for shard in shards:
+            for labels, row in shard.snapshot(self):
+                acc = totals.get(labels)
+                if acc is None:
+                    acc = totals[labels] = [0] * self._width
+                for i, v in enumerate(row):
+                    acc[i] += v
+        for labels, row in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), row[:-2]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                yield '%s_bucket%s %d' % (self.name, self._format_labels(labels, [('le', le)]), cumulative)
+            yield '%s_sum%s %s' % (self.name, self._format_labels(labels), _number(row[-2]))
+            yield '%s_count%s %d' % (self.name, self._format_labels(labels), row[-1])
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_prometheus():
+    """Devuelve todas las métricas registradas en formato de exposición de texto 0.0.4."""
+    with _registry_lock:
+        shards = list(_shards)
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+        lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+        lines.extend(metric.collect(shards))
+    return '\n'.join(lines) + '\n'
+
+
+class InstrumentedCache:
+    """
+    Proxy sobre un backend de caché de Django que cuenta aciertos/fallos de get().
+    Se usa, por ejemplo, como `cache` de los throttles.
+    """
+    _missing = object()
+
+    def __init__(self, backend, name):
+        self._backend = backend
+        self._name = name
+
+    def get(self, key, default=None, version=None):
+        value = self._backend.get(key, self._missing, version=version)
+        if value is self._missing:
+            CACHE_REQUESTS.inc(self._name, 'miss')
+            return default
+        CACHE_REQUESTS.inc(self._name, 'hit')
+        return value
+
+    def __getattr__(self, attr):
+        return getattr(self._backend, attr)
+
+
+# MÉTRICAS DE LA API
+REQUEST_LATENCY = Histogram(
+    'smartlock_http_request_duration_seconds',
+    'Latencia de requests HTTP por vista.',
+    ('view', 'method'),
+)
+REQUESTS = Counter(
+    'smartlock_http_requests_total',
+    'Requests HTTP por vista, método y código de estado.',
+    ('view', 'method', 'status'),
+)
+RESPONSE_SIZE = Histogram(
+    'smartlock_http_response_size_bytes',
+    'Tamaño del cuerpo de la respuesta por vista.',
+    ('view',),
+    buckets=SIZE_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'smartlock_db_queries_per_request',
+    'Número de consultas SQL ejecutadas por request.',
+    ('view',),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = Counter(
+    'smartlock_db_query_seconds_total',
+    'Tiempo acumulado en consultas SQL por vista.',
+    ('view',),
+)
+THROTTLED = Counter(
+    'smartlock_throttled_requests_total',
+    'Requests rechazadas por throttling (HTTP 429) por vista.',
+    ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'smartlock_cache_requests_total',
+    'Lecturas de caché por nombre lógico y resultado (hit/miss).',
+    ('cache', 'result'),
+)
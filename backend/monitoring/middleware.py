@@ -0,0 +1,170 @@
+# monitoring/middleware.py
+import time
+from abc import ABC, abstractmethod
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from . import metrics, profiling
+from .slowqueries import SlowQueryRecorder
+
+
+class _QueryCounter:
+    """execute_wrapper que acumula número y tiempo de consultas de un request."""
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.count += 1
+
+
+def _add_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class _HybridMiddleware(ABC):
+    """
+    Middleware síncrono y asíncrono. Bajo ASGI, si toda la pila es asíncrona, las vistas
+    async (p.ej. el long-poll de locks.views.poll_commands) se ejecutan en el event loop
+    sin pasar por sync_to_async en cada capa.
+    Las consultas de un request ASGI se hacen en su hilo (sync_to_async thread_sensitive),
+    así que los execute_wrapper se instalan en la conexión de ese hilo.
+
+    Las subclases implementan wrapper() y, si lo necesitan, process().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @abstractmethod
+    def wrapper(self, request):
+        """execute_wrapper que se instala en la conexión durante el request."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        wrapper = self.wrapper(request)
+        start = time.perf_counter()
+        with connection.execute_wrapper(wrapper):
+            response = self.get_response(request)
+        self.process(request, response, wrapper, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        wrapper = self.wrapper(request)
+        start = time.perf_counter()
+        await sync_to_async(_add_wrapper)(wrapper)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(wrapper)
+        self.process(request, response, wrapper, time.perf_counter() - start)
+        return response
+
+    def process(self, request, response, wrapper, elapsed):
+        """Se llama con la respuesta, el wrapper del request y la duración total."""
+
+
+class MetricsMiddleware(_HybridMiddleware):
+    """
+    Registra por vista: latencia, código de estado, tamaño de respuesta,
+    consultas SQL (número y tiempo) y rechazos por throttling.
+    Debe ir primero en MIDDLEWARE para medir toda la pila.
+    """
+    def wrapper(self, request):
+        return _QueryCounter()
+
+    def process(self, request, response, counter, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        method = request.method
+
+        metrics.REQUEST_LATENCY.observe(elapsed, view, method)
+        metrics.REQUESTS.inc(view, method, str(response.status_code))
+        metrics.DB_QUERIES.observe(counter.count, view)
+        if counter.elapsed:
+            metrics.DB_TIME.inc(view, amount=counter.elapsed)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view)
+        if response.status_code == 429:
+            metrics.THROTTLED.inc(view)
+
+
+class SlowQueryMiddleware(_HybridMiddleware):
+    """
+    Registra las consultas que superan SLOW_QUERY_THRESHOLD_MS junto con la vista
+    y el call site (ver monitoring.slowqueries).
+    """
+    def wrapper(self, request):
+        return SlowQueryRecorder(request)
+
+
+class ProfilingMiddleware:
+    """
+    Perfila (cProfile, línea de tiempo SQL y tracemalloc) los requests que lo piden con
+    X-Profile o que salen en el muestreo (ver monitoring.profiling). Sin PROFILING_TOKEN
+    ni PROFILING_SAMPLE_RATE no se instala; el resto de requests pasan sin envoltorio.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not profiling.requested(request):
+            return self.get_response(request)
+        session = profiling.Session(request)
+        if not session.begin():
+            return self.get_response(request)
+        try:
+            profiler = session.enable_profiler()
+            try:
+                with connection.execute_wrapper(session.timeline):
+                    response = self.get_response(request)
+            finally:
+                profiler.disable()
+            session.save(response)
+        finally:
+            session.end()
+        return response
+
+    async def __acall__(self, request):
+        if not profiling.requested(request):
+            return await self.get_response(request)
+        session = profiling.Session(request)
+        if not session.begin():
+            return await self.get_response(request)
+        try:
+            await sync_to_async(session.enter_thread)()
+            profiler = session.enable_profiler()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+                await sync_to_async(session.exit_thread)()
+            session.save(response)
+        finally:
+            session.end()
+        return response
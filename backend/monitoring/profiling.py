@@ -0,0 +1,215 @@
+# monitoring/profiling.py
+"""
+Perfilado bajo demanda de requests concretos (ProfilingMiddleware).
+
+Un request se perfila si trae la cabecera X-Profile con el valor de PROFILING_TOKEN o si
+sale en el muestreo PROFILING_SAMPLE_RATE. Sin token ni muestreo el middleware se retira
+al arrancar (MiddlewareNotUsed), así que no cuesta nada; con ellos, a los requests no
+elegidos solo les cuesta leer una cabecera.
+
+De cada request perfilado se guarda en PROFILING_DIR:
+- <id>.prof: estadísticas de cProfile (pstats; se abren con snakeviz o pstats.Stats),
+- <id>.json: vista, duración, funciones con más tiempo acumulado, línea de tiempo de las
+  consultas SQL (con su call site) y memoria asignada por línea (tracemalloc).
+La respuesta lleva X-Profile-Id y se descarga desde /profiles/<id>/ y /profiles/<id>/prof/
+con 'Authorization: Bearer <PROFILING_TOKEN>'. Se conservan los PROFILING_MAX_FILES últimos.
+
+tracemalloc es global al proceso: se perfila un solo request a la vez por proceso y los
+que coinciden con él se sirven sin perfilar. Bajo ASGI el perfil del event loop incluye
+también lo que otras corrutinas ejecuten mientras el request espera.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .slowqueries import find_call_site
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+_MAX_SQL_LENGTH = 2000
+_TOP_FUNCTIONS = 40
+_TOP_ALLOCATIONS = 25
+_TRACEMALLOC_FRAMES = 1
+
+_busy = threading.Lock()
+
+
+def enabled():
+    return bool(settings.PROFILING_TOKEN) or settings.PROFILING_SAMPLE_RATE > 0
+
+
+def is_authorized(supplied):
+    token = settings.PROFILING_TOKEN
+    return bool(token) and supplied is not None and hmac.compare_digest(supplied, token)
+
+
+def requested(request):
+    supplied = request.headers.get(PROFILE_HEADER)
+    if supplied is not None:
+        return is_authorized(supplied)
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def is_valid_id(profile_id):
+    # <AAAAMMDDTHHMMSS>-<8 hex>: nada de rutas
+    stamp, _, suffix = profile_id.partition('-')
+    return len(stamp) == 15 and stamp.replace('T', '', 1).isdigit() and len(suffix) == 8 and all(
+        c in '0123456789abcdef' for c in suffix
+    )
+
+
+class QueryTimeline:
+    """execute_wrapper que anota cada consulta con su inicio relativo al request."""
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'start_ms': round((start - self.started) * 1000, 3),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                'db': context['connection'].alias,
+                'many': many,
+                'callsite': find_call_site(),
+                'sql': sql[:_MAX_SQL_LENGTH],
+            })
+
+
+class Session:
+    """Un request perfilado. begin() devuelve False si ya hay otro en curso en el proceso."""
+
+    def __init__(self, request):
+        self.request = request
+        self.started = time.perf_counter()
+        self.timeline = QueryTimeline(self.started)
+        self.profilers = []
+        self._thread_profiler = None
+        self._owns_tracemalloc = False
+        self._before = None
+
+    def begin(self):
+        if not _busy.acquire(blocking=False):
+            return False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+        self.started = self.timeline.started = time.perf_counter()
+        return True
+
+    def end(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        _busy.release()
+
+    def enable_profiler(self):
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        profiler.enable()
+        return profiler
+
+    # Bajo ASGI las vistas síncronas corren en otro hilo (sync_to_async thread_sensitive):
+    # el perfil y el execute_wrapper se activan en ese hilo con estas dos funciones.
+    def enter_thread(self):
+        connection.execute_wrappers.append(self.timeline)
+        self._thread_profiler = self.enable_profiler()
+
+    def exit_thread(self):
+        self._thread_profiler.disable()
+        connection.execute_wrappers.remove(self.timeline)
+
+    def _allocations(self):
+        after = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        current, peak = tracemalloc.get_traced_memory()
+        top = [
+            {'where': str(stat.traceback[0]), 'size_kb': round(stat.size_diff / 1024, 1), 'count': stat.count_diff}
+            for stat in after.compare_to(self._before, 'lineno')[:_TOP_ALLOCATIONS]
+        ]
+        return {'peak_kb': round(peak / 1024, 1), 'current_kb': round(current / 1024, 1), 'top': top}
+
+    @staticmethod
+    def _top_functions(stats):
+        base = str(settings.BASE_DIR)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:_TOP_FUNCTIONS]
+        functions = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows:
+            if filename.startswith(base):
+                filename = os.path.relpath(filename, base)
+            functions.append({
+                'function': f"{filename}:{line}({name})", 'calls': calls,
+                'tottime_ms': round(total * 1000, 3), 'cumtime_ms': round(cumulative * 1000, 3),
+            })
+        return functions
+
+    def save(self, response):
+        """Escribe <id>.prof y <id>.json, añade X-Profile-Id a la respuesta y devuelve el id."""
+        elapsed = time.perf_counter() - self.started
+        allocations = self._allocations()
+        stats = pstats.Stats(self.profilers[0])
+        for profiler in self.profilers[1:]:
+            stats.add(profiler)
+
+        profile_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(directory / f"{profile_id}.prof")
+        match = getattr(self.request, 'resolver_match', None)
+        summary = {
+            'id': profile_id,
+            'ts': timezone.now().isoformat(),
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'queries': {
+                'count': len(self.timeline.queries),
+                'duration_ms': round(sum(q['duration_ms'] for q in self.timeline.queries), 3),
+                'timeline': self.timeline.queries,
+            },
+            'allocations': allocations,
+            'functions': self._top_functions(stats),
+        }
+        (directory / f"{profile_id}.json").write_text(json.dumps(summary, default=str))
+        prune(directory)
+        response[PROFILE_ID_HEADER] = profile_id
+        return profile_id
+
+
+def prune(directory):
+    summaries = sorted(directory.glob('*.json'), key=lambda path: path.name)
+    for path in summaries[:-settings.PROFILING_MAX_FILES or None]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Resúmenes cortos, del más reciente al más antiguo."""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), key=lambda path: path.name, reverse=True):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        profiles.append({key: data.get(key) for key in ('id', 'ts', 'method', 'path', 'view', 'status', 'duration_ms')})
+    return profiles
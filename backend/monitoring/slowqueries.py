@@ -0,0 +1,105 @@
+# monitoring/slowqueries.py
+"""
+Captura de consultas lentas.
+
+SlowQueryRecorder se instala con `connection.execute_wrapper` (ver SlowQueryMiddleware)
+y, cuando una consulta supera SLOW_QUERY_THRESHOLD_MS, escribe una línea JSON en el
+logger 'monitoring.slowqueries' con la vista, el punto del código que la lanzó y,
+con probabilidad SLOW_QUERY_EXPLAIN_RATE, el plan de ejecución (EXPLAIN sin ANALYZE,
+por lo que es seguro incluso para UPDATE/DELETE).
+"""
+import json
+import logging
+import os
+import random
+import time
+import traceback
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger('monitoring.slowqueries')
+
+# Frames que no cuentan como "call site" (framework y el propio monitor)
+_IGNORED_PATHS = (
+    os.sep + 'django' + os.sep,
+    os.sep + 'rest_framework' + os.sep,
+    os.sep + 'site-packages' + os.sep,
+    os.sep + 'monitoring' + os.sep,
+)
+_MAX_SQL_LENGTH = 4000
+# Tope de EXPLAINs por request para no multiplicar la carga en un request patológico
+_MAX_EXPLAINS_PER_REQUEST = 3
+
+
+def find_call_site():
+    """Primer frame del proyecto (fuera de Django/DRF) en la pila actual."""
+    base = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if not filename.startswith(base) or any(p in filename for p in _IGNORED_PATHS):
+            continue
+        return f"{os.path.relpath(filename, base)}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+class SlowQueryRecorder:
+    def __init__(self, request=None, threshold_ms=None, explain_rate=None):
+        self.request = request
+        self.threshold = (threshold_ms if threshold_ms is not None else settings.SLOW_QUERY_THRESHOLD_MS) / 1000.0
+        self.explain_rate = explain_rate if explain_rate is not None else settings.SLOW_QUERY_EXPLAIN_RATE
+        self.explains = 0
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # No medir los propios EXPLAIN
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed = time.perf_counter() - start
+        if elapsed >= self.threshold:
+            self.record(sql, params, many, elapsed, context['connection'])
+        return result
+
+    def record(self, sql, params, many, elapsed, connection):
+        entry = {
+            'ts': timezone.now().isoformat(),
+            'duration_ms': round(elapsed * 1000, 2),
+            'db': connection.alias,
+            'view': self._view_name(),
+            'method': getattr(self.request, 'method', None),
+            'path': getattr(self.request, 'path', None),
+            'callsite': find_call_site(),
+            'sql': sql[:_MAX_SQL_LENGTH],
+        }
+        if not many and self._should_explain():
+            entry['plan'] = self.explain(sql, params, connection)
+        logger.warning(json.dumps(entry, default=str))
+
+    def _view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    def _should_explain(self):
+        if self.explains >= _MAX_EXPLAINS_PER_REQUEST or not self.explain_rate:
+            return False
+        return random.random() < self.explain_rate
+
+    def explain(self, sql, params, connection):
+        statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        if statement not in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+            return None
+        self.explains += 1
+        self._explaining = True
+        try:
+            # Cursor nuevo: el original todavía puede tener filas sin leer.
+            # El savepoint evita que un EXPLAIN fallido aborte la transacción en curso.
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception as exc:  # el EXPLAIN nunca debe romper el request
+            return f"EXPLAIN failed: {exc}"
+        finally:
+            self._explaining = False
@@ -0,0 +1,17 @@
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(DEBUG=False, METRICS_TOKEN=None, METRICS_ALLOWED_IPS=[])
+class MetricsViewTests(SimpleTestCase):
+    def test_closed_without_token_or_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', headers={'Authorization': 'Bearer secret'}).status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='192.168.1.1').status_code, 403)
@@ -0,0 +1,10 @@
+# monitoring/urls.py
+from django.urls import path
+from .views import metrics_view, profile_detail, profile_download, profile_list
+
+urlpatterns = [
+    path('metrics/', metrics_view, name='metrics'),
+    path('profiles/', profile_list, name='profile-list'),
+    path('profiles/<str:profile_id>/', profile_detail, name='profile-detail'),
+    path('profiles/<str:profile_id>/prof/', profile_download, name='profile-download'),
+]
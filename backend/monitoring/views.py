@@ -0,0 +1,81 @@
+# monitoring/views.py
+import hmac
+import ipaddress
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_GET
+from . import profiling
+from .metrics import render_prometheus
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Endpoint de scrape para Prometheus.
+    Con settings.METRICS_TOKEN exige 'Authorization: Bearer <token>' y con
+    METRICS_ALLOWED_IPS, que REMOTE_ADDR esté en alguna de esas redes. Sin ninguno de
+    los dos solo se sirve con DEBUG.
+    """
+    if not _metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _metrics_access(request):
+    token = settings.METRICS_TOKEN
+    allowed = settings.METRICS_ALLOWED_IPS
+    if not token and not allowed:
+        return settings.DEBUG
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'):
+            return False
+    if allowed:
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+        except ValueError:
+            return False
+        return any(address in ipaddress.ip_network(network, strict=False) for network in allowed)
+    return True
+
+
+def _profile_access(request):
+    """Los perfiles exigen siempre 'Authorization: Bearer <PROFILING_TOKEN>'; sin token no existen."""
+    if not settings.PROFILING_TOKEN:
+        raise Http404
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    return scheme == 'Bearer' and profiling.is_authorized(supplied)
+
+
+def _profile_path(profile_id, suffix):
+    if not profiling.is_valid_id(profile_id):
+        raise Http404
+    path = profiling.profile_dir() / f"{profile_id}{suffix}"
+    if not path.is_file():
+        raise Http404
+    return path
+
+
+@require_GET
+def profile_list(request):
+    if not _profile_access(request):
+        return HttpResponseForbidden()
+    return JsonResponse({'profiles': profiling.list_profiles()})
+
+
+@require_GET
+def profile_detail(request, profile_id):
+    """Resumen JSON: consultas, asignaciones y funciones con más tiempo acumulado."""
+    if not _profile_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(_profile_path(profile_id, '.json').read_bytes(), content_type='application/json')
+
+
+@require_GET
+def profile_download(request, profile_id):
+    """Volcado de cProfile (pstats) para snakeviz o pstats.Stats."""
+    if not _profile_access(request):
+        return HttpResponseForbidden()
+    path = _profile_path(profile_id, '.prof')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name,
+                        content_type='application/octet-stream')
@@ -2,4 +2,6 @@
 import api from "./axiosClient";
 
 export const listAccessLogs = (params = {}) => api.get("accesslogs/", { params });
-// params: { lock_uuid: 'uuid' } or server-side filters
+// params (filtros de servidor, combinables):
+//   { lock, lock_uuid, device, user, access_type, result, since, until, search }
+//   since/until en ISO 8601; search = prefijo de "details"
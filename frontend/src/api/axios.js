@@ -1,9 +1,12 @@
 // src/api/axios.js
 import axios from "axios";
+import { attachReplicaPin } from "./replicaPin";
 
 const api = axios.create({
   baseURL: "https://40llgzg0-8000.use2.devtunnels.ms/api/",
   headers: { "Content-Type": "application/json" },
 });
 
+attachReplicaPin(api);
+
 export default api;
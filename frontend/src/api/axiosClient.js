@@ -14,6 +14,7 @@
  */
 
 import axios from "axios";
+import { attachReplicaPin } from "./replicaPin";
 import {
   getAccessToken,
   getRefreshToken,
@@ -152,4 +153,6 @@ api.interceptors.response.use(
   }
 );
 
+attachReplicaPin(api);
+
 export default api;
@@ -0,0 +1,14 @@
+// src/api/batch.js
+import api from "./axiosClient";
+
+/**
+ * Varias llamadas en un solo request (POST /api/batch/).
+ * requests: [{ method: "GET", path: "locks/<uuid>/" }, { method: "POST", path: "pins/", body: {...} }]
+ * Devuelve [{ status, body }] en el mismo orden; cada sub-request puede fallar por separado.
+ */
+export const batch = async (requests) => {
+  const res = await api.post("batch/", { requests });
+  return res.data.responses;
+};
+
+export default { batch };
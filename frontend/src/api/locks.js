@@ -3,6 +3,9 @@ import api from "./axiosClient";
 
 export const listLocks = (params = {}) => api.get("locks/", { params });
 
+// Cerraduras visibles con agregados (pins activos, dispositivos, usuarios, último acceso, fallos 24h)
+export const getFleetSummary = () => api.get("locks/summary/");
+
 export const getLock = (uuid) => api.get(`locks/${uuid}/`);
 
 export const claimLock = (payload) => api.post("locks/claim/", payload);
@@ -16,13 +19,20 @@ export const getLockNetworkConfig = (uuid) => api.get(`locks/${uuid}/network/`);
 export const createLockNetworkConfig = (uuid, payload) => api.post(`locks/${uuid}/network/`, payload);
 export const updateLockNetworkConfig = (uuid, payload) => api.patch(`locks/${uuid}/network/`, payload);
 
+// Comandos remotos (el firmware los recoge por long-poll): kind = "UNLOCK" | "SYNC" | "REBOOT"
+export const sendLockCommand = (uuid, kind, payload = {}) => api.post(`locks/${uuid}/commands/`, { kind, payload });
+export const listLockCommands = (uuid) => api.get(`locks/${uuid}/commands/`);
+
 export default {
     getLock,
     listLocks,
+    getFleetSummary,
     claimLock,
     updateLock,
     deleteLock,
     getLockNetworkConfig,
     createLockNetworkConfig,
     updateLockNetworkConfig,
+    sendLockCommand,
+    listLockCommands,
 };
\ No newline at end of file
@@ -0,0 +1,40 @@
+// src/api/replicaPin.js
+/**
+ * Lecturas propias tras una escritura con réplicas de BD.
+ *
+ * Después de una escritura el backend responde con X-DB-Pin-Primary (instante UNIX en
+ * que caduca). Mientras no caduque se reenvía en cada petición y el backend lee del
+ * primario, así no se ven datos atrasados de la réplica. La API está en otro origen y no
+ * se envían cookies, por eso se usa una cabecera.
+ */
+const HEADER = "X-DB-Pin-Primary";
+
+let pinnedUntil = 0;
+
+const remember = (response) => {
+  const value = Number(response?.headers?.[HEADER.toLowerCase()]);
+  if (value > pinnedUntil) pinnedUntil = value;
+};
+
+export const attachReplicaPin = (instance) => {
+  instance.interceptors.request.use((config) => {
+    if (pinnedUntil > Date.now() / 1000) {
+      config.headers = config.headers || {};
+      config.headers[HEADER] = String(pinnedUntil);
+    }
+    return config;
+  });
+  instance.interceptors.response.use(
+    (response) => {
+      remember(response);
+      return response;
+    },
+    (error) => {
+      remember(error.response);
+      return Promise.reject(error);
+    }
+  );
+  return instance;
+};
+
+export default attachReplicaPin;
@@ -2,6 +2,8 @@
 import api from "./axiosClient";
 
 export const listUsers = (params = {}) => api.get("users/", { params }); // acepta { search: 'x' }
+// Autocompletado paginado por cursor: { results, next, previous }
+export const searchUsers = (q, params = {}) => api.get("users/search/", { params: { q, ...params } });
 export const getRoles = () => api.get("roles/");
 
 export const listUserRoles = (params = {}) => api.get("user-roles/", { params });
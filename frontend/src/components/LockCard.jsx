@@ -10,6 +10,17 @@ export default function LockCard({ lock }) {
           <h3 className="font-semibold">{lock.name || `Cerradura ${lock.id}`}</h3>
           <p className="text-sm text-gray-600">UUID: {lock.uuid}</p>
           <p className="text-sm text-gray-600">Propietario: {lock.owner?.username}</p>
+          {lock.active_pin_count !== undefined && (
+            <p className="text-xs text-gray-500 mt-1">
+              PINs: {lock.active_pin_count} · Dispositivos: {lock.device_count} · Usuarios: {lock.user_count}
+              {lock.failures_24h > 0 && <span className="text-red-600"> · Fallos 24h: {lock.failures_24h}</span>}
+            </p>
+          )}
+          {lock.last_access_at && (
+            <p className="text-xs text-gray-500">
+              Último acceso: {new Date(lock.last_access_at).toLocaleString()} ({lock.last_access_result})
+            </p>
+          )}
         </div>
         <div className="text-right">
           <span className={`px-2 py-1 rounded text-sm ${lock.is_active ? "bg-green-100 text-green-800" : "bg-red-100 text-red-800"}`}>
@@ -1,7 +1,7 @@
 // src/pages/Dashboard.jsx
 import React, { useEffect, useState } from "react";
 import { useAuth } from "../hooks/useAuth";
-import { listLocks } from "../api/locks";
+import { getFleetSummary } from "../api/locks";
 import LockCard from "../components/LockCard";
 
 export default function Dashboard() {
@@ -14,7 +14,7 @@ export default function Dashboard() {
     const fetchLocks = async () => {
       setLoading(true);
       try {
-        const res = await listLocks();
+        const res = await getFleetSummary();
         // backend devuelve array (según estructura previa)
         setLocks(Array.isArray(res.data) ? res.data : []);
       } catch (err) {
@@ -1,7 +1,8 @@
 // src/pages/LockDetail.jsx
 import React, { useEffect, useState, Suspense, lazy } from "react";
 import { useParams, Link } from "react-router-dom";
-import { getLock } from "../api/locks";
+import { sendLockCommand } from "../api/locks";
+import { batch } from "../api/batch";
 
 // lazy-load components (mejora rendimiento y evita crashes globales)
 const LockUsers = lazy(() => import("./LockUsers"));
@@ -37,9 +38,11 @@ class ErrorBoundary extends React.Component {
 export default function LockDetail() {
   const { uuid } = useParams();
   const [lock, setLock] = useState(null);
+  const [networkConfig, setNetworkConfig] = useState(null);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState("overview"); // overview/users/pins/devices/network
   const [error, setError] = useState(null);
+  const [commandMsg, setCommandMsg] = useState(null);
 
   useEffect(() => {
     let mounted = true;
@@ -47,9 +50,15 @@ export default function LockDetail() {
       setLoading(true);
       setError(null);
       try {
-        const res = await getLock(uuid);
+        // Cerradura y configuración de red en un solo viaje (POST /api/batch/)
+        const [lockRes, networkRes] = await batch([
+          { method: "GET", path: `locks/${uuid}/` },
+          { method: "GET", path: `locks/${uuid}/network/` },
+        ]);
         if (!mounted) return;
-        setLock(res.data);
+        if (lockRes.status !== 200) throw { response: lockRes };
+        setLock(lockRes.body);
+        if (networkRes.status === 200) setNetworkConfig(networkRes.body);
       } catch (err) {
         console.error("getLock error:", err);
         const status = err?.response?.status;
@@ -64,6 +73,17 @@ export default function LockDetail() {
     return () => { mounted = false; };
   }, [uuid]);
 
+  const handleRemoteUnlock = async () => {
+    setCommandMsg(null);
+    try {
+      await sendLockCommand(lock.uuid, "UNLOCK");
+      setCommandMsg("Orden de apertura enviada.");
+    } catch (err) {
+      console.error("sendLockCommand error:", err);
+      setCommandMsg(err?.response?.status === 403 ? "No tienes permiso para abrir esta cerradura." : "No se pudo enviar la orden.");
+    }
+  };
+
   if (loading) return <div className="p-6">Cargando cerradura...</div>;
   if (error) return <div className="p-6 text-red-600">{error}</div>;
   if (!lock) return <div className="p-6 text-gray-600">Cerradura no disponible.</div>;
@@ -128,6 +148,10 @@ export default function LockDetail() {
                 <h3 className="font-semibold">Resumen</h3>
                 <p className="text-sm text-gray-600 mt-2">Estado: {lock.is_active ? "Activo" : "Inactivo"}</p>
                 <p className="text-sm text-gray-600">Creado en: {lock.created_at ? new Date(lock.created_at).toLocaleString() : "—"}</p>
+                <button onClick={handleRemoteUnlock} className="mt-3 px-3 py-1 bg-blue-600 text-white rounded">
+                  Abrir ahora
+                </button>
+                {commandMsg && <p className="text-sm text-gray-600 mt-2">{commandMsg}</p>}
               </div>
             )}
 
@@ -158,7 +182,7 @@ export default function LockDetail() {
             {activeTab === "network" && (
               <ErrorBoundary>
                 <Suspense fallback={<div className="p-4">Cargando configuración de red...</div>}>
-                  <NetworkConfig lock={lock} />
+                  <NetworkConfig lock={lock} initialConfig={networkConfig} onSaved={setNetworkConfig} />
                 </Suspense>
               </ErrorBoundary>
             )}
@@ -100,7 +100,7 @@ export default function LockPins({ lock }) {
         {pins.map(p => (
           <div key={p.id} className="p-2 bg-white rounded border flex justify-between items-center mb-2">
             <div>
-              <div className="font-medium">{p.code}</div>
+              <div className="font-medium">PIN #{p.id} · ••••</div>
               <div className="text-xs text-gray-600">{p.is_temporary ? `Temporal: ${p.start_time} → ${p.end_time}` : "Permanente"}</div>
             </div>
             <div className="flex gap-2">
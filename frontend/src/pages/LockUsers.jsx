@@ -1,6 +1,6 @@
 // src/pages/LockUsers.jsx
 import React, { useEffect, useState } from "react";
-import { listUsers, getRoles, assignUserRole, listUserRoles, updateUserRole, deleteUserRole } from "../api/users";
+import { searchUsers, getRoles, assignUserRole, listUserRoles, updateUserRole, deleteUserRole } from "../api/users";
 
 export default function LockUsers({ lock }) {
   const [search, setSearch] = useState("");
@@ -14,13 +14,6 @@ export default function LockUsers({ lock }) {
   const [error, setError] = useState(null);
 
   // --- Helpers robustos para llamadas a la API (adapta a diferentes wrappers) ---
-  const safeListUsers = async (q) => {
-    // intentamos distintas firmas: listUsers({ search }), listUsers({ params: { search } }), listUsers(search)
-    try { return await listUsers({ search: q }); } catch (e1) {}
-    try { return await listUsers({ params: { search: q } }); } catch (e2) {}
-    try { return await listUsers(q); } catch (e3) { throw e3; }
-  };
-
   const safeListUserRoles = async (params) => {
     try { return await listUserRoles(params); } catch (e1) {}
     try { return await listUserRoles({ params }); } catch (e2) { throw e2; }
@@ -46,12 +39,13 @@ export default function LockUsers({ lock }) {
   // --- search users (debounced) ---
   useEffect(() => {
     const t = setTimeout(async () => {
-      if (!search) { setUsers([]); return; }
+      // El endpoint exige al menos 2 caracteres
+      if (search.trim().length < 2) { setUsers([]); return; }
       try {
-        const res = await safeListUsers(search);
-        setUsers(res?.data ?? []);
+        const res = await searchUsers(search.trim());
+        setUsers(res?.data?.results ?? []);
       } catch (e) {
-        console.error("Error fetching users (safeListUsers)", e);
+        console.error("Error fetching users (searchUsers)", e);
         setUsers([]);
       }
     }, 250);
@@ -1,6 +1,6 @@
 // src/pages/LocksList.jsx
 import React, { useEffect, useState } from "react";
-import api from "../api/axiosClient"; // llamadas; interceptores vienen de axiosClient import en AuthContext
+import { getFleetSummary } from "../api/locks";
 import LockCard from "../components/LockCard";
 
 export default function LocksList() {
@@ -12,8 +12,8 @@ export default function LocksList() {
     const fetch = async () => {
       setLoading(true);
       try {
-        const res = await api.get("locks/");
-        // Tu endpoint devuelve objetos individuales (no lista anidada)
+        // Un solo request con los agregados de cada cerradura (ver LockViewSet.fleet_summary)
+        const res = await getFleetSummary();
         // Aseguramos que sea array
         const data = Array.isArray(res.data) ? res.data : [res.data];
         setLocks(data);
@@ -68,7 +68,7 @@ function buildFramedPayload(payloadObj) {
   return total; // Uint8Array listo para enviar
 }
 
-export default function NetworkConfig({ lock }) {
+export default function NetworkConfig({ lock, initialConfig = null, onSaved }) {
   const [config, setConfig] = useState({ ssid: "", password: "", bluetooth_name: "" });
   const [loading, setLoading] = useState(false);
   const [devices, setDevices] = useState([]); // discovered devices session-wise
@@ -94,12 +94,13 @@ export default function NetworkConfig({ lock }) {
       if (!lock?.uuid) return;
       setLoading(true);
       try {
-        const res = await getLockNetworkConfig(lock.uuid);
-        if (res.data && Object.keys(res.data).length > 0) {
+        // LockDetail ya la trae en su lote (y la actualiza con onSaved); si no, se pide aquí
+        const data = initialConfig ?? (await getLockNetworkConfig(lock.uuid)).data;
+        if (data && Object.keys(data).length > 0) {
           setConfig({
-            ssid: res.data.ssid || "",
-            password: res.data.password || "",
-            bluetooth_name: res.data.bluetooth_name || "",
+            ssid: data.ssid || "",
+            password: data.password || "",
+            bluetooth_name: data.bluetooth_name || "",
           });
         } else {
           setConfig({ ssid: "", password: "", bluetooth_name: "" });
@@ -324,11 +325,12 @@ export default function NetworkConfig({ lock }) {
         bluetooth_name: config.bluetooth_name,
       };
       const current = await getLockNetworkConfig(lock.uuid);
-      if (!current.data || Object.keys(current.data).length === 0) {
-        await createLockNetworkConfig(lock.uuid, payload);
-      } else {
-        await updateLockNetworkConfig(lock.uuid, payload);
-      }
+      const saved =
+        !current.data || Object.keys(current.data).length === 0
+          ? await createLockNetworkConfig(lock.uuid, payload)
+          : await updateLockNetworkConfig(lock.uuid, payload);
+      // Para que al volver a la pestaña no se muestre la configuración del lote inicial
+      onSaved?.(saved?.data ?? payload);
       setBtStatus("Configuración guardada en servidor.");
     } catch (e) {
       console.error("saveConfigToServer error", e);
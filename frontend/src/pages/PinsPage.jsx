@@ -31,7 +31,7 @@ export default function PinsPage() {
             <div key={p.id} className="bg-white p-3 rounded shadow-sm border">
               <div className="flex justify-between">
                 <div>
-                  <p className="font-medium">Código: {p.code}</p>
+                  <p className="font-medium">PIN #{p.id} (código oculto)</p>
                   <p className="text-sm text-gray-600">Tipo: {p.type}</p>
                   <p className="text-sm text-gray-600">Válido hasta: {p.expires_at || "—"}</p>
                 </div>
@@ -1,4 +1,5 @@
 import axios from "axios";
+import { attachReplicaPin } from "../api/replicaPin";
 
 const api = axios.create({
   baseURL: "https://40llgzg0-8000.use2.devtunnels.ms/api", 
@@ -42,4 +43,6 @@ api.interceptors.response.use(
   }
 );
 
+attachReplicaPin(api);
+
 export default api;